@@ -3,14 +3,24 @@ from django.contrib.auth.backends import ModelBackend
 
 
 class EmailBackEnd(ModelBackend):
+    """
+    Log users in with their email address, matched regardless of case.
+
+    An unknown email still runs the password hasher once, as ModelBackend does
+    for unknown usernames, so a miss takes as long as a wrong password: it neither
+    reveals which emails have accounts nor makes guessing cheaper than the hash.
+    """
+
     def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None or password is None:
+            return None
         UserModel = get_user_model()
         try:
-            user = UserModel.objects.get(email=username)
-        except UserModel.DoesNotExist:
+            user = UserModel.objects.filter_email(username).get()
+        except (UserModel.DoesNotExist, UserModel.MultipleObjectsReturned):
+            # MultipleObjectsReturned only before the unique email constraint is applied.
+            UserModel().set_password(password)
             return None
-        else:
-            if user.check_password(password):
-                return user
-
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
         return None
@@ -0,0 +1,26 @@
+"""
+Per-row counts of related objects without join fan-out.
+
+Annotating a queryset with ``Count()`` over two one-to-many relations puts both
+joins into the same FROM clause, so the database walks every pair of related
+rows and each count comes out multiplied by the other. ``related_count`` counts
+one relation in its own correlated subquery instead: each count is an index
+lookup on the related table, and several counts on one queryset stay independent.
+"""
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def related_count(queryset, link, outer="pk"):
+    """
+    Expression counting the rows of ``queryset`` (or a manager) whose ``link``
+    lookup equals the ``outer`` field of the annotated row, 0 when there are none.
+
+        Courses.objects.annotate(subject_count=related_count(Subject.objects, "course"),
+                                 student_count=related_count(Student.objects, "course"))
+
+    Filter ``queryset`` beforehand to count a subset, e.g. approved leaves only.
+    """
+    counts = queryset.filter(**{link: OuterRef(outer)}).order_by().values(link) \
+        .annotate(count=Count("pk")).values("count")
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
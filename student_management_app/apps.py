@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class StudentManagementAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'student_management_app'
+
+    def ready(self):
+        # Connect the cache invalidation and search index signal receivers.
+        from student_management_app import dashboardCache, rosterCache, searchIndex, staffHomeCache, \
+            userCache  # noqa: F401
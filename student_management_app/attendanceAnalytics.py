@@ -0,0 +1,174 @@
+"""
+Attendance analytics over a students x class meetings matrix.
+
+A subject's attendance for one session year is loaded into two NumPy boolean
+matrices: ``present`` (the student was marked present) and ``recorded`` (the
+student has a status in that meeting at all, which is false for students who
+joined the course later). Percentages, rolling rates, absence streaks and the
+at-risk set are then computed on whole arrays.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from student_management_app.attendanceStore import unpack_statuses, unpack_student_ids
+from student_management_app.models import Attendance, Student, Subject
+
+AT_RISK_THRESHOLD = 75.0
+ROLLING_WINDOW = 5
+
+AttendanceMatrix = namedtuple("AttendanceMatrix", ["student_ids", "dates", "present", "recorded"])
+
+
+def build_matrix(triples, meeting_dates):
+    """
+    Build an AttendanceMatrix from ``(student_id, attendance_id, status)`` triples and
+    a ``{attendance_id: date}`` mapping. Columns are ordered by meeting date.
+    """
+    meeting_ids = sorted(meeting_dates, key=lambda attendance_id: (meeting_dates[attendance_id], attendance_id))
+    dates = [meeting_dates[attendance_id] for attendance_id in meeting_ids]
+    if not triples:
+        empty = np.zeros((0, len(meeting_ids)), dtype=bool)
+        return AttendanceMatrix(np.array([], dtype=np.int64), dates, empty, empty.copy())
+
+    data = np.array(triples, dtype=np.int64)
+    student_ids, rows = np.unique(data[:, 0], return_inverse=True)
+    # Map attendance ids to their date-ordered column with a binary search over the sorted ids.
+    sorted_ids = np.array(sorted(meeting_ids), dtype=np.int64)
+    position = {attendance_id: column for column, attendance_id in enumerate(meeting_ids)}
+    column_of_sorted = np.array([position[attendance_id] for attendance_id in sorted_ids.tolist()])
+    columns = column_of_sorted[np.searchsorted(sorted_ids, data[:, 1])]
+
+    present = np.zeros((len(student_ids), len(meeting_ids)), dtype=bool)
+    recorded = np.zeros_like(present)
+    recorded[rows, columns] = True
+    present[rows, columns] = data[:, 2].astype(bool)
+    return AttendanceMatrix(student_ids, dates, present, recorded)
+
+
+def load_matrix(subject, session_year):
+    """
+    Load the AttendanceMatrix of a subject and session year with one query: every
+    meeting left-joined to its reports, with the bitmap and roster of meetings
+    stored in bitmap mode.
+    """
+    rows = Attendance.objects.filter(subject=subject, session_year=session_year).values_list(
+        "id", "attendance_date", "status_bitmap", "roster__student_ids",
+        "attendancereport__student_id", "attendancereport__status")
+
+    meeting_dates = {}
+    triples = []
+    for attendance_id, attendance_date, bitmap, roster, student_id, status in rows.iterator():
+        meeting_dates[attendance_id] = attendance_date
+        if bitmap is not None:
+            student_ids = unpack_student_ids(roster)
+            statuses = unpack_statuses(bitmap, len(student_ids))
+            triples.extend((sid, attendance_id, flag) for sid, flag in zip(student_ids, statuses))
+        elif student_id is not None:
+            triples.append((student_id, attendance_id, status))
+    return build_matrix(triples, meeting_dates)
+
+
+def longest_runs(flags):
+    """
+    Length of the longest run of True in each row of a boolean matrix.
+    """
+    padded = np.zeros((flags.shape[0], flags.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = flags
+    edges = np.diff(padded, axis=1)
+    start_rows, start_columns = np.nonzero(edges == 1)
+    end_rows, end_columns = np.nonzero(edges == -1)
+    longest = np.zeros(flags.shape[0], dtype=np.int64)
+    # Starts and ends come out in row-major order, so the i-th start pairs with the i-th end.
+    np.maximum.at(longest, start_rows, end_columns - start_columns)
+    return longest
+
+
+def rate(attended, held):
+    """
+    Percentage ``attended / held``, 0 where nothing was held.
+    """
+    attended = np.asarray(attended, dtype=float)
+    held = np.asarray(held, dtype=float)
+    return np.divide(attended * 100.0, held, out=np.zeros_like(held), where=held > 0)
+
+
+def analyze(present, recorded, window=ROLLING_WINDOW, threshold=AT_RISK_THRESHOLD):
+    """
+    Compute the analytics of one attendance matrix. Returns a dict of arrays:
+    per-student ``percentage``, ``recent_rate`` (last ``window`` meetings),
+    ``longest_absence_streak`` and ``at_risk``, plus the class-wide
+    ``overall_percentage`` and ``rolling_rate`` (one value per meeting window).
+    """
+    present = present & recorded
+    meetings = present.shape[1]
+    attended = present.sum(axis=1)
+    held = recorded.sum(axis=1)
+    percentage = rate(attended, held)
+
+    window = max(1, min(window, meetings)) if meetings else 1
+    if meetings:
+        recent_rate = rate(present[:, -window:].sum(axis=1), recorded[:, -window:].sum(axis=1))
+        kernel = np.ones(window, dtype=np.int64)
+        rolling_rate = rate(np.convolve(present.sum(axis=0), kernel, mode="valid"),
+                            np.convolve(recorded.sum(axis=0), kernel, mode="valid"))
+    else:
+        recent_rate = np.zeros(present.shape[0])
+        rolling_rate = np.zeros(0)
+
+    return {
+        "percentage": percentage,
+        "recent_rate": recent_rate,
+        "longest_absence_streak": longest_runs(recorded & ~present),
+        "at_risk": (held > 0) & (percentage < threshold),
+        "overall_percentage": float(rate(attended.sum(), held.sum())),
+        "rolling_rate": rolling_rate,
+    }
+
+
+def subject_report(subject, session_year, window=ROLLING_WINDOW, threshold=AT_RISK_THRESHOLD):
+    """
+    JSON-ready analytics of one subject and session year for the HOD portal.
+    """
+    matrix = load_matrix(subject, session_year)
+    result = analyze(matrix.present, matrix.recorded, window, threshold)
+    names = {student_id: first_name + " " + last_name for student_id, first_name, last_name in
+             Student.objects.filter(id__in=matrix.student_ids.tolist())
+             .values_list("id", "admin__first_name", "admin__last_name")}
+
+    students = [{"id": student_id, "name": names.get(student_id, ""),
+                 "percentage": round(float(percentage), 2), "recent_rate": round(float(recent), 2),
+                 "longest_absence_streak": int(streak), "at_risk": bool(at_risk)}
+                for student_id, percentage, recent, streak, at_risk in
+                zip(matrix.student_ids.tolist(), result["percentage"], result["recent_rate"],
+                    result["longest_absence_streak"], result["at_risk"])]
+    return {
+        "subject": subject.subject_name,
+        "session_year": str(session_year),
+        "meetings": len(matrix.dates),
+        "dates": [str(date) for date in matrix.dates],
+        "window": window,
+        "threshold": threshold,
+        "overall_percentage": round(result["overall_percentage"], 2),
+        "rolling_rate": [round(float(value), 2) for value in result["rolling_rate"]],
+        "students": students,
+        "at_risk": [student["id"] for student in students if student["at_risk"]],
+    }
+
+
+def course_report(course, session_year, threshold=AT_RISK_THRESHOLD):
+    """
+    Per-subject attendance percentages and at-risk counts for every subject of a course.
+    """
+    subjects = []
+    attended = held = 0
+    for subject in Subject.objects.filter(course=course).order_by("id"):
+        matrix = load_matrix(subject, session_year)
+        result = analyze(matrix.present, matrix.recorded, threshold=threshold)
+        attended += int(matrix.present.sum())
+        held += int(matrix.recorded.sum())
+        subjects.append({"id": subject.id, "subject": subject.subject_name, "meetings": len(matrix.dates),
+                         "percentage": round(result["overall_percentage"], 2),
+                         "at_risk_count": int(result["at_risk"].sum())})
+    return {"course": course.course_name, "session_year": str(session_year), "threshold": threshold,
+            "overall_percentage": round(float(rate(attended, held)), 2), "subjects": subjects}
@@ -0,0 +1,115 @@
+"""
+Incrementally maintained attendance totals (AttendanceCounter).
+
+attendanceService calls ``record_statuses`` and ``record_correction`` inside the
+same transaction that writes the statuses, so the counters move together with
+the data; the cached dashboards of the affected students and the admin student
+attendance chart are invalidated on commit.
+``recount`` rebuilds the totals from scratch and is used by the
+``rebuild_attendance_counters`` and ``check_attendance_counters`` commands.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from student_management_app.attendanceStore import bitmap_statuses
+from student_management_app.dashboardCache import invalidate_sections, invalidate_student_home
+from student_management_app.models import Attendance, AttendanceCounter, AttendanceReport
+
+
+def apply_deltas(subject_id, session_year_id, deltas):
+    """
+    Add ``(present, absent)`` deltas to the counters of one subject and session year.
+
+    ``deltas`` maps student ids to ``(present_delta, absent_delta)``. Missing counters
+    are created first, then students sharing the same delta are updated together,
+    so a whole roster costs one insert and a handful of UPDATE statements.
+    """
+    if not deltas:
+        return
+    invalidate_student_home(deltas)
+    invalidate_sections(["admin_home.student_attendance"])
+    AttendanceCounter.objects.bulk_create([
+        AttendanceCounter(student_id=student_id, subject_id=subject_id, session_year_id=session_year_id)
+        for student_id in deltas
+    ], ignore_conflicts=True)
+
+    groups = defaultdict(list)
+    for student_id, delta in deltas.items():
+        groups[delta].append(student_id)
+    now = timezone.now()
+    for (present, absent), student_ids in groups.items():
+        if present or absent:
+            AttendanceCounter.objects.filter(subject_id=subject_id, session_year_id=session_year_id,
+                                             student_id__in=student_ids) \
+                .update(present_count=F("present_count") + present, absent_count=F("absent_count") + absent,
+                        updated_at=now)
+
+
+def record_statuses(attendance, statuses):
+    """
+    Count newly stored statuses (``{student_id: bool}``) of ``attendance``.
+    Returns the ``{student_id: (present, absent)}`` deltas applied.
+    """
+    deltas = {student_id: (1, 0) if status else (0, 1) for student_id, status in statuses.items()}
+    apply_deltas(attendance.subject_id, attendance.session_year_id, deltas)
+    return deltas
+
+
+def record_correction(attendance, changed, created, removed=None):
+    """
+    Count a correction: ``changed`` and ``created`` map student ids to their new status,
+    ``removed`` to the status of a deleted one.
+    A changed status moves one count from the old bucket to the new one.
+    Returns the ``{student_id: (present, absent)}`` deltas applied.
+    """
+    deltas = {student_id: (1, -1) if status else (-1, 1) for student_id, status in changed.items()}
+    deltas.update({student_id: (1, 0) if status else (0, 1) for student_id, status in created.items()})
+    deltas.update({student_id: (-1, 0) if status else (0, -1) for student_id, status in (removed or {}).items()})
+    apply_deltas(attendance.subject_id, attendance.session_year_id, deltas)
+    return deltas
+
+
+def recount():
+    """
+    Compute the counters from the stored statuses.
+    Returns ``{(student_id, subject_id, session_year_id): (present, absent)}``.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    rows = AttendanceReport.objects.filter(attendance__status_bitmap__isnull=True) \
+        .values_list("student_id", "attendance__subject_id", "attendance__session_year_id") \
+        .annotate(present=Count("id", filter=Q(status=True)), absent=Count("id", filter=Q(status=False))) \
+        .order_by()
+    for student_id, subject_id, session_year_id, present, absent in rows:
+        totals[student_id, subject_id, session_year_id] = [present, absent]
+
+    for attendance in Attendance.objects.filter(status_bitmap__isnull=False).select_related("roster").iterator():
+        for student_id, status in bitmap_statuses(attendance).items():
+            totals[student_id, attendance.subject_id, attendance.session_year_id][0 if status else 1] += 1
+
+    return {key: tuple(value) for key, value in totals.items()}
+
+
+def stored_counters():
+    """
+    Return the counters table in the same shape as ``recount``.
+    """
+    rows = AttendanceCounter.objects.values_list("student_id", "subject_id", "session_year_id",
+                                                 "present_count", "absent_count")
+    return {(student_id, subject_id, session_year_id): (present, absent)
+            for student_id, subject_id, session_year_id, present, absent in rows}
+
+
+def student_totals(students=None):
+    """
+    Return ``{student_id: (present, absent)}`` summed over all subjects and session
+    years, optionally restricted to a Student queryset.
+    """
+    counters = AttendanceCounter.objects.all()
+    if students is not None:
+        counters = counters.filter(student__in=students)
+    rows = counters.values_list("student_id").annotate(present=Coalesce(Sum("present_count"), 0),
+                                                       absent=Coalesce(Sum("absent_count"), 0)).order_by()
+    return {student_id: (present, absent) for student_id, present, absent in rows}
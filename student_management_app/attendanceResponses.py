@@ -0,0 +1,63 @@
+"""
+HTTP responses shared by the staff and HOD attendance endpoints.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+
+from student_management_app.attendanceStore import compact_meeting_report, iter_meeting_report
+from student_management_app.models import Attendance
+
+STREAM_CHUNK_SIZE = 200
+
+
+def stream_json_array(items, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Encode an iterable as a JSON array piece by piece, ``chunk_size`` items per chunk,
+    so large results are never materialized as one string.
+    """
+    yield "["
+    separator = ""
+    chunk = []
+    for item in items:
+        chunk.append(json.dumps(item, cls=DjangoJSONEncoder))
+        if len(chunk) == chunk_size:
+            yield separator + ",".join(chunk)
+            separator = ","
+            chunk = []
+    if chunk:
+        yield separator + ",".join(chunk)
+    yield "]"
+
+
+def meeting_dates(subject_id, session_year_id):
+    """
+    The meetings of a subject in a session year, oldest first. Only the columns
+    the date pickers show are selected, so attendance_subject_session_idx covers
+    the whole query: no table rows are read and no sort is needed.
+    """
+    return Attendance.objects.filter(subject_id=subject_id, session_year_id=session_year_id) \
+        .order_by("attendance_date").values("id", "attendance_date", "session_year_id")
+
+
+def meeting_dates_response(request):
+    """
+    Response for the meeting date pickers: ``[{"id", "attendance_date", "session_year_id"}, ...]``.
+    """
+    return JsonResponse(list(meeting_dates(request.POST.get("subject"), request.POST.get("session_year_id"))),
+                        safe=False)
+
+
+def meeting_report_response(request, attendance):
+    """
+    Response for the per-meeting student attendance endpoints.
+
+    By default the ``[{"id", "name", "status"}, ...]`` array is streamed; posting
+    ``format=compact`` returns parallel ``ids``/``names`` arrays and a ``status``
+    bitstring instead.
+    """
+    if request.POST.get("format") == "compact":
+        return JsonResponse(compact_meeting_report(attendance))
+    return StreamingHttpResponse(stream_json_array(iter_meeting_report(attendance)),
+                                 content_type="application/json")
@@ -0,0 +1,236 @@
+"""
+Daily and monthly rollups of attendance and leave data.
+
+``manage.py build_rollups`` (run nightly from cron) materializes, for every
+completed day, the meetings held, present/absent statuses and leave requests of
+each course, subject, student and staff member into DailyRollup, and sums them
+per calendar month into MonthlyRollup. Runs are incremental: only the days
+touched by rows updated since the last run's watermark (``updated_at`` is also set
+on creation), plus the days completed since that run, are recomputed.
+
+Reports over date ranges that end before today read the rollups through
+``rollup_totals`` instead of aggregating the raw rows.
+"""
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from student_management_app.attendanceStore import iter_statuses
+from student_management_app.leaveService import leave_days, overlapping_leaves
+from student_management_app.models import Attendance, AttendanceReport, DailyRollup, LeaveReportStaff, \
+    LeaveReportStudent, MonthlyRollup, RollupWatermark
+
+WATERMARK_NAME = "attendance_rollups"
+# Rows committed while the previous run was reading may have been missed by it;
+# recomputing a day is idempotent, so the next run looks back a little further.
+WATERMARK_OVERLAP = datetime.timedelta(minutes=10)
+DAY_BATCH_SIZE = 31
+
+COUNTS = ("meetings", "present_count", "absent_count", "leave_count", "approved_leave_count")
+MEETINGS, PRESENT, ABSENT, LEAVES, APPROVED_LEAVES = range(len(COUNTS))
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+
+
+def get_watermark():
+    return RollupWatermark.objects.filter(name=WATERMARK_NAME).values_list("value", flat=True).first()
+
+
+def changed_days(since):
+    """
+    Dates of the meetings and leave days created or updated after ``since``.
+    """
+    days = set(Attendance.objects.filter(updated_at__gt=since).values_list("attendance_date", flat=True))
+    days.update(AttendanceReport.objects.filter(updated_at__gt=since)
+                .values_list("attendance__attendance_date", flat=True).distinct())
+    for model in (LeaveReportStudent, LeaveReportStaff):
+        days.update(covered_days(model.objects.filter(updated_at__gt=since)))
+    return days
+
+
+def covered_days(leaves):
+    """
+    Every day covered by the given leave requests.
+    """
+    days = set()
+    ranges = leaves.filter(leave_start_date__isnull=False).values_list("leave_start_date", "leave_end_date").distinct()
+    for start, end in ranges:
+        days.update(leave_days(start, end))
+    return days
+
+
+def all_days():
+    days = set(Attendance.objects.values_list("attendance_date", flat=True).distinct())
+    for model in (LeaveReportStudent, LeaveReportStaff):
+        days.update(covered_days(model.objects.all()))
+    return days
+
+
+def days_to_build(today, since=None, full=False):
+    """
+    The completed days (before ``today``) a run has to recompute: every day with
+    data or rollups for a ``full`` build, every day from ``since`` on when given,
+    otherwise the days changed since the watermark plus the days completed since it.
+    Deleted rows leave no trace in ``updated_at``; rebuild with ``since`` or ``full``.
+    """
+    watermark = get_watermark()
+    if full or watermark is None:
+        # Days that only have stale rollups left (their data was deleted) are rebuilt empty.
+        days = all_days() | set(DailyRollup.objects.values_list("date", flat=True).distinct())
+    elif since is not None:
+        days = {since + datetime.timedelta(days=n) for n in range(max(0, (today - since).days))}
+    else:
+        days = changed_days(watermark - WATERMARK_OVERLAP)
+        first = timezone.localdate(watermark)
+        days.update(first + datetime.timedelta(days=n) for n in range(max(0, (today - first).days)))
+    return sorted(day for day in days if day < today)
+
+
+def add_counts(totals, date, entities, column, amount=1):
+    for dimension, entity_id in entities:
+        if entity_id is not None:
+            totals[date, dimension, entity_id][column] += amount
+
+
+def add_meeting_totals(totals, days):
+    """
+    Count the meetings held on ``days`` and their statuses into ``totals``.
+    """
+    meetings = Attendance.objects.filter(attendance_date__in=days)
+    owners = {}
+    for attendance_id, date, subject_id, course_id, staff_id in meetings.values_list(
+            "id", "attendance_date", "subject_id", "subject__course_id", "subject__staff__staff__id"):
+        owners[attendance_id] = (date, (("subject", subject_id), ("course", course_id), ("staff", staff_id)))
+        add_counts(totals, date, owners[attendance_id][1], MEETINGS)
+
+    for attendance_id, student_id, status in iter_statuses(meetings):
+        date, entities = owners[attendance_id]
+        column = PRESENT if status else ABSENT
+        add_counts(totals, date, (("student", student_id),), MEETINGS)
+        add_counts(totals, date, (("student", student_id), *entities), column)
+
+
+def add_leave_totals(totals, days):
+    """
+    Count the leave requests covering ``days`` into ``totals``; a leave counts once
+    on every day it covers.
+    """
+    wanted = set(days)
+    first, last = min(days), max(days)
+    student_leaves = overlapping_leaves(LeaveReportStudent, first, last).values_list(
+        "leave_start_date", "leave_end_date", "leave_status", "student_id", "student__course_id")
+    staff_leaves = overlapping_leaves(LeaveReportStaff, first, last).values_list(
+        "leave_start_date", "leave_end_date", "leave_status", "staff_id")
+    for start, end, status, *entity_ids in [*student_leaves, *staff_leaves]:
+        entities = tuple(zip(("student", "course") if len(entity_ids) == 2 else ("staff",), entity_ids))
+        for date in leave_days(max(start, first), min(end, last)):
+            if date in wanted:
+                add_counts(totals, date, entities, LEAVES)
+                add_counts(totals, date, entities, APPROVED_LEAVES, status == 1)
+
+
+def daily_totals(days):
+    """
+    Compute ``{(date, dimension, entity_id): [meetings, present, absent, leaves, approved leaves]}``
+    for the given days from the raw attendance and leave rows.
+    """
+    totals = defaultdict(lambda: [0] * len(COUNTS))
+    add_meeting_totals(totals, days)
+    add_leave_totals(totals, days)
+    return totals
+
+
+def build_daily(days):
+    """
+    Replace the daily rollups of the given days. Returns the number of rows written.
+    """
+    written = 0
+    for i in range(0, len(days), DAY_BATCH_SIZE):
+        batch = days[i:i + DAY_BATCH_SIZE]
+        totals = daily_totals(batch)
+        with transaction.atomic():
+            DailyRollup.objects.filter(date__in=batch).delete()
+            DailyRollup.objects.bulk_create([
+                DailyRollup(date=date, dimension=dimension, entity_id=entity_id, **dict(zip(COUNTS, counts)))
+                for (date, dimension, entity_id), counts in totals.items()
+            ], batch_size=1000)
+        written += len(totals)
+    return written
+
+
+def build_monthly(months):
+    """
+    Replace the monthly rollups of the given months (first days) by summing their
+    daily rollups. Returns the number of rows written.
+    """
+    written = 0
+    for month in sorted(months):
+        rows = DailyRollup.objects.filter(date__gte=month, date__lt=next_month(month)) \
+            .values("dimension", "entity_id").annotate(**{count: Sum(count) for count in COUNTS}).order_by()
+        with transaction.atomic():
+            MonthlyRollup.objects.filter(date=month).delete()
+            MonthlyRollup.objects.bulk_create([MonthlyRollup(date=month, **row) for row in rows], batch_size=1000)
+        written += len(rows)
+    return written
+
+
+def build_rollups(since=None, full=False):
+    """
+    Bring the rollups up to date and move the watermark to the start of this run.
+    Returns ``(days rebuilt, daily rows, monthly rows)``.
+    """
+    started = timezone.now()
+    days = days_to_build(timezone.localdate(started), since=since, full=full)
+    daily = build_daily(days)
+    monthly = build_monthly({month_start(day) for day in days})
+    RollupWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={"value": started})
+    return len(days), daily, monthly
+
+
+def complete_through():
+    """
+    The last day the rollups are known to be complete for, or None before the first build.
+    """
+    watermark = get_watermark()
+    return timezone.localdate(watermark) - datetime.timedelta(days=1) if watermark else None
+
+
+def rollup_totals(dimension, start, end, entity_ids=None):
+    """
+    Sum the rollups of ``dimension`` over ``start``..``end`` (inclusive) into
+    ``{entity_id: {"meetings": ..., "present_count": ..., ...}}``. Whole months are
+    read from MonthlyRollup and the partial months at either end from DailyRollup.
+    Raises ValueError when the range is not covered by the last build.
+    """
+    through = complete_through()
+    if through is None or end > through:
+        raise ValueError(f"Rollups are only complete through {through}; run build_rollups or use the raw data.")
+
+    first_month = start if start.day == 1 else next_month(start)
+    end_month = next_month(end) if next_month(end) - datetime.timedelta(days=1) == end else month_start(end)
+    if first_month < end_month:
+        monthly = MonthlyRollup.objects.filter(date__gte=first_month, date__lt=end_month)
+        daily = DailyRollup.objects.filter(Q(date__gte=start, date__lt=first_month) |
+                                           Q(date__gte=end_month, date__lte=end))
+    else:
+        monthly = MonthlyRollup.objects.none()
+        daily = DailyRollup.objects.filter(date__gte=start, date__lte=end)
+
+    totals = defaultdict(lambda: dict.fromkeys(COUNTS, 0))
+    for queryset in (monthly, daily):
+        queryset = queryset.filter(dimension=dimension)
+        if entity_ids is not None:
+            queryset = queryset.filter(entity_id__in=entity_ids)
+        for row in queryset.values("entity_id").annotate(**{count: Sum(count) for count in COUNTS}).order_by():
+            for count in COUNTS:
+                totals[row["entity_id"]][count] += row[count]
+    return dict(totals)
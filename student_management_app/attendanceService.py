@@ -0,0 +1,158 @@
+"""
+Bulk read/write helpers for attendance data.
+
+The staff views receive a whole class roster in one request, so everything here
+works on the full payload at once instead of issuing one query per student.
+Whether statuses are written as AttendanceReport rows or as a packed bitmap is
+decided by attendanceStore; every write also updates the AttendanceCounter
+totals in the same transaction and patches the cached staff dashboards on commit.
+"""
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from student_management_app.attendanceCounters import record_correction, record_statuses
+from student_management_app.attendanceStore import bitmap_statuses, bitmap_storage_enabled, store_bitmap
+from student_management_app.models import Attendance, AttendanceReport, Student
+from student_management_app.staffHomeCache import refresh_staff_home
+
+
+def parse_attendance_payload(entries):
+    """
+    Turn the ``[{"id": ..., "status": ...}, ...]`` payload posted by the attendance
+    pages into a ``{user_id: bool}`` mapping. The ids are CustomUser ids.
+    """
+    return {int(entry["id"]): bool(int(entry["status"])) for entry in entries}
+
+
+def resolve_students(user_ids):
+    """
+    Map CustomUser ids to Student ids with a single query.
+    """
+    return dict(Student.objects.filter(admin_id__in=user_ids).values_list("admin_id", "id"))
+
+
+def resolve_payload(entries):
+    """
+    Decode a posted payload into ``({student_id: bool}, unknown_user_ids)``.
+    """
+    statuses = parse_attendance_payload(entries)
+    students = resolve_students(statuses.keys())
+    unknown_ids = sorted(user_id for user_id in statuses if user_id not in students)
+    return {students[user_id]: status for user_id, status in statuses.items() if user_id in students}, unknown_ids
+
+
+def save_attendance(subject, session_year, attendance_date, entries):
+    """
+    Create the Attendance for one class meeting and all of its AttendanceReport rows.
+
+    Students are resolved in one query and the reports are written with a batched
+    insert inside one transaction, so the number of queries does not grow with the
+    size of the roster (SQLite still splits very large inserts to stay under its
+    parameter limit). Ids that do not belong to a student are skipped and reported
+    back instead of failing the whole save. A second meeting for the same subject,
+    date and session year is rejected with ValueError; other integrity errors are
+    raised as they are.
+    """
+    statuses, unknown_ids = resolve_payload(entries)
+
+    try:
+        with transaction.atomic():
+            attendance = Attendance.objects.create(subject=subject, attendance_date=attendance_date,
+                                                   session_year=session_year)
+            if bitmap_storage_enabled():
+                store_bitmap(attendance, statuses)
+            else:
+                AttendanceReport.objects.bulk_create([
+                    AttendanceReport(student_id=student_id, attendance=attendance, status=status)
+                    for student_id, status in statuses.items()
+                ])
+            refresh_staff_home(attendance, record_statuses(attendance, statuses), new_meeting=True)
+    except IntegrityError:
+        # Only a clash with unique_attendance_meeting means the meeting was already taken.
+        if not Attendance.objects.filter(subject=subject, attendance_date=attendance_date,
+                                         session_year=session_year).exists():
+            raise
+        raise ValueError("Attendance for this subject and date has already been taken; "
+                         "use Update Attendance to change it.")
+
+    return {"attendance_id": attendance.id, "inserted": len(statuses), "unknown_ids": unknown_ids}
+
+
+def stored_statuses(attendance):
+    """
+    Return ``({student_id: bool}, {student_id: report_id})`` of one meeting; the
+    report ids are empty for a bitmap meeting.
+    """
+    if attendance.status_bitmap is not None:
+        return bitmap_statuses(attendance), {}
+    current, report_ids = {}, {}
+    rows = AttendanceReport.objects.filter(attendance=attendance).values_list("student_id", "id", "status")
+    for student_id, report_id, status in rows:
+        current[student_id] = status
+        report_ids[student_id] = report_id
+    return current, report_ids
+
+
+def update_attendance(attendance, entries, excused=()):
+    """
+    Apply a correction to an existing Attendance.
+
+    All reports of the meeting are loaded in one query; only rows whose status
+    actually changed are written, with at most one UPDATE per new status value.
+    Students without a report (e.g. added to the course after the meeting was
+    recorded) get one created in the same transaction. The meeting row is locked
+    before its statuses are read, so concurrent corrections of one meeting are
+    applied one after the other and each counts its deltas against the statuses
+    the previous one stored.
+
+    ``excused`` holds the CustomUser ids of students on approved leave that day.
+    An absence stored for one of them is removed, as ``save_attendance`` would not
+    have stored it; a stored or posted presence is kept.
+    """
+    statuses, unknown_ids = resolve_payload(entries)
+    excused_ids = set(resolve_students(excused).values()) if excused else set()
+
+    with transaction.atomic():
+        attendance = Attendance.objects.select_for_update().get(pk=attendance.pk)
+        is_bitmap = attendance.status_bitmap is not None
+        current, report_ids = stored_statuses(attendance)
+
+        changed = {True: [], False: []}
+        created = []
+        for student_id, status in statuses.items():
+            if student_id not in current:
+                created.append(student_id)
+            elif current[student_id] != status:
+                changed[status].append(student_id)
+        changed_count = len(changed[True]) + len(changed[False])
+        removed = [student_id for student_id in excused_ids
+                   if student_id not in statuses and current.get(student_id) is False]
+
+        if is_bitmap:
+            if changed_count or created or removed:
+                kept = {student_id: status for student_id, status in current.items() if student_id not in removed}
+                store_bitmap(attendance, {**kept, **statuses})
+        else:
+            now = timezone.now()
+            if removed:
+                AttendanceReport.objects.filter(id__in=[report_ids[student_id] for student_id in removed]).delete()
+                # A deleted row has no updated_at; touch the meeting so the rollups rebuild its day.
+                Attendance.objects.filter(pk=attendance.pk).update(updated_at=now)
+            for status, student_ids in changed.items():
+                if student_ids:
+                    AttendanceReport.objects.filter(id__in=[report_ids[student_id] for student_id in student_ids]) \
+                        .update(status=status, updated_at=now)
+            AttendanceReport.objects.bulk_create([
+                AttendanceReport(student_id=student_id, attendance=attendance, status=statuses[student_id])
+                for student_id in created
+            ])
+        deltas = record_correction(
+            attendance,
+            {student_id: status for status, student_ids in changed.items() for student_id in student_ids},
+            {student_id: statuses[student_id] for student_id in created},
+            {student_id: False for student_id in removed})
+        refresh_staff_home(attendance, deltas)
+
+    return {"attendance_id": attendance.id, "changed": changed_count,
+            "unchanged": len(statuses) - changed_count - len(created), "created": len(created),
+            "removed": len(removed), "unknown_ids": unknown_ids}
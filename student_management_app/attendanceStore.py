@@ -0,0 +1,193 @@
+"""
+Storage back ends for per-student attendance statuses.
+
+By default every student of every class meeting is one AttendanceReport row.
+With ``ATTENDANCE_STORAGE = "bitmap"`` new meetings instead keep their statuses
+as a packed bitmap on the Attendance itself, indexed by a shared, immutable
+AttendanceRoster. Existing rows can be converted with ``manage.py
+compact_attendance``.
+
+Code that needs statuses should go through the reader functions below, which
+understand both layouts: an Attendance is in bitmap mode exactly when its
+``status_bitmap`` is set.
+"""
+import bisect
+import hashlib
+import sys
+from array import array
+from collections import defaultdict
+
+from django.conf import settings
+
+from student_management_app.models import Attendance, AttendanceReport, AttendanceRoster, Student
+
+STORAGE_ROWS = "rows"
+STORAGE_BITMAP = "bitmap"
+
+
+def bitmap_storage_enabled():
+    return getattr(settings, "ATTENDANCE_STORAGE", STORAGE_ROWS) == STORAGE_BITMAP
+
+
+def pack_student_ids(student_ids):
+    """
+    Encode a sorted list of student ids as little-endian unsigned 64-bit integers.
+    """
+    ids = array("Q", student_ids)
+    if sys.byteorder == "big":
+        ids.byteswap()
+    return ids.tobytes()
+
+
+def unpack_student_ids(data):
+    ids = array("Q")
+    ids.frombytes(bytes(data))
+    if sys.byteorder == "big":
+        ids.byteswap()
+    return ids.tolist()
+
+
+def pack_statuses(statuses):
+    """
+    Pack a sequence of booleans into a bitmap; bit ``i`` is ``statuses[i]``.
+    """
+    value = 0
+    for i, status in enumerate(statuses):
+        if status:
+            value |= 1 << i
+    return value.to_bytes((len(statuses) + 7) // 8, "little")
+
+
+def unpack_statuses(data, count):
+    value = int.from_bytes(bytes(data), "little")
+    return [bool(value >> i & 1) for i in range(count)]
+
+
+def load_roster_ids(student_ids):
+    """
+    Return the AttendanceRoster for the given student ids, creating it if this
+    exact roster has not been seen before. Meetings of the same class share one.
+    """
+    packed = pack_student_ids(sorted(student_ids))
+    digest = hashlib.sha256(packed).hexdigest()
+    roster, created = AttendanceRoster.objects.get_or_create(digest=digest, defaults={"student_ids": packed})
+    return roster
+
+
+def store_bitmap(attendance, statuses):
+    """
+    Store ``statuses`` (``{student_id: bool}``) on ``attendance`` as a bitmap.
+    """
+    student_ids = sorted(statuses)
+    attendance.roster = load_roster_ids(student_ids)
+    attendance.status_bitmap = pack_statuses([statuses[student_id] for student_id in student_ids])
+    attendance.save(update_fields=["roster", "status_bitmap", "updated_at"])
+
+
+def bitmap_statuses(attendance):
+    """
+    Decode the bitmap of an Attendance in bitmap mode into ``{student_id: bool}``.
+    """
+    student_ids = unpack_student_ids(attendance.roster.student_ids)
+    return dict(zip(student_ids, unpack_statuses(attendance.status_bitmap, len(student_ids))))
+
+
+def meeting_statuses(attendance):
+    """
+    Return ``{student_id: bool}`` for one Attendance, whichever way it is stored.
+    """
+    if attendance.status_bitmap is not None:
+        return bitmap_statuses(attendance)
+    return dict(AttendanceReport.objects.filter(attendance=attendance).values_list("student_id", "status"))
+
+
+def iter_meeting_report(attendance):
+    """
+    Yield the per-student view used by the attendance pages,
+    ``{"id": <CustomUser id>, "name": ..., "status": ...}``, one student at a time.
+    Row-mode meetings are read with a single joined query streamed from the database.
+    """
+    if attendance.status_bitmap is not None:
+        statuses = bitmap_statuses(attendance)
+        rows = Student.objects.filter(id__in=statuses).order_by("id").values_list(
+            "id", "admin_id", "admin__first_name", "admin__last_name")
+        for student_id, admin_id, first_name, last_name in rows.iterator():
+            yield {"id": admin_id, "name": first_name + " " + last_name, "status": statuses[student_id]}
+        return
+
+    rows = AttendanceReport.objects.filter(attendance=attendance).order_by("id").values_list(
+        "student__admin_id", "student__admin__first_name", "student__admin__last_name", "status")
+    for admin_id, first_name, last_name, status in rows.iterator():
+        yield {"id": admin_id, "name": first_name + " " + last_name, "status": status}
+
+
+def meeting_report(attendance):
+    """
+    Return the per-student view of one meeting as a list; see ``iter_meeting_report``.
+    """
+    return list(iter_meeting_report(attendance))
+
+
+def compact_meeting_report(attendance):
+    """
+    Return one meeting as parallel arrays plus a status bitstring, e.g.
+    ``{"ids": [4, 7], "names": ["A B", "C D"], "status": "10"}``.
+    """
+    ids, names, status = [], [], []
+    for row in iter_meeting_report(attendance):
+        ids.append(row["id"])
+        names.append(row["name"])
+        status.append("1" if row["status"] else "0")
+    return {"ids": ids, "names": names, "status": "".join(status)}
+
+
+def student_statuses(student, attendances):
+    """
+    Return ``[{"attendance_date": ..., "status": ...}, ...]`` for one student over
+    the given Attendance queryset, sorted by date. Meetings the student was not
+    recorded in are left out, as with AttendanceReport rows.
+    """
+    results = list(AttendanceReport.objects.filter(attendance__in=attendances, student=student).values(
+        "attendance__attendance_date", "status"))
+    results = [{"attendance_date": row["attendance__attendance_date"], "status": row["status"]} for row in results]
+
+    for attendance in attendances.filter(status_bitmap__isnull=False).select_related("roster"):
+        student_ids = unpack_student_ids(attendance.roster.student_ids)
+        position = bisect.bisect_left(student_ids, student.id)
+        if position < len(student_ids) and student_ids[position] == student.id:
+            bitmap = bytes(attendance.status_bitmap)
+            status = bool(bitmap[position // 8] >> (position % 8) & 1)
+            results.append({"attendance_date": attendance.attendance_date, "status": status})
+
+    return sorted(results, key=lambda row: row["attendance_date"])
+
+
+def iter_statuses(attendances):
+    """
+    Yield ``(attendance_id, student_id, status)`` for every status of the given
+    Attendance queryset in both storage modes. Used by bulk consumers such as
+    rebuild and backfill commands.
+    """
+    rows = AttendanceReport.objects.filter(attendance__in=attendances.filter(status_bitmap__isnull=True))
+    yield from rows.values_list("attendance_id", "student_id", "status").iterator()
+
+    for attendance in attendances.filter(status_bitmap__isnull=False).select_related("roster").iterator():
+        for student_id, status in bitmap_statuses(attendance).items():
+            yield attendance.id, student_id, status
+
+
+def compact_attendances(attendance_ids):
+    """
+    Convert the AttendanceReport rows of the given row-mode meetings into
+    bitmaps and delete the rows. Returns ``(meetings converted, rows removed)``.
+    Callers are expected to wrap this in a transaction.
+    """
+    statuses = defaultdict(dict)
+    rows = AttendanceReport.objects.filter(attendance_id__in=attendance_ids)
+    for attendance_id, student_id, status in rows.values_list("attendance_id", "student_id", "status"):
+        statuses[attendance_id][student_id] = status
+
+    for attendance in Attendance.objects.filter(id__in=statuses, status_bitmap__isnull=True):
+        store_bitmap(attendance, statuses[attendance.id])
+    deleted, _ = rows.filter(attendance_id__in=statuses).delete()
+    return len(statuses), deleted
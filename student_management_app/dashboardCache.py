@@ -0,0 +1,231 @@
+"""
+Cached dashboard data.
+
+Dashboard numbers are stored in Django's cache framework so a page view is
+usually a handful of cache reads. Invalidation runs on transaction commit so a
+concurrent request cannot cache the pre-commit state again.
+
+The student dashboard is simply dropped when its counters move, when the student
+changes course, or when a subject of the course is added, changed or removed. The admin
+dashboard is split into sections, one per group of charts, and each section is
+invalidated only by saves and deletes of the models it is computed from (see
+``SECTION_SOURCES``). Invalidating a section bumps its version rather than deleting
+it: the first request to see the outdated entry takes a short lock and recomputes
+it, while concurrent requests keep serving the stale copy instead of piling onto
+the database. Hits, stale hits and misses are counted per section for the
+``admin_dashboard_diagnostics`` page.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from student_management_app.models import Attendance, Courses, CustomUser, LeaveReportStaff, LeaveReportStudent, \
+    Staff, Student, Subject
+
+DASHBOARD_TIMEOUT = 60 * 60
+SECTION_TIMEOUT = 60 * 60 * 24
+RECOMPUTE_LOCK_TIMEOUT = 30
+
+SECTION_EVENTS = ("hit", "stale", "miss")
+
+# Models whose saves and deletes change each admin dashboard section. The student
+# attendance totals are kept in AttendanceCounter, which is updated with queryset
+# updates, so attendanceCounters invalidates that section itself.
+SECTION_SOURCES = {
+    "admin_home.cards": (Student, Staff, Subject, Courses),
+    "admin_home.courses": (Courses, Subject, Student),
+    "admin_home.subjects": (Subject, Student),
+    "admin_home.staff_attendance": (Staff, CustomUser, Subject, Attendance, LeaveReportStaff),
+    "admin_home.student_attendance": (Student, CustomUser, LeaveReportStudent),
+}
+
+
+def student_home_key(student_id):
+    return f"dashboard:student_home:{student_id}"
+
+
+def get_student_home(student, build):
+    """
+    Return the cached dashboard data of ``student``, calling ``build(student)`` on a miss.
+    """
+    key = student_home_key(student.id)
+    data = cache.get(key)
+    if data is None:
+        data = build(student)
+        cache.set(key, data, DASHBOARD_TIMEOUT)
+    return data
+
+
+def invalidate_student_home(student_ids):
+    """
+    Drop the cached dashboards of the given students once the current transaction commits.
+    """
+    keys = [student_home_key(student_id) for student_id in student_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_course_student_homes(course_ids):
+    invalidate_student_home(Student.objects.filter(course_id__in=course_ids).values_list("id", flat=True))
+
+
+@receiver(post_init, sender=Student)
+def remember_student_home_course(sender, instance, **kwargs):
+    instance._loaded_home_course = (instance.course_id, instance.session_year_id)
+
+
+@receiver(post_save, sender=Student)
+def invalidate_moved_student_home(sender, instance, created, **kwargs):
+    # The dashboard lists the subjects of the student's course.
+    current = (instance.course_id, instance.session_year_id)
+    if not created and getattr(instance, "_loaded_home_course", current) != current:
+        invalidate_student_home([instance.id])
+    instance._loaded_home_course = current
+
+
+@receiver(post_init, sender=Subject)
+def remember_subject_course(sender, instance, **kwargs):
+    instance._loaded_home_course = instance.course_id
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_subject_student_homes(sender, instance, **kwargs):
+    loaded = getattr(instance, "_loaded_home_course", None)
+    invalidate_course_student_homes({loaded, instance.course_id} - {None})
+    instance._loaded_home_course = instance.course_id
+
+
+def section_key(name):
+    return f"dashboard:section:{name}"
+
+
+def section_version_key(name):
+    return f"dashboard:section:{name}:version"
+
+
+def section_lock_key(name):
+    return f"dashboard:section:{name}:lock"
+
+
+def section_stat_key(name, event):
+    return f"dashboard:stats:{name}:{event}"
+
+
+def increment(key):
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr().
+            cache.set(key, 1, None)
+
+
+def get_section_entry(name, build):
+    """
+    Return the cache entry of one dashboard section, ``{"version", "data",
+    "built_at", "build_ms"}``, calling ``build()`` when it is missing or outdated.
+    An outdated entry is recomputed by one request at a time; the others get the
+    stale copy meanwhile.
+    """
+    version = cache.get_or_set(section_version_key(name), 1, None)
+    entry = cache.get(section_key(name))
+    if entry is not None and entry["version"] == version:
+        increment(section_stat_key(name, "hit"))
+        return entry
+
+    locked = entry is not None
+    if locked and not cache.add(section_lock_key(name), 1, RECOMPUTE_LOCK_TIMEOUT):
+        increment(section_stat_key(name, "stale"))
+        return entry
+
+    increment(section_stat_key(name, "miss"))
+    try:
+        started = time.perf_counter()
+        data = build()
+        # Stored under the version read before building, so an invalidation that
+        # lands while building leaves the entry outdated rather than lost.
+        entry = {"version": version, "data": data, "built_at": timezone.now(),
+                 "build_ms": (time.perf_counter() - started) * 1000}
+        cache.set(section_key(name), entry, SECTION_TIMEOUT)
+    finally:
+        if locked:
+            cache.delete(section_lock_key(name))
+    return entry
+
+
+def get_section(name, build):
+    """
+    Return the cached data of one dashboard section; see ``get_section_entry``.
+    """
+    return get_section_entry(name, build)["data"]
+
+
+def section_etag(entry):
+    """
+    ETag of a section entry. It changes whenever the entry is rebuilt, so a client
+    holding it has exactly the data of that build.
+    """
+    return f'"{entry["version"]}-{entry["built_at"].timestamp():.6f}"'
+
+
+def invalidate_sections(names):
+    """
+    Mark the given sections outdated once the current transaction commits.
+    """
+    names = list(names)
+
+    def bump():
+        for name in names:
+            increment(section_version_key(name))
+
+    if names:
+        transaction.on_commit(bump)
+
+
+def section_stats():
+    """
+    Per-section hit/miss counts and the state of the cached entry, for the diagnostics page.
+    """
+    stats = []
+    for name in SECTION_SOURCES:
+        counts = cache.get_many([section_stat_key(name, event) for event in SECTION_EVENTS])
+        counts = {event: counts.get(section_stat_key(name, event), 0) for event in SECTION_EVENTS}
+        requests = sum(counts.values())
+        entry = cache.get(section_key(name))
+        if entry is None:
+            state = "empty"
+        elif entry["version"] == cache.get(section_version_key(name)):
+            state = "fresh"
+        else:
+            state = "stale"
+        stats.append({
+            "name": name,
+            **counts,
+            "requests": requests,
+            "hit_rate": round((counts["hit"] + counts["stale"]) * 100.0 / requests, 1) if requests else 0.0,
+            "state": state,
+            "built_at": entry["built_at"] if entry else None,
+            "build_ms": round(entry["build_ms"], 1) if entry else None,
+        })
+    return stats
+
+
+def reset_section_stats():
+    cache.delete_many([section_stat_key(name, event) for name in SECTION_SOURCES for event in SECTION_EVENTS])
+
+
+def invalidate_for_model(sender, **kwargs):
+    if sender is CustomUser and kwargs.get("update_fields") == frozenset({"last_login"}):
+        # Logging in touches only last_login, which no chart shows.
+        return
+    invalidate_sections(name for name, sources in SECTION_SOURCES.items() if sender in sources)
+
+
+for source in {model for sources in SECTION_SOURCES.values() for model in sources}:
+    post_save.connect(invalidate_for_model, sender=source, dispatch_uid=f"dashboard_save_{source.__name__}")
+    post_delete.connect(invalidate_for_model, sender=source, dispatch_uid=f"dashboard_delete_{source.__name__}")
@@ -0,0 +1,127 @@
+"""
+Server-side processing for DataTables (https://datatables.net/manual/server-side).
+
+The list pages send ``draw``, ``start``, ``length``, ``search[value]`` and
+``order[0][column]``/``order[0][dir]``; the response carries ``recordsTotal``,
+``recordsFiltered`` and one page of ``data``.
+
+Pages are read with keyset pagination where possible. Every response includes
+a signed ``cursor`` holding the sort key of its first and last row, which the
+page sends back with the next request. Moving one page forward or back then
+seeks past that key (``WHERE (sort, id) > (...) LIMIT n``) instead of counting
+off ``start`` rows, so the cost of a page does not grow with its position. Jumps
+to arbitrary pages fall back to OFFSET. The total and filtered counts are cached
+briefly so they are not recomputed for every page turn.
+"""
+import datetime
+import hashlib
+
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import JsonResponse
+
+MAX_PAGE_LENGTH = 100
+COUNT_TIMEOUT = 30
+CURSOR_SALT = "datatables.cursor"
+
+
+def lookup(obj, path):
+    """
+    Follow a ``__``-separated field path, e.g. ``admin__first_name``, from a model instance.
+    """
+    for name in path.split("__"):
+        obj = getattr(obj, name)
+    return obj
+
+
+def key_value(value):
+    """
+    A sort value as stored in the cursor. Dates keep their full precision, which
+    JSON encoders would otherwise cut to milliseconds and make the seek repeat rows.
+    """
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def seek(field, value, tiebreak, key, descending):
+    """
+    Rows strictly after ``(value, key)`` in ``(field, tiebreak)`` order. The
+    redundant ``field >= value`` lets the database start an index range scan at
+    ``value`` instead of walking the index from its start.
+    """
+    after = "lt" if descending else "gt"
+    return Q(**{f"{field}__{after}e": value}) & (Q(**{f"{field}__{after}": value}) |
+                                                 Q(**{f"{tiebreak}__{after}": key}))
+
+
+def cached_count(name, queryset, fingerprint):
+    key = f"datatables:count:{name}:{fingerprint}"
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_TIMEOUT)
+    return count
+
+
+def datatables_response(request, name, queryset, columns, search_fields, row, tiebreak="pk"):
+    """
+    Answer a DataTables server-side request for ``queryset``, already filtered by
+    the page's own filters. ``columns`` maps the ``data`` names of the sortable
+    columns to model fields, ``search_fields`` are matched with ``icontains``
+    against the search box and ``row(obj)`` renders one object. ``tiebreak`` is
+    the unique field that orders rows with equal sort values; it should be the id
+    column of the ``(column, id)`` indexes that serve the sort.
+    """
+    params = request.GET
+    draw = int(params.get("draw") or 0)
+    start = max(int(params.get("start") or 0), 0)
+    length = min(max(int(params.get("length") or 10), 1), MAX_PAGE_LENGTH)
+    search = (params.get("search[value]") or "").strip()
+
+    order_name = params.get(f"columns[{params.get('order[0][column]', '')}][data]")
+    order_field = columns.get(order_name, tiebreak)
+    descending = params.get("order[0][dir]") == "desc"
+
+    total = cached_count(name, queryset, hashlib.sha256(str(queryset.query).encode()).hexdigest())
+    if search:
+        condition = Q()
+        for field in search_fields:
+            condition |= Q(**{f"{field}__icontains": search})
+        queryset = queryset.filter(condition)
+    # Cursors and counts are only valid for the same filters, search and sort.
+    fingerprint = hashlib.sha256(f"{queryset.query}|{order_field}|{descending}|{length}".encode()).hexdigest()
+    filtered = cached_count(name, queryset, fingerprint) if search else total
+
+    try:
+        cursor = signing.loads(params.get("cursor") or "", salt=CURSOR_SALT)
+        if cursor["fingerprint"] != fingerprint:
+            cursor = None
+    except signing.BadSignature:
+        cursor = None
+
+    ordering = [f"-{order_field}", f"-{tiebreak}"] if descending else [order_field, tiebreak]
+    if cursor and start == cursor["start"] + length:
+        value, key = cursor["last"]
+        objects = list(queryset.filter(seek(order_field, value, tiebreak, key, descending))
+                       .order_by(*ordering)[:length])
+    elif cursor and start == cursor["start"] - length:
+        value, key = cursor["first"]
+        reverse = [field[1:] if field.startswith("-") else f"-{field}" for field in ordering]
+        objects = list(queryset.filter(seek(order_field, value, tiebreak, key, not descending))
+                       .order_by(*reverse)[:length])
+        objects.reverse()
+    else:
+        objects = list(queryset.order_by(*ordering)[start:start + length])
+
+    response = {"draw": draw, "recordsTotal": total, "recordsFiltered": filtered,
+                "data": [row(obj) for obj in objects]}
+    if objects:
+        first, last = objects[0], objects[-1]
+        response["cursor"] = signing.dumps({
+            "fingerprint": fingerprint, "start": start,
+            "first": [key_value(lookup(first, order_field)), lookup(first, tiebreak)],
+            "last": [key_value(lookup(last, order_field)), lookup(last, tiebreak)],
+        }, salt=CURSOR_SALT)
+    return JsonResponse(response)
@@ -0,0 +1,49 @@
+"""
+Feedback inboxes of the HOD portal.
+
+The inboxes show one page of feedback at a time, unanswered first by default,
+filtered on the indexed ``replied`` flag instead of comparing the reply text.
+Replies to any number of feedback items are written together with one batched
+UPDATE. ``bulk_update`` fires no ``pre_save`` signal, so ``replied`` and
+``updated_at`` are set here.
+
+The unanswered queue also checks the reply text, so feedback answered before
+the flag existed is never listed; ``manage.py backfill_feedback_replied`` sets
+the flag on those rows so the index can skip them.
+"""
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.utils import timezone
+
+FEEDBACK_FILTERS = ("unanswered", "answered", "all")
+FEEDBACK_PAGE_SIZE = 24
+
+
+def feedback_page(model, owner, status, page, related=()):
+    """
+    One page of ``model`` feedback with the given status, oldest first for the
+    unanswered queue and newest first otherwise, with the author (``owner``,
+    ``student`` or ``staff``), its user and any other ``related`` relations.
+    """
+    feedbacks = model.objects.select_related(f"{owner}__admin", *related)
+    if status == "unanswered":
+        feedbacks = feedbacks.filter(replied=False, feedback_reply="").order_by("id")
+    elif status == "answered":
+        feedbacks = feedbacks.exclude(feedback_reply="").order_by("-id")
+    else:
+        feedbacks = feedbacks.order_by("-id")
+    return Paginator(feedbacks, FEEDBACK_PAGE_SIZE).get_page(page)
+
+
+def reply_to_feedback(model, replies):
+    """
+    Save ``{feedback_id: reply}`` in one batched UPDATE, skipping empty replies.
+    Returns the number of feedback items updated.
+    """
+    now = timezone.now()
+    feedbacks = [model(id=int(feedback_id), feedback_reply=reply.strip(), replied=True, updated_at=now)
+                 for feedback_id, reply in replies.items() if reply and reply.strip()]
+    if not feedbacks:
+        return 0
+    with transaction.atomic():
+        return model.objects.bulk_update(feedbacks, ["feedback_reply", "replied", "updated_at"])
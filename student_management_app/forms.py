@@ -58,3 +58,21 @@ class EditStudentForm(forms.Form):
     )
     profile_picture = forms.ImageField(label='Profile Picture', widget=forms.FileInput(attrs={"class": "form-control"}),
                                        required=False)
+
+
+class ImportStudentForm(AddStudentForm):
+    """
+    AddStudentForm rules for one row of a student import file. Course and session
+    year are given by id, checked against choices loaded once per import rather
+    than with a query per row. No profile picture is imported, and an empty
+    password leaves the account without one until the student resets it.
+    """
+    password = forms.CharField(label='Password', max_length=50, required=False)
+    course = forms.TypedChoiceField(label="Course", coerce=int)
+    session_year_id = forms.TypedChoiceField(label="Session Year", coerce=int)
+    profile_picture = None
+
+    def __init__(self, *args, course_choices=(), session_year_choices=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["course"].choices = course_choices
+        self.fields["session_year_id"].choices = session_year_choices
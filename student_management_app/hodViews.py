@@ -1,117 +1,189 @@
+import datetime
+import heapq
 import json
+import time
 
 from django.contrib import messages
 from django.core.files.storage import FileSystemStorage
-from django.db.models import Count, Q
 from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import render
 from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import urlencode
 from django.views.decorators.csrf import csrf_exempt
 
+from student_management_app.aggregates import related_count
+from student_management_app.attendanceAnalytics import AT_RISK_THRESHOLD, ROLLING_WINDOW, course_report, \
+    subject_report
+from student_management_app.attendanceCounters import student_totals
+from student_management_app.attendanceResponses import meeting_dates_response, meeting_report_response
+from student_management_app.dashboardCache import get_section, get_section_entry, reset_section_stats, \
+    section_etag, section_stats
+from student_management_app.dataTables import datatables_response
+from student_management_app.feedbackService import FEEDBACK_FILTERS, feedback_page, reply_to_feedback
 from student_management_app.forms import AddStudentForm, EditStudentForm
+from student_management_app.leaveService import LEAVE_ACTIONS, LEAVE_STATUS_FILTERS, leave_page, parse_leave_day, \
+    people_on_leave, set_leave_status, week_of
+from student_management_app.loginCheckMiddleWare import access_decisions, reset_access_decisions
 from student_management_app.models import CustomUser, Courses, Staff, Subject, Student, SessionYear, FeedBackStudent, \
-    FeedBackStaff, LeaveReportStudent, LeaveReportStaff, Attendance, AttendanceReport
+    FeedBackStaff, LeaveReportStudent, LeaveReportStaff, Attendance
+from student_management_app.searchIndex import search_users
+from student_management_app.studentImport import IMPORT_COLUMNS, MAX_UPLOAD_SIZE, StudentImport, read_rows
 
 
-def admin_home(request):
-    """
-    View for the main admin dashboard. Gathers all necessary data for the
-    summary cards and charts.
-    """
-    # --- 1. Summary Card Statistics ---
-    # Simple counts for the info boxes at the top of the page.
+# Per-person dashboard charts show at most this many bars plus one "Others" bar.
+ADMIN_CHART_TOP_N = 25
+# The import page lists at most this many rows that could not be imported.
+IMPORT_ERRORS_SHOWN = 500
+
 
-    student_count = Student.objects.all().count()
-    staff_count = Staff.objects.all().count()
-    subject_count = Subject.objects.all().count()
-    course_count = Courses.objects.all().count()
+def admin_home_cards():
+    # Simple counts for the info boxes at the top of the page.
+    return {
+        "student_count": Student.objects.all().count(),
+        "staff_count": Staff.objects.all().count(),
+        "subject_count": Subject.objects.all().count(),
+        "course_count": Courses.objects.all().count(),
+    }
 
-    # --- 2. Data for Charts ---
 
+def admin_home_courses():
     # Chart: "Total subject in each course" & "Total student in each course"
-    # A single query to get subject and student counts grouped by course.
+    # A single query; each count is its own subquery so subjects and students do not multiply.
 
     course_data = Courses.objects.annotate(
-        subject_count=Count('subject'),
-        student_count=Count('student')
+        subject_count=related_count(Subject.objects, 'course'),
+        student_count=related_count(Student.objects, 'course')
     ).values('course_name', 'subject_count', 'student_count')
 
-    # Unpack the data for the template context
+    return {
+        "course_name_list": [item['course_name'] for item in course_data],
+        "subject_cont_list": [item['subject_count'] for item in course_data],
+        "student_count_list_in_course": [item['student_count'] for item in course_data],
+    }
 
-    course_name_list = [item['course_name'] for item in course_data]
-    subject_cont_list = [item['subject_count'] for item in course_data]
-    student_count_list_in_course = [item['student_count'] for item in course_data]
 
+def admin_home_subjects():
     # Chart: "Total Student in Each Subject"
     # This chart shows the number of students in the *course* that a subject belongs to.
-    # An efficient query to get this data.
 
-    subject_data = Subject.objects.select_related('course').annotate(
-        student_count_in_course=Count('course__student')
+    subject_data = Subject.objects.annotate(
+        student_count_in_course=related_count(Student.objects, 'course', outer='course')
     ).values('subject_name', 'student_count_in_course')
 
-    subject_list_for_pie_chart = [item['subject_name'] for item in subject_data]
-    student_count_in_subject_for_pie_chart = [item['student_count_in_course'] for item in subject_data]
+    return {
+        "subject_list_for_pie_chart": [item['subject_name'] for item in subject_data],
+        "student_count_in_subject_for_pie_chart": [item['student_count_in_course'] for item in subject_data],
+    }
+
 
+def top_n_series(rows, key, limit=ADMIN_CHART_TOP_N):
+    """
+    Bound a per-person chart series. ``rows`` are ``(label, first, second)``
+    tuples; the ``limit`` rows with the largest ``key(row)`` are kept in that order
+    and the rest are folded into one "Others" bar holding their average.
+    """
+    top = heapq.nlargest(limit, rows, key=key)
+    rest = len(rows) - len(top)
+    if rest:
+        first = sum(row[1] for row in rows) - sum(row[1] for row in top)
+        second = sum(row[2] for row in rows) - sum(row[2] for row in top)
+        top.append((f"Others (avg of {rest})", round(first / rest, 1), round(second / rest, 1)))
+    return [row[0] for row in top], [row[1] for row in top], [row[2] for row in top]
+
+
+def admin_home_staff_attendance():
     # Chart: "Staff Attendance vs. Leave"
-    # Efficiently annotates attendance and leave counts directly onto the Staff queryset.
+    # Attendance and leave counts are annotated onto the Staff queryset as independent subqueries.
+    # The most active staff are shown individually, everyone else as one averaged bar.
 
-    staff_attendance_data = Staff.objects.select_related('admin').annotate(
-        attendance_count=Count('admin__subject__attendance'),
-        leave_count=Count('leavereportstaff', filter=Q(leavereportstaff__leave_status=1))
+    staff_attendance_data = Staff.objects.annotate(
+        attendance_count=related_count(Attendance.objects, 'subject__staff', outer='admin'),
+        leave_count=related_count(LeaveReportStaff.objects.filter(leave_status=1), 'staff')
     ).values('admin__username', 'attendance_count', 'leave_count')
 
-    staff_name_list = [item['admin__username'] for item in staff_attendance_data]
-    attendance_present_list_staff = [item['attendance_count'] for item in staff_attendance_data]
-    attendance_absent_list_staff = [item['leave_count'] for item in staff_attendance_data]
+    names, attendance, leave = top_n_series(
+        [(item['admin__username'], item['attendance_count'], item['leave_count']) for item in staff_attendance_data],
+        key=lambda row: row[1] + row[2])
+    return {
+        "staff_name_list": names,
+        "attendance_present_list_staff": attendance,
+        "attendance_absent_list_staff": leave,
+    }
+
 
+def admin_home_student_attendance():
     # Chart: "Student Attendance vs. Leave"
-    # Efficiently annotates attendance and leave counts directly onto the Student queryset.
-
-    student_attendance_data = Student.objects.select_related('admin').annotate(
-        present_count=Count('attendancereport', filter=Q(attendancereport__status=True)),
-        absent_count=Count('attendancereport', filter=Q(attendancereport__status=False)),
-        leave_count=Count('leavereportstudent', filter=Q(leavereportstudent__leave_status=1))
-    ).values('admin__username', 'present_count', 'absent_count', 'leave_count')
+    # Present/absent totals come from the precomputed AttendanceCounter table;
+    # only the approved leave count is annotated onto the Student queryset.
+    # The students with the most absences are shown individually, the rest as one averaged bar.
 
-    student_name_list = [item['admin__username'] for item in student_attendance_data]
-    attendance_present_list_student = [item['present_count'] for item in student_attendance_data]
+    student_attendance_data = Student.objects.annotate(
+        leave_count=related_count(LeaveReportStudent.objects.filter(leave_status=1), 'student')
+    ).values('id', 'admin__username', 'leave_count')
+    attendance_totals = student_totals()
 
     # Total "absences" is a sum of unapproved attendance and approved leaves.
+    names, present, absent = top_n_series(
+        [(item['admin__username'], attendance_totals.get(item['id'], (0, 0))[0],
+          attendance_totals.get(item['id'], (0, 0))[1] + item['leave_count']) for item in student_attendance_data],
+        key=lambda row: row[2])
+    return {
+        "student_name_list": names,
+        "attendance_present_list_student": present,
+        "attendance_absent_list_student": absent,
+    }
 
-    attendance_absent_list_student = [item['absent_count'] + item['leave_count'] for item in student_attendance_data]
 
-    # --- 3. Prepare Context and Render Template ---
+# Each section of the dashboard is cached separately and invalidated by the models
+# it reads; see dashboardCache.SECTION_SOURCES.
+ADMIN_HOME_SECTIONS = {
+    "admin_home.cards": admin_home_cards,
+    "admin_home.courses": admin_home_courses,
+    "admin_home.subjects": admin_home_subjects,
+    "admin_home.staff_attendance": admin_home_staff_attendance,
+    "admin_home.student_attendance": admin_home_student_attendance,
+}
 
-    context = {
-        # --- Data for Summary Cards ---
-        "student_count": student_count,
-        "staff_count": staff_count,
-        "subject_count": subject_count,
-        "course_count": course_count,
 
-        # --- Data for "Total subject in each course" (Chart 2) ---
-        "course_name_list": course_name_list,
-        "subject_cont_list": subject_cont_list,
+def admin_home(request):
+    """
+    View for the main admin dashboard. Only the summary cards are rendered with
+    the page; each chart fetches its data from ``admin_home_chart``.
+    """
+    context = get_section("admin_home.cards", admin_home_cards)
+    return render(request, 'hod_template/home_content.html', context)
 
-        # --- Data for "Total student in each course" (Chart 3) ---
-        "student_count_list_in_course": student_count_list_in_course,
 
-        # --- Data for "Total Student in Each Subject" (Chart 4) ---
-        "subject_list_for_pie_chart": subject_list_for_pie_chart,
-        "student_count_in_subject_for_pie_chart": student_count_in_subject_for_pie_chart,
+def admin_home_chart(request, chart):
+    """
+    JSON data of one admin dashboard chart section (``courses``, ``subjects``,
+    ``staff_attendance`` or ``student_attendance``). Responses carry an ETag, so a
+    refresh of an unchanged chart is answered with 304 Not Modified.
+    """
+    name = f"admin_home.{chart}"
+    if name not in ADMIN_HOME_SECTIONS:
+        return JsonResponse({"status": "Error", "message": f"Unknown chart: {chart}"}, status=404)
 
-        # --- Data for "Staff Attendance vs. Leave" (Chart 5) ---
-        "staff_name_list": staff_name_list,
-        "attendance_present_list_staff": attendance_present_list_staff,
-        "attendance_absent_list_staff": attendance_absent_list_staff,
+    entry = get_section_entry(name, ADMIN_HOME_SECTIONS[name])
+    etag = section_etag(entry)
+    response = get_conditional_response(request, etag=etag) or JsonResponse(entry["data"])
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
-        # --- Data for "Student Attendance vs. Leave" (Chart 6) ---
-        "student_name_list": student_name_list,
-        "attendance_present_list_student": attendance_present_list_student,
-        "attendance_absent_list_student": attendance_absent_list_student,
-    }
-    return render(request, 'hod_template/home_content.html', context)
+
+def admin_dashboard_diagnostics(request):
+    """
+    Hit/miss rates and the state of each cached admin dashboard section, and the
+    access decisions of this process. Post ``reset`` to clear the counters.
+    """
+    if request.method == "POST" and request.POST.get("reset"):
+        reset_section_stats()
+        reset_access_decisions()
+        return HttpResponseRedirect(reverse("admin_dashboard_diagnostics"))
+    return render(request, "hod_template/dashboard_diagnostics_template.html",
+                  {"sections": section_stats(), "access_decisions": access_decisions()})
 
 
 def add_staff(request):
@@ -167,6 +239,30 @@ def add_student(request):
     return render(request, "hod_template/add_student_template.html", {"form": form})
 
 
+def import_students(request):
+    """
+    Upload page for ``manage.py import_students``: imports a .csv or .xlsx file of
+    students and lists the rows that could not be imported.
+    """
+    context = {"columns": IMPORT_COLUMNS, "error_limit": IMPORT_ERRORS_SHOWN}
+    if request.method == "POST":
+        upload = request.FILES.get("import_file")
+        dry_run = request.POST.get("dry_run") == "on"
+        if upload is None:
+            messages.error(request, "Choose a .csv or .xlsx file to import")
+        elif upload.size > MAX_UPLOAD_SIZE:
+            messages.error(request, f"The file is larger than {MAX_UPLOAD_SIZE // (1024 * 1024)} MB")
+        else:
+            try:
+                result = StudentImport(dry_run=dry_run).run(read_rows(upload, upload.name))
+                context.update(result=result, errors=result["errors"][:IMPORT_ERRORS_SHOWN])
+                verb = "can be imported" if dry_run else "imported"
+                messages.success(request, f"{result['created']} of {result['rows']} students {verb}")
+            except ValueError as e:
+                messages.error(request, f"Failed to Import Students: {e}")
+    return render(request, "hod_template/import_students_template.html", context)
+
+
 def add_student_save(request):
     if request.method != "POST":
         return HttpResponse("Method Not Allowed")
@@ -239,14 +335,101 @@ def add_subject_save(request):
             return HttpResponseRedirect(reverse("add_subject"))
 
 
+# Sortable columns of the manage staff/student tables: DataTables column name -> model field.
+USER_LIST_COLUMNS = {
+    "id": "admin_id",
+    "first_name": "admin__first_name",
+    "last_name": "admin__last_name",
+    "username": "admin__username",
+    "email": "admin__email",
+    "date_joined": "admin__date_joined",
+}
+USER_SEARCH_FIELDS = ["admin__first_name", "admin__last_name", "admin__username", "admin__email"]
+# Equal sort values are ordered by the user id, so the (column, id) indexes on CustomUser serve the sort.
+USER_LIST_TIEBREAK = "admin_id"
+
+
+def user_row(obj):
+    return {
+        "id": obj.admin.id,
+        "first_name": obj.admin.first_name,
+        "last_name": obj.admin.last_name,
+        "username": obj.admin.username,
+        "email": obj.admin.email,
+        "address": obj.address,
+        "last_login": obj.admin.last_login,
+        "date_joined": obj.admin.date_joined,
+    }
+
+
 def manage_staff(request):
-    staffs = Staff.objects.all()
-    return render(request, "hod_template/manage_staff_template.html", {"staffs": staffs})
+    # Rows are loaded page by page from manage_staff_data.
+    return render(request, "hod_template/manage_staff_template.html")
+
+
+def manage_staff_data(request):
+    """
+    DataTables server-side endpoint of the manage staff table.
+    """
+    try:
+        staffs = Staff.objects.select_related("admin")
+        return datatables_response(request, "staff", staffs, USER_LIST_COLUMNS, USER_SEARCH_FIELDS,
+                                   lambda staff: {**user_row(staff),
+                                                  "edit_url": reverse("edit_staff", args=[staff.admin.id])},
+                                   tiebreak=USER_LIST_TIEBREAK)
+    except Exception as e:
+        return JsonResponse({"status": "Error", "message": str(e)}, status=400)
 
 
 def manage_student(request):
-    students = Student.objects.all()
-    return render(request, "hod_template/manage_student_template.html", {"students": students})
+    # Rows are loaded page by page from manage_student_data; only the filter options are rendered here.
+    courses = Courses.objects.all()
+    session_years = SessionYear.objects.all()
+    return render(request, "hod_template/manage_student_template.html",
+                  {"courses": courses, "session_years": session_years})
+
+
+def manage_student_data(request):
+    """
+    DataTables server-side endpoint of the manage student table, optionally
+    filtered by ``course`` and ``session_year``. Students are loaded together with
+    their user, course and session year in one joined query.
+    """
+    try:
+        students = Student.objects.select_related("admin", "course", "session_year")
+        if request.GET.get("course"):
+            students = students.filter(course_id=int(request.GET["course"]))
+        if request.GET.get("session_year"):
+            students = students.filter(session_year_id=int(request.GET["session_year"]))
+        return datatables_response(request, "student", students, USER_LIST_COLUMNS, USER_SEARCH_FIELDS,
+                                   lambda student: {
+                                       **user_row(student),
+                                       "gender": student.gender,
+                                       "profile_picture": str(student.profile_picture),
+                                       "session_year": str(student.session_year) if student.session_year else "",
+                                       "course": student.course.course_name if student.course else "",
+                                       "edit_url": reverse("edit_student", kwargs={"student_id": student.admin.id}),
+                                   }, tiebreak=USER_LIST_TIEBREAK)
+    except Exception as e:
+        return JsonResponse({"status": "Error", "message": str(e)}, status=400)
+
+
+def search_users_typeahead(request):
+    """
+    Staff and students matching ``q`` by name, username or email, for the navbar
+    search. ``served_by`` says whether the in-memory index or the database answered.
+    """
+    try:
+        query = (request.GET.get("q") or "").strip()
+        started = time.perf_counter()
+        users, served_by = search_users(query) if query else ([], None)
+        results = [{**user, "edit_url": reverse("edit_staff", kwargs={"staff_id": user["id"]})
+                    if user["user_type"] == "2" else reverse("edit_student", kwargs={"student_id": user["id"]})}
+                   for user in users]
+        return JsonResponse({"results": results, "served_by": served_by,
+                             "ms": round((time.perf_counter() - started) * 1000, 3)})
+    except Exception as e:
+        return JsonResponse({"status": "Error", "message": str(e)}, status=400)
 
 
 def manage_course(request):
@@ -448,7 +631,7 @@ def add_session_save(request):
 @csrf_exempt
 def check_email_exist(request):
     email = request.POST.get("email")
-    user_obj = CustomUser.objects.filter(email=email).exists()
+    user_obj = CustomUser.objects.filter_email(email).exists()
     if user_obj:
         return HttpResponse(True)
     else:
@@ -465,9 +648,32 @@ def check_username_exist(request):
         return HttpResponse(False)
 
 
+def feedback_inbox(request, model, owner, template, related=()):
+    status = request.GET.get("status") if request.GET.get("status") in FEEDBACK_FILTERS else "unanswered"
+    feedbacks = feedback_page(model, owner, status, request.GET.get("page"), related)
+    return render(request, template, {"feedbacks": feedbacks, "status": status, "statuses": FEEDBACK_FILTERS})
+
+
+def feedback_reply_batch(request, model):
+    """
+    Save the replies to several feedback items at once. ``replies`` is a JSON
+    list of ``{"id": ..., "message": ...}``.
+    """
+    if request.method != "POST":
+        return HttpResponse("Method Not Allowed")
+    try:
+        replies = {int(reply["id"]): reply["message"] for reply in json.loads(request.POST.get("replies") or "[]")}
+        return JsonResponse({"status": "OK", "replied": reply_to_feedback(model, replies)})
+    except Exception as e:
+        return JsonResponse({"status": "Error", "message": str(e)}, status=400)
+
+
 def staff_feedback_message(request):
-    feedbacks = FeedBackStaff.objects.all()
-    return render(request, "hod_template/staff_feedback_template.html", {"feedbacks": feedbacks})
+    return feedback_inbox(request, FeedBackStaff, "staff", "hod_template/staff_feedback_template.html")
+
+
+def staff_feedback_reply_batch(request):
+    return feedback_reply_batch(request, FeedBackStaff)
 
 
 @csrf_exempt
@@ -485,8 +691,12 @@ def staff_feedback_message_replied(request):
 
 
 def student_feedback_message(request):
-    feedbacks = FeedBackStudent.objects.all()
-    return render(request, "hod_template/student_feedback_template.html", {"feedbacks": feedbacks})
+    return feedback_inbox(request, FeedBackStudent, "student", "hod_template/student_feedback_template.html",
+                          related=("student__session_year",))
+
+
+def student_feedback_reply_batch(request):
+    return feedback_reply_batch(request, FeedBackStudent)
 
 
 @csrf_exempt
@@ -503,14 +713,63 @@ def student_feedback_message_replied(request):
         return HttpResponse("False")
 
 
+def leave_queue(request, model, owner, template):
+    status = request.GET.get("status") if request.GET.get("status") in LEAVE_STATUS_FILTERS else "pending"
+    leaves = leave_page(model, owner, status, request.GET.get("page"))
+    return render(request, template, {"leaves": leaves, "status": status, "statuses": LEAVE_STATUS_FILTERS})
+
+
+def leave_bulk_action(request, model, queue):
+    """
+    Approve or disapprove the pending leave requests ticked in a queue page
+    (``leave_ids``), then go back to the same page of the queue.
+    """
+    if request.method != "POST":
+        return HttpResponse("Method Not Allowed")
+    back = reverse(queue) + "?" + urlencode({"status": request.POST.get("status", "pending"),
+                                             "page": request.POST.get("page", 1)})
+    action = request.POST.get("action")
+    leave_ids = request.POST.getlist("leave_ids")
+    if action not in LEAVE_ACTIONS or not leave_ids:
+        messages.error(request, "Select leave requests and an action")
+        return HttpResponseRedirect(back)
+    try:
+        updated = set_leave_status(model, [int(leave_id) for leave_id in leave_ids], LEAVE_ACTIONS[action])
+        messages.success(request, f"{action.capitalize()}d {updated} of {len(leave_ids)} leave requests")
+    except Exception as e:
+        messages.error(request, f"Failed to Update Leave Requests: {e}")
+    return HttpResponseRedirect(back)
+
+
 def staff_leave_view(request):
-    leaves = LeaveReportStaff.objects.all()
-    return render(request, "hod_template/staff_leave_view_template.html", {"leaves": leaves})
+    return leave_queue(request, LeaveReportStaff, "staff", "hod_template/staff_leave_view_template.html")
 
 
 def student_leave_view(request):
-    leaves = LeaveReportStudent.objects.all()
-    return render(request, "hod_template/student_leave_view_template.html", {"leaves": leaves})
+    return leave_queue(request, LeaveReportStudent, "student", "hod_template/student_leave_view_template.html")
+
+
+def staff_leave_bulk(request):
+    return leave_bulk_action(request, LeaveReportStaff, "staff_leave_view")
+
+
+def student_leave_bulk(request):
+    return leave_bulk_action(request, LeaveReportStudent, "student_leave_view")
+
+
+def on_leave(request):
+    """
+    Everyone on approved leave on ``date`` (YYYY-MM-DD, default today), or during
+    its Monday-to-Sunday week with ``period=week``.
+    """
+    try:
+        day = parse_leave_day(request.GET["date"]) if request.GET.get("date") else datetime.date.today()
+        if day is None:
+            raise ValueError(f"Invalid date: {request.GET['date']}")
+        start, end = week_of(day) if request.GET.get("period") == "week" else (day, day)
+        return JsonResponse({"start": str(start), "end": str(end), **people_on_leave(start, end)})
+    except Exception as e:
+        return JsonResponse({"status": "Error", "message": str(e)}, status=400)
 
 
 def student_approve_leave(request, leave_id):
@@ -550,18 +809,8 @@ def admin_view_attendance(request):
 
 @csrf_exempt
 def admin_get_attendance_dates(request):
-    subject = request.POST.get("subject")
-    session_year_id = request.POST.get("session_year_id")
-    subject_obj = Subject.objects.get(id=subject)
-    session_year_obj = SessionYear.objects.get(id=session_year_id)
-    attendance = Attendance.objects.filter(subject_id=subject_obj, session_year_id=session_year_obj)
-    attendance_obj = []
-    for attendance_single in attendance:
-        data = {"id": attendance_single.id, "attendance_date": str(attendance_single.attendance_date),
-                "session_year_id": attendance_single.session_year_id.id}
-        attendance_obj.append(data)
-
-    return JsonResponse(json.dumps(attendance_obj), safe=False)
+    # Read from attendance_subject_session_idx alone; see attendanceResponses.
+    return meeting_dates_response(request)
 
 
 @csrf_exempt
@@ -569,20 +818,32 @@ def admin_get_student_attendance(request):
     attendance_date = request.POST.get("attendance_date")
     attendance = Attendance.objects.get(id=attendance_date)
 
-    attendance_date = AttendanceReport.objects.filter(attendance_id=attendance)
-    list_data = []
+    # One joined query, streamed as a JSON array (or the compact format); see attendanceResponses.
+    return meeting_report_response(request, attendance)
 
-    for student in attendance_date:
-        data_small = {"id": student.student_id.admin.id,
-                      "name": student.student_id.admin.first_name + " " + student.student_id.admin.last_name,
-                      "status": student.status}
-        list_data.append(data_small)
-    return JsonResponse(json.dumps(list_data), content_type="application/json", safe=False)
+
+@csrf_exempt
+def admin_attendance_analytics(request):
+    """
+    Attendance percentages, rolling rates, absence streaks and at-risk students.
+    Post ``subject`` for one subject or ``course`` for a per-subject summary of a course,
+    together with ``session_year_id``; ``window`` and ``threshold`` are optional.
+    """
+    try:
+        session_year = SessionYear.objects.get(id=request.POST.get("session_year_id"))
+        threshold = float(request.POST.get("threshold") or AT_RISK_THRESHOLD)
+        if request.POST.get("course"):
+            course = Courses.objects.get(id=request.POST.get("course"))
+            return JsonResponse(course_report(course, session_year, threshold))
+        subject = Subject.objects.get(id=request.POST.get("subject"))
+        window = int(request.POST.get("window") or ROLLING_WINDOW)
+        return JsonResponse(subject_report(subject, session_year, window, threshold))
+    except Exception as e:
+        return JsonResponse({"status": "Error", "message": str(e)}, status=400)
 
 
 def admin_profile(request):
-    user = CustomUser.objects.get(id=request.user.id)
-    return render(request, "hod_template/admin_profile_template.html", {"user": user})
+    return render(request, "hod_template/admin_profile_template.html", {"user": request.user})
 
 
 def admin_profile_save(request):
@@ -594,7 +855,7 @@ def admin_profile_save(request):
         password = request.POST.get("password")
 
         try:
-            customuser = CustomUser.objects.get(id=request.user.id)
+            customuser = request.user
             customuser.first_name = first_name
             customuser.last_name = last_name
 
@@ -0,0 +1,179 @@
+"""
+Leave request queues of the HOD portal.
+
+The queues show one page of leave requests at a time, filtered by status
+(pending by default), and pending requests are approved or disapproved in bulk
+with a single UPDATE. A queryset update fires no model signals and skips
+``auto_now``, so ``updated_at`` (which the rollups use to find changed days) is
+set explicitly and the dashboard sections and staff home snapshots that count
+leaves are invalidated here.
+
+Leave requests cover ``leave_start_date``..``leave_end_date`` (inclusive). The
+text the request was filed with is kept in ``leave_date``; ``parse_leave_range``
+turns it into the typed dates (``manage.py backfill_leave_dates`` does so for
+rows filed before the typed fields existed). ``overlapping_leaves`` and
+``people_on_leave`` answer who is away on a day or week with an indexed range query.
+"""
+import datetime
+import re
+
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.utils import timezone
+
+from student_management_app.dashboardCache import invalidate_for_model
+from student_management_app.models import LeaveReportStaff, LeaveReportStudent
+from student_management_app.staffHomeCache import invalidate_staff_home
+
+PENDING, APPROVED, DISAPPROVED = 0, 1, 2
+LEAVE_STATUS_FILTERS = {"pending": PENDING, "approved": APPROVED, "disapproved": DISAPPROVED, "all": None}
+LEAVE_ACTIONS = {"approve": APPROVED, "disapprove": DISAPPROVED}
+LEAVE_PAGE_SIZE = 50
+
+# Day-first formats are tried before month-first ones, so 03/04/2025 is 3 April.
+LEAVE_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d %B %Y", "%d %b %Y", "%B %d, %Y",
+                      "%b %d, %Y", "%m/%d/%Y")
+LEAVE_RANGE_SEPARATOR = re.compile(r"\s+(?:to|until|-|–)\s+", re.IGNORECASE)
+
+
+def parse_leave_day(text):
+    for date_format in LEAVE_DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text.strip(), date_format).date()
+        except ValueError:
+            pass
+    return None
+
+
+def parse_leave_range(value):
+    """
+    Parse a submitted leave date, either one day or a ``<start> to <end>`` range,
+    into ``(start, end)``. Returns None when it cannot be read.
+    """
+    parts = LEAVE_RANGE_SEPARATOR.split((value or "").strip(), maxsplit=1)
+    days = [parse_leave_day(part) for part in parts if part]
+    if not days or None in days or days[0] > days[-1]:
+        return None
+    return days[0], days[-1]
+
+
+def read_leave_range(data):
+    """
+    The ``(start, end)`` of an apply-for-leave form: ``leave_start_date`` and an
+    optional ``leave_end_date``. Raises ValueError with a message for the user.
+    """
+    start = parse_leave_day(data.get("leave_start_date") or "")
+    if start is None:
+        raise ValueError("Enter the first day of the leave")
+    end = parse_leave_day(data.get("leave_end_date") or "") if data.get("leave_end_date") else start
+    if end is None or end < start:
+        raise ValueError("The last day of the leave must be a date on or after the first day")
+    return start, end
+
+
+def format_leave_range(start, end):
+    """
+    The ``leave_date`` text of a typed range, readable back by ``parse_leave_range``.
+    """
+    return start.isoformat() if start == end else f"{start.isoformat()} to {end.isoformat()}"
+
+
+def leave_days(start, end):
+    return (start + datetime.timedelta(days=n) for n in range((end - start).days + 1))
+
+
+def week_of(day):
+    """
+    Monday and Sunday of the week ``day`` is in.
+    """
+    monday = day - datetime.timedelta(days=day.weekday())
+    return monday, monday + datetime.timedelta(days=6)
+
+
+def overlapping_leaves(model, start, end):
+    """
+    Leave requests of any status covering at least one day of ``start``..``end``.
+    """
+    return model.objects.filter(leave_end_date__gte=start, leave_start_date__lte=end)
+
+
+def approved_leaves(model, start, end):
+    return overlapping_leaves(model, start, end).filter(leave_status=APPROVED)
+
+
+def students_on_leave(day, course_id, session_year_id):
+    """
+    User ids of the students of a course and session year on approved leave on ``day``.
+    """
+    return set(approved_leaves(LeaveReportStudent, day, day)
+               .filter(student__course_id=course_id, student__session_year_id=session_year_id)
+               .values_list("student__admin_id", flat=True))
+
+
+def drop_excused_absences(entries, excused):
+    """
+    Drop the absences of the ``excused`` user ids from an attendance payload
+    (``[{"id": user_id, "status": ...}, ...]``).
+    """
+    return [entry for entry in entries if int(entry["id"]) not in excused or int(entry["status"])]
+
+
+def without_excused_absences(entries, day, course_id, session_year_id):
+    """
+    Drop the absences of students on approved leave on ``day`` from an attendance
+    payload. The approved leave already counts as an absence on the dashboards, so
+    an absent status would count the day twice; a student on leave who attended is
+    still recorded as present. A correction must also remove absences stored before
+    the leave was approved; see ``attendanceService.update_attendance``.
+    """
+    if day is None:
+        return entries
+    return drop_excused_absences(entries, students_on_leave(day, course_id, session_year_id))
+
+
+def people_on_leave(start, end):
+    """
+    Everyone on approved leave on some day of ``start``..``end``, as
+    ``{"students": [...], "staff": [...]}`` with one entry per leave.
+    """
+    students = approved_leaves(LeaveReportStudent, start, end).order_by("leave_start_date", "id").values_list(
+        "student__admin_id", "student__admin__first_name", "student__admin__last_name", "student__course__course_name",
+        "leave_start_date", "leave_end_date")
+    staff = approved_leaves(LeaveReportStaff, start, end).order_by("leave_start_date", "id").values_list(
+        "staff__admin_id", "staff__admin__first_name", "staff__admin__last_name", "leave_start_date",
+        "leave_end_date")
+    return {
+        "students": [{"id": user_id, "name": f"{first_name} {last_name}", "course": course,
+                      "start": str(leave_start), "end": str(leave_end)}
+                     for user_id, first_name, last_name, course, leave_start, leave_end in students],
+        "staff": [{"id": user_id, "name": f"{first_name} {last_name}", "start": str(leave_start),
+                   "end": str(leave_end)}
+                  for user_id, first_name, last_name, leave_start, leave_end in staff],
+    }
+
+
+def leave_page(model, owner, status, page):
+    """
+    One page of ``model`` leave requests with the given status filter, oldest
+    first, with the requesting ``owner`` (``student`` or ``staff``) and its user.
+    """
+    leaves = model.objects.select_related(f"{owner}__admin").order_by("id")
+    if LEAVE_STATUS_FILTERS.get(status) is not None:
+        leaves = leaves.filter(leave_status=LEAVE_STATUS_FILTERS[status])
+    return Paginator(leaves, LEAVE_PAGE_SIZE).get_page(page)
+
+
+def set_leave_status(model, leave_ids, status):
+    """
+    Move the pending leave requests among ``leave_ids`` to ``status`` in one
+    UPDATE. Requests decided in the meantime are left alone. Returns the number
+    of requests changed.
+    """
+    with transaction.atomic():
+        leaves = model.objects.filter(id__in=leave_ids, leave_status=PENDING)
+        if model is LeaveReportStaff:
+            invalidate_staff_home(list(leaves.values_list("staff__admin_id", flat=True).distinct()))
+        updated = leaves.update(leave_status=status, updated_at=timezone.now())
+        if updated:
+            invalidate_for_model(model)
+    return updated
@@ -1,40 +1,115 @@
+"""
+Route access control for the three portals.
+
+Each view reachable through the URLconf is mapped once, when the middleware is
+loaded, to the frozen set of user types allowed to open it (``ANONYMOUS`` for
+visitors who are not logged in). A request then costs one dict lookup and one set
+membership test. Users who may not open a view are sent to their own home page,
+visitors to the login page; those URLs are reversed once and reused.
+
+Access is granted per view module (``MODULE_ACCESS``), with per-view exceptions
+(``VIEW_ACCESS``). Every view in the URLconf must be covered by one of them
+(see tests.py); a view that is not, e.g. one added at runtime, falls back to the
+module rules and is counted as ``unlisted``.
+"""
+from functools import lru_cache
+
 from django.http import HttpResponseRedirect
-from django.urls import reverse
+from django.urls import URLResolver, get_resolver, reverse
 from django.utils.deprecation import MiddlewareMixin
 
+from student_management_app import views
+
+HOD, STAFF, STUDENT = "1", "2", "3"
+ANONYMOUS = "anonymous"
+USERS = frozenset({HOD, STAFF, STUDENT})
+NOBODY = frozenset()
+
+MODULE_ACCESS = {
+    "student_management_app.hodViews": frozenset({HOD}),
+    "student_management_app.staffViews": frozenset({STAFF}),
+    "student_management_app.studentViews": frozenset({STUDENT}),
+    "student_management_app.views": USERS,
+    "django.views.static": USERS,
+    # Password reset pages, for visitors only.
+    "django.contrib.auth.views": frozenset({ANONYMOUS}),
+    # The Django admin site is not reachable through the portals.
+    "django.contrib.admin.sites": NOBODY,
+    "django.contrib.admin.options": NOBODY,
+    "django.contrib.auth.admin": NOBODY,
+    "django.contrib.contenttypes.views": NOBODY,
+    "django.views.generic.base": NOBODY,
+}
+VIEW_ACCESS = {
+    views.ShowLoginPage: USERS | {ANONYMOUS},
+    views.doLogin: USERS | {ANONYMOUS},
+}
+HOME_URL_NAMES = {HOD: "admin_home", STAFF: "staff_home", STUDENT: "student_home"}
+
+DECISIONS = ("allowed", "redirected_home", "redirected_login", "unlisted")
+# Plain increments without a lock: a thread switch mid-update can drop a count,
+# which is acceptable for diagnostics and keeps the check itself cheap.
+_decisions = dict.fromkeys(DECISIONS, 0)
+
+
+def view_access(view_func):
+    """
+    The user types allowed to open ``view_func`` under the module and view rules.
+    """
+    if view_func in VIEW_ACCESS:
+        return VIEW_ACCESS[view_func]
+    return MODULE_ACCESS.get(view_func.__module__, NOBODY)
+
+
+def url_views(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from url_views(pattern.url_patterns)
+        else:
+            yield pattern.callback
+
+
+@lru_cache(maxsize=None)
+def permission_table(urlconf=None):
+    """
+    ``{view function: frozenset of allowed user types}`` for every view of the URLconf.
+    """
+    return {view_func: view_access(view_func) for view_func in url_views(get_resolver(urlconf).url_patterns)
+            if view_func in VIEW_ACCESS or view_func.__module__ in MODULE_ACCESS}
+
+
+@lru_cache(maxsize=None)
+def redirect_url(user_type):
+    return reverse(HOME_URL_NAMES.get(user_type, "show_login"))
+
+
+def access_decisions():
+    """
+    How many requests this process allowed, redirected home or to the login page,
+    and checked against a view missing from the permission table.
+    """
+    return dict(_decisions)
+
+
+def reset_access_decisions():
+    _decisions.update(dict.fromkeys(DECISIONS, 0))
+
 
 class LoginCheckMiddleWare(MiddlewareMixin):
 
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.permissions = permission_table()
+
     def process_view(self, request, view_func, view_args, view_kwargs):
-        module_name = view_func.__module__
         user = request.user
-        if user.is_authenticated:
-            if user.user_type == "1":
-                if module_name == "student_management_app.hodViews":
-                    pass
-                elif module_name == "student_management_app.views" or module_name == "django.views.static":
-                    pass
-                else:
-                    return HttpResponseRedirect(reverse("admin_home"))
-            elif user.user_type == "2":
-                if module_name == "student_management_app.staffViews" or module_name == "django.views.static":
-                    pass
-                elif module_name == "student_management_app.views":
-                    pass
-                else:
-                    return HttpResponseRedirect(reverse("staff_home"))
-            elif user.user_type == "3":
-                if module_name == "student_management_app.studentViews" or module_name == "django.views.static":
-                    pass
-                elif module_name == "student_management_app.views":
-                    pass
-                else:
-                    return HttpResponseRedirect(reverse("student_home"))
-            else:
-                return HttpResponseRedirect(reverse("show_login"))
-        else:
-            if request.path == reverse("show_login") or request.path == reverse(
-                    "login") or module_name == "django.contrib.auth.views":
-                pass
-            else:
-                return HttpResponseRedirect(reverse("show_login"))
+        user_type = user.user_type if user.is_authenticated else ANONYMOUS
+        allowed = self.permissions.get(view_func)
+        if allowed is None:
+            _decisions["unlisted"] += 1
+            allowed = view_access(view_func)
+        if user_type in allowed:
+            _decisions["allowed"] += 1
+            return None
+        _decisions["redirected_home" if user_type in HOME_URL_NAMES else "redirected_login"] += 1
+        return HttpResponseRedirect(redirect_url(user_type))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from student_management_app.models import FeedBackStaff, FeedBackStudent
+
+
+class Command(BaseCommand):
+    help = "Set the replied flag of feedback answered before the flag existed."
+
+    def handle(self, *args, **options):
+        for model in (FeedBackStudent, FeedBackStaff):
+            updated = model.objects.filter(replied=False).exclude(feedback_reply="").update(replied=True)
+            self.stdout.write(f"{model.__name__}: {updated} feedback items marked as replied")
+        self.stdout.write(self.style.SUCCESS("Done."))
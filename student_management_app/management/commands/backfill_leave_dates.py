@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from student_management_app.leaveService import parse_leave_range
+from student_management_app.models import LeaveReportStaff, LeaveReportStudent
+
+
+class Command(BaseCommand):
+    help = ("Fill leave_start_date/leave_end_date of leave requests from their submitted leave_date text "
+            "and report the ones that cannot be parsed.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Number of leave requests updated per transaction.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Only report what would be filled and what cannot be parsed.")
+        parser.add_argument("--strict", action="store_true",
+                            help="Exit with an error if any leave date cannot be parsed.")
+
+    def handle(self, *args, **options):
+        unparseable = []
+        filled = 0
+        for model in (LeaveReportStudent, LeaveReportStaff):
+            parsed = []
+            for leave in model.objects.filter(leave_start_date__isnull=True).order_by("id") \
+                    .only("id", "leave_date").iterator(chunk_size=options["batch_size"]):
+                leave_range = parse_leave_range(leave.leave_date)
+                if leave_range is None:
+                    unparseable.append((model.__name__, leave.id, leave.leave_date))
+                    continue
+                leave.leave_start_date, leave.leave_end_date = leave_range
+                parsed.append(leave)
+
+            if not options["dry_run"]:
+                for start in range(0, len(parsed), options["batch_size"]):
+                    with transaction.atomic():
+                        model.objects.bulk_update(parsed[start:start + options["batch_size"]],
+                                                  ["leave_start_date", "leave_end_date"])
+            filled += len(parsed)
+            verb = "would be filled" if options["dry_run"] else "filled"
+            self.stdout.write(f"{model.__name__}: {len(parsed)} leave requests {verb}")
+
+        for model_name, leave_id, leave_date in unparseable:
+            self.stdout.write(self.style.WARNING(f"Unparseable: {model_name} {leave_id}: {leave_date!r}"))
+        if filled and not options["dry_run"]:
+            self.stdout.write("Run build_rollups --full to recount leaves in the attendance rollups.")
+        if unparseable and options["strict"]:
+            raise CommandError(f"{len(unparseable)} leave dates could not be parsed")
+        self.stdout.write(self.style.SUCCESS(f"Done, {len(unparseable)} unparseable."))
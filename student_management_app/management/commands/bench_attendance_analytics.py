@@ -0,0 +1,61 @@
+import datetime
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from student_management_app.attendanceAnalytics import analyze, load_matrix, subject_report
+from student_management_app.management.fixtures import build_cohort, rolled_back
+from student_management_app.models import Attendance, AttendanceReport
+
+
+def best_ms(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = "Time the vectorized attendance analytics on a students x meetings matrix."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=2000)
+        parser.add_argument("--meetings", type=int, default=200)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--with-db", action="store_true",
+                            help="Also time loading the matrix from the database (builds the rows first).")
+
+    def handle(self, *args, **options):
+        students, meetings, repeat = options["students"], options["meetings"], options["repeat"]
+        rng = np.random.default_rng(0)
+        present = rng.random((students, meetings)) < 0.8
+        recorded = rng.random((students, meetings)) < 0.98
+
+        ms = best_ms(lambda: analyze(present, recorded), repeat)
+        self.stdout.write(f"analyze {students} x {meetings}: {ms:.2f} ms (best of {repeat})")
+
+        if not options["with_db"]:
+            return
+        with rolled_back():
+            cohort = build_cohort(students)
+            subject, session_year = cohort["subjects"][0], cohort["session_year"]
+            attendances = Attendance.objects.bulk_create([
+                Attendance(subject=subject, session_year=session_year,
+                           attendance_date=datetime.date(2025, 1, 1) + datetime.timedelta(days=day))
+                for day in range(meetings)
+            ])
+            if attendances and attendances[0].pk is None:
+                attendances = list(Attendance.objects.filter(subject=subject).order_by("attendance_date"))
+            AttendanceReport.objects.bulk_create([
+                AttendanceReport(student=student, attendance=attendance, status=bool(present[row, column]))
+                for row, student in enumerate(cohort["students"])
+                for column, attendance in enumerate(attendances) if recorded[row, column]
+            ], batch_size=5000)
+
+            ms = best_ms(lambda: load_matrix(subject, session_year), max(1, repeat // 10))
+            self.stdout.write(f"load_matrix from database: {ms:.2f} ms")
+            ms = best_ms(lambda: subject_report(subject, session_year), max(1, repeat // 10))
+            self.stdout.write(f"subject_report (load + analyze + names): {ms:.2f} ms")
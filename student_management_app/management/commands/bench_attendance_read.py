@@ -0,0 +1,61 @@
+import datetime
+import json
+
+from django.core.management.base import BaseCommand
+from django.http import JsonResponse
+from django.test import RequestFactory
+
+from student_management_app.attendanceResponses import meeting_report_response
+from student_management_app.attendanceService import save_attendance
+from student_management_app.management.fixtures import build_cohort, measure, rolled_back
+from student_management_app.models import Attendance, AttendanceReport
+
+
+def meeting_report_per_row(request, attendance):
+    """
+    The original endpoint body: one report query, then the student and user of every
+    row fetched lazily, and the result JSON-encoded twice.
+    """
+    list_data = []
+    for report in AttendanceReport.objects.filter(attendance=attendance):
+        list_data.append({"id": report.student.admin.id,
+                          "name": report.student.admin.first_name + " " + report.student.admin.last_name,
+                          "status": report.status})
+    return JsonResponse(json.dumps(list_data), content_type="application/json", safe=False)
+
+
+def compact_response(request, attendance):
+    request.POST = request.POST.copy()
+    request.POST["format"] = "compact"
+    return meeting_report_response(request, attendance)
+
+
+class Command(BaseCommand):
+    help = "Compare latency of the per-row, streaming and compact student attendance responses."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        with rolled_back():
+            cohort = build_cohort(options["students"])
+            result = save_attendance(cohort["subjects"][0], cohort["session_year"], datetime.date(2025, 3, 1),
+                                     [{"id": student.admin_id, "status": i % 2}
+                                      for i, student in enumerate(cohort["students"])])
+            attendance = Attendance.objects.get(id=result["attendance_id"])
+
+            self.stdout.write(f"{options['students']} students, best of {options['repeat']} runs")
+            self.stdout.write(f"{'mode':>10} {'queries':>8} {'bytes':>8} {'ms':>8}")
+            for mode, view in (("per-row", meeting_report_per_row), ("streaming", meeting_report_response),
+                               ("compact", compact_response)):
+                runs = []
+                for _ in range(options["repeat"]):
+                    request = factory.post("/", {"attendance_date": attendance.id})
+                    with measure() as run:
+                        response = view(request, attendance)
+                        body = b"".join(response) if response.streaming else response.content
+                    runs.append(run)
+                best = min(runs, key=lambda run: run["ms"])
+                self.stdout.write(f"{mode:>10} {best['queries']:>8} {len(body):>8} {best['ms']:>8.1f}")
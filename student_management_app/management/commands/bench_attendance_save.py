@@ -0,0 +1,39 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from student_management_app.attendanceService import save_attendance
+from student_management_app.management.fixtures import build_cohort, measure, rolled_back
+from student_management_app.models import Attendance, AttendanceReport, Student
+
+
+def save_attendance_per_row(subject, session_year, attendance_date, entries):
+    """
+    The original save path: one Student lookup and one INSERT per student.
+    """
+    attendance = Attendance.objects.create(subject=subject, attendance_date=attendance_date,
+                                           session_year=session_year)
+    for stud in entries:
+        student = Student.objects.get(admin=stud["id"])
+        AttendanceReport.objects.create(student=student, attendance=attendance, status=stud["status"])
+
+
+class Command(BaseCommand):
+    help = "Compare query count and latency of the per-row and bulk attendance save paths."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[30, 300, 1000],
+                            help="Roster sizes to benchmark.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'students':>10} {'mode':>10} {'queries':>8} {'ms':>10}")
+        for size in options["sizes"]:
+            with rolled_back():
+                cohort = build_cohort(size)
+                subject = cohort["subjects"][0]
+                entries = [{"id": student.admin_id, "status": i % 2} for i, student in enumerate(cohort["students"])]
+
+                for day, (mode, save) in enumerate((("per-row", save_attendance_per_row), ("bulk", save_attendance))):
+                    with measure() as result:
+                        save(subject, cohort["session_year"], datetime.date(2025, 3, 1 + day), entries)
+                    self.stdout.write(f"{size:>10} {mode:>10} {result['queries']:>8} {result['ms']:>10.1f}")
@@ -0,0 +1,72 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from student_management_app.attendanceService import save_attendance
+from student_management_app.attendanceStore import STORAGE_BITMAP, STORAGE_ROWS, meeting_report, student_statuses
+from student_management_app.management.fixtures import build_cohort, rolled_back
+from student_management_app.models import Attendance, AttendanceReport, AttendanceRoster
+
+STORAGE_MODELS = (Attendance, AttendanceReport, AttendanceRoster)
+
+
+def table_bytes():
+    """
+    Bytes used by the attendance tables and their indexes, where the backend can tell
+    us about uncommitted data (SQLite's dbstat). Returns None elsewhere.
+    """
+    if connection.vendor != "sqlite":
+        return None
+    tables = [model._meta.db_table for model in STORAGE_MODELS]
+    placeholders = ", ".join(["%s"] * len(tables))
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(f"SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name IN "
+                           f"(SELECT name FROM sqlite_master WHERE tbl_name IN ({placeholders}))", tables)
+        except Exception:
+            return None
+        return cursor.fetchone()[0]
+
+
+class Command(BaseCommand):
+    help = "Compare storage size and read latency of row and bitmap attendance storage."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=300)
+        parser.add_argument("--meetings", type=int, default=60)
+
+    def handle(self, *args, **options):
+        students, meetings = options["students"], options["meetings"]
+        self.stdout.write(f"{students} students x {meetings} class meetings")
+        self.stdout.write(f"{'mode':>8} {'rows':>8} {'bytes':>12} {'meeting ms':>11} {'student ms':>11}")
+
+        for mode in (STORAGE_ROWS, STORAGE_BITMAP):
+            with rolled_back(), override_settings(ATTENDANCE_STORAGE=mode):
+                cohort = build_cohort(students, prefix=f"bench_{mode}")
+                subject = cohort["subjects"][0]
+                before = table_bytes()
+                for day in range(meetings):
+                    entries = [{"id": student.admin_id, "status": int((i + day) % 3 != 0)}
+                               for i, student in enumerate(cohort["students"])]
+                    save_attendance(subject, cohort["session_year"],
+                                    datetime.date(2025, 1, 1) + datetime.timedelta(days=day), entries)
+                after = table_bytes()
+                rows = sum(model.objects.count() for model in STORAGE_MODELS)
+
+                attendances = Attendance.objects.filter(subject=subject)
+                start = time.perf_counter()
+                for attendance in attendances.select_related("roster"):
+                    meeting_report(attendance)
+                meeting_ms = (time.perf_counter() - start) * 1000 / meetings
+
+                sample = cohort["students"][:20]
+                start = time.perf_counter()
+                for student in sample:
+                    student_statuses(student, attendances)
+                student_ms = (time.perf_counter() - start) * 1000 / len(sample)
+
+                size = "n/a" if before is None else after - before
+                self.stdout.write(f"{mode:>8} {rows:>8} {size:>12} {meeting_ms:>11.2f} {student_ms:>11.2f}")
@@ -0,0 +1,110 @@
+import json
+import os
+import platform
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from student_management_app.management.fixtures import build_cohort, measure, rolled_back
+from student_management_app.models import CustomUser
+
+PASSWORD = "bench-password"
+CURRENT_BACKEND = "student_management_app.EmailBackEnd.EmailBackEnd"
+ORIGINAL_BACKEND = f"{__name__}.OriginalEmailBackEnd"
+
+
+class OriginalEmailBackEnd(ModelBackend):
+    """
+    The original backend: exact email match, and an unknown email returns
+    without hashing the password.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        try:
+            user = UserModel.objects.get(email=username)
+        except UserModel.DoesNotExist:
+            return None
+        else:
+            if user.check_password(password):
+                return user
+
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Measure logins per second through doLogin for a known email with the right password (hit), "
+            "with a wrong password, and for an unknown email (miss), with the original and the current "
+            "EmailBackEnd. --iterations compares PBKDF2 work factors; --record appends the results as a "
+            "JSON line to a file so later hasher changes can be compared against them.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000,
+                            help="Accounts in the table the email is looked up in.")
+        parser.add_argument("--logins", type=int, default=20, help="Logins per case.")
+        parser.add_argument("--iterations", type=int, nargs="+",
+                            help="PBKDF2 iteration counts to compare (default: the configured hasher as is).")
+        parser.add_argument("--record", metavar="PATH", help="Append the results to this JSON lines file.")
+
+    def handle(self, *args, **options):
+        hasher = get_hasher()
+        if options["iterations"] and not hasattr(hasher, "iterations"):
+            raise CommandError(f"The {hasher.algorithm} hasher has no iteration count")
+        hasher_class = type(hasher)
+        configured_iterations = getattr(hasher, "iterations", None)
+        n = options["logins"]
+        results = []
+
+        self.stdout.write(f"{hasher.algorithm}, {options['users']} accounts, {n} logins per case")
+        self.stdout.write(f"{'iterations':>10} {'backend':>9} {'case':>15} {'logins/s':>9} {'ms/login':>9} "
+                          f"{'queries':>8}")
+        with override_settings(ALLOWED_HOSTS=["testserver"]), rolled_back():
+            students = build_cohort(options["users"], prefix="email_login")["students"]
+            users = CustomUser.objects.filter(student__in=students)
+            emails = [student.admin.email for student in students[:n]]
+            try:
+                for iterations in options["iterations"] or [configured_iterations]:
+                    if iterations is not None:
+                        hasher_class.iterations = iterations
+                    users.update(password=make_password(PASSWORD))
+                    cases = (("hit", emails, PASSWORD, True),
+                             ("wrong password", emails, "wrong-password", False),
+                             ("unknown email", [f"nobody_{i}@example.com" for i in range(n)], PASSWORD, False))
+                    for backend_name, backend in (("original", ORIGINAL_BACKEND), ("current", CURRENT_BACKEND)):
+                        with override_settings(AUTHENTICATION_BACKENDS=[backend]):
+                            for case, case_emails, password, succeeds in cases:
+                                with measure() as run:
+                                    for email in case_emails:
+                                        response = Client().post(reverse("login"),
+                                                                 {"email": email, "password": password})
+                                        assert (response.url == reverse("student_home")) == succeeds
+                                result = {"iterations": iterations, "backend": backend_name, "case": case,
+                                          "logins_per_second": round(n * 1000 / run["ms"], 1),
+                                          "ms_per_login": round(run["ms"] / n, 3),
+                                          "queries_per_login": round(run["queries"] / n, 2)}
+                                results.append(result)
+                                self.stdout.write(f"{str(iterations):>10} {backend_name:>9} {case:>15} "
+                                                  f"{result['logins_per_second']:>9.1f} "
+                                                  f"{result['ms_per_login']:>9.3f} "
+                                                  f"{result['queries_per_login']:>8.2f}")
+            finally:
+                if configured_iterations is not None:
+                    hasher_class.iterations = configured_iterations
+
+        if options["record"]:
+            record = {"recorded_at": timezone.now().isoformat(timespec="seconds"), "hasher": hasher.algorithm,
+                      "configured_iterations": configured_iterations, "users": options["users"], "logins": n,
+                      "database": connection.vendor, "cpu_count": os.cpu_count(),
+                      "machine": platform.machine(), "python": platform.python_version(),
+                      "django": django.get_version(), "results": results}
+            with open(options["record"], "a") as file:
+                file.write(json.dumps(record) + "\n")
+            self.stdout.write(f"Recorded in {options['record']}")
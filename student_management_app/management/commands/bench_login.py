@@ -0,0 +1,97 @@
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.management.base import BaseCommand
+from django.db.models.signals import post_save
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from student_management_app.management.fixtures import build_cohort, measure, rolled_back
+from student_management_app.models import AdminHOD, CustomUser, Staff, Student, create_profiles, \
+    create_user_profile
+
+PASSWORD = "bench-password"
+
+
+def original_create_user_profile(sender, instance, created, **kwargs):
+    """
+    The original receiver: saves the profile on every user save, including the
+    ``last_login`` update of each login.
+    """
+    if created:
+        if instance.user_type == '1':
+            AdminHOD.objects.create(admin=instance)
+        elif instance.user_type == '2':
+            Staff.objects.create(admin=instance, address="")
+        elif instance.user_type == '3':
+            Student.objects.create(admin=instance,
+                                   address="", profile_picture="", gender="")
+    else:
+        try:
+            if instance.user_type == '1':
+                instance.adminhod.save()
+            elif instance.user_type == '2':
+                instance.staff.save()
+            elif instance.user_type == '3':
+                instance.student.save()
+        except ObjectDoesNotExist:
+            original_create_user_profile(sender, instance, created=True, **kwargs)
+
+
+@contextmanager
+def profile_receiver(receiver):
+    post_save.disconnect(create_user_profile, sender=CustomUser)
+    post_save.connect(receiver, sender=CustomUser)
+    try:
+        yield
+    finally:
+        post_save.disconnect(receiver, sender=CustomUser)
+        post_save.connect(create_user_profile, sender=CustomUser)
+
+
+class Command(BaseCommand):
+    help = ("Measure logins through doLogin and profile creation with the original and the change-aware "
+            "create_user_profile receiver, and the bulk create_profiles path.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=500)
+        parser.add_argument("--real-hasher", action="store_true",
+                            help="Check passwords with the configured hasher instead of MD5; its deliberate "
+                                 "slowness then dominates the login time.")
+
+    def handle(self, *args, **options):
+        n = options["users"]
+        hashers = {} if options["real_hasher"] else {
+            "PASSWORD_HASHERS": ["django.contrib.auth.hashers.MD5PasswordHasher"]}
+        receivers = (("original", original_create_user_profile), ("change-aware", create_user_profile))
+        with override_settings(ALLOWED_HOSTS=["testserver"], **hashers), rolled_back():
+            students = build_cohort(n, prefix="login")["students"]
+            CustomUser.objects.filter(student__in=students).update(password=make_password(PASSWORD))
+            emails = [student.admin.email for student in students]
+
+            self.stdout.write(f"{n} student logins through doLogin")
+            self.stdout.write(f"{'receiver':>14} {'queries/login':>14} {'ms/login':>9} {'logins/s':>9}")
+            for name, receiver in receivers:
+                with profile_receiver(receiver), measure() as run:
+                    for email in emails:
+                        response = Client().post(reverse("login"), {"email": email, "password": PASSWORD})
+                        assert response.status_code == 302 and response.url == reverse("student_home")
+                self.stdout.write(f"{name:>14} {run['queries'] / n:>14.2f} {run['ms'] / n:>9.3f} "
+                                  f"{n * 1000 / run['ms']:>9.0f}")
+
+            self.stdout.write(f"\nProfiles for {n} new staff users")
+            self.stdout.write(f"{'path':>14} {'queries':>8} {'ms':>9}")
+            for name, receiver in receivers:
+                with profile_receiver(receiver), measure() as run:
+                    for i in range(n):
+                        CustomUser.objects.create(username=f"{name}_{i}", email=f"{name}_{i}@example.com",
+                                                  user_type="2")
+                self.stdout.write(f"{name:>14} {run['queries']:>8} {run['ms']:>9.1f}")
+            with measure() as run:
+                users = CustomUser.objects.bulk_create([
+                    CustomUser(username=f"bulk_{i}", email=f"bulk_{i}@example.com", user_type="2")
+                    for i in range(n)])
+                create_profiles(users)
+            self.stdout.write(f"{'create_profiles':>14} {run['queries']:>8} {run['ms']:>9.1f}")
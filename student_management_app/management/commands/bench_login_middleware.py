@@ -0,0 +1,92 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse, HttpResponseRedirect
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from student_management_app.loginCheckMiddleWare import LoginCheckMiddleWare, reset_access_decisions
+from student_management_app.models import CustomUser
+
+
+def module_chain_process_view(request, view_func):
+    """
+    The original process_view: string comparisons on the view module, and the
+    login URLs reversed on every anonymous request. The two branches are split
+    into functions; the comparisons are unchanged.
+    """
+    module_name = view_func.__module__
+    user = request.user
+    if user.is_authenticated:
+        return module_chain_authenticated(user, module_name)
+    else:
+        if request.path == reverse("show_login") or request.path == reverse(
+                "login") or module_name == "django.contrib.auth.views":
+            pass
+        else:
+            return HttpResponseRedirect(reverse("show_login"))
+
+
+def module_chain_authenticated(user, module_name):
+    if user.user_type == "1":
+        if module_name == "student_management_app.hodViews":
+            pass
+        elif module_name == "student_management_app.views" or module_name == "django.views.static":
+            pass
+        else:
+            return HttpResponseRedirect(reverse("admin_home"))
+    elif user.user_type == "2":
+        if module_name == "student_management_app.staffViews" or module_name == "django.views.static":
+            pass
+        elif module_name == "student_management_app.views":
+            pass
+        else:
+            return HttpResponseRedirect(reverse("staff_home"))
+    elif user.user_type == "3":
+        if module_name == "student_management_app.studentViews" or module_name == "django.views.static":
+            pass
+        elif module_name == "student_management_app.views":
+            pass
+        else:
+            return HttpResponseRedirect(reverse("student_home"))
+    else:
+        return HttpResponseRedirect(reverse("show_login"))
+
+
+class Command(BaseCommand):
+    help = "Measure the per-request overhead of LoginCheckMiddleWare against the original module-name checks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=100000)
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        users = {"anonymous": AnonymousUser(), "hod": CustomUser(user_type="1"), "staff": CustomUser(user_type="2"),
+                 "student": CustomUser(user_type="3")}
+        scenarios = [("anonymous", "show_login"), ("anonymous", "admin_home"), ("hod", "admin_home"),
+                     ("hod", "staff_home"), ("staff", "staff_home"), ("student", "student_home")]
+        middleware = LoginCheckMiddleWare(lambda request: HttpResponse())
+        n = options["requests"]
+
+        self.stdout.write(f"{n} checks per scenario, microseconds per request")
+        self.stdout.write(f"{'user':>10} {'view':>14} {'original':>10} {'table':>10} {'result':>16}")
+        for user_name, url_name in scenarios:
+            request = factory.get(reverse(url_name))
+            request.user = users[user_name]
+            view_func = resolve(request.path).func
+
+            start = time.perf_counter()
+            for _ in range(n):
+                expected = module_chain_process_view(request, view_func)
+            original = (time.perf_counter() - start) * 1e6 / n
+
+            start = time.perf_counter()
+            for _ in range(n):
+                response = middleware.process_view(request, view_func, (), {})
+            table = (time.perf_counter() - start) * 1e6 / n
+
+            result = "allowed" if response is None else f"-> {response.url}"
+            assert (expected is None) == (response is None) and (response is None or expected.url == response.url)
+            self.stdout.write(f"{user_name:>10} {url_name:>14} {original:>10.2f} {table:>10.2f} {result:>16}")
+        reset_access_decisions()
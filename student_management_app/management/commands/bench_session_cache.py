@@ -0,0 +1,60 @@
+import itertools
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from student_management_app.management.fixtures import build_cohort, measure, rolled_back
+
+SCENARIOS = (
+    ("db sessions", {"SESSION_ENGINE": "django.contrib.sessions.backends.db", "USER_CACHE_TIMEOUT": 0}),
+    ("cached_db + user", {"SESSION_ENGINE": "django.contrib.sessions.backends.cached_db", "USER_CACHE_TIMEOUT": 60}),
+)
+
+
+class Command(BaseCommand):
+    help = ("Replay logged-in page views from many students and compare queries and time per request with "
+            "database sessions against cached sessions and users, on the local-memory and file-based caches.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--url-name", default="student_profile")
+
+    def handle(self, *args, **options):
+        cache_dir = tempfile.mkdtemp(prefix="bench_session_cache_")
+        # Room for a session and a user entry per student, as in settings.CACHES.
+        cache_options = {"MAX_ENTRIES": max(10000, 4 * options["users"])}
+        backends = (
+            ("locmem", {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "bench",
+                        "OPTIONS": cache_options}),
+            ("file", {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": cache_dir,
+                      "OPTIONS": cache_options}),
+        )
+        url = reverse(options["url_name"])
+        self.stdout.write(f"{options['users']} students, {options['requests']} requests of {url} per run")
+        self.stdout.write(f"{'cache':>8} {'scenario':>18} {'queries/req':>12} {'ms/req':>8}")
+        try:
+            with rolled_back():
+                students = build_cohort(options["users"], prefix="session")["students"]
+                for (backend_name, backend), (scenario, overrides) in itertools.product(backends, SCENARIOS):
+                    with override_settings(CACHES={"default": backend}, ALLOWED_HOSTS=["testserver"], **overrides):
+                        cache.clear()
+                        clients = []
+                        for student in students:
+                            client = Client()
+                            client.force_login(student.admin)
+                            client.get(url)
+                            clients.append(client)
+                        with measure() as run:
+                            for client in itertools.islice(itertools.cycle(clients), options["requests"]):
+                                client.get(url)
+                        self.stdout.write(f"{backend_name:>8} {scenario:>18} "
+                                          f"{run['queries'] / options['requests']:>12.2f} "
+                                          f"{run['ms'] / options['requests']:>8.3f}")
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
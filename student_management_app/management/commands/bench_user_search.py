@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from student_management_app.management.fixtures import build_cohort, measure, rolled_back
+from student_management_app.searchIndex import UserSearchIndex, database_search
+
+QUERIES = ("st", "student", "4999", "bench_student_12345", "example.com", "nobody")
+
+
+class Command(BaseCommand):
+    help = "Compare latency of the in-memory user search index and the icontains database query."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            build_cohort(options["users"])
+            start = time.perf_counter()
+            index = UserSearchIndex.build()
+            self.stdout.write(f"{options['users']} users, index built in "
+                              f"{(time.perf_counter() - start) * 1000:.0f} ms; best of {options['repeat']} runs")
+            self.stdout.write(f"{'query':>22} {'index ms':>9} {'db ms':>9} {'db queries':>11}")
+            for query in QUERIES:
+                index_runs, database_runs = [], []
+                for _ in range(options["repeat"]):
+                    with measure() as run:
+                        index.search(query)
+                    index_runs.append(run)
+                    with measure() as run:
+                        database_search(query)
+                    database_runs.append(run)
+                best_database = min(database_runs, key=lambda run: run["ms"])
+                self.stdout.write(f"{query:>22} {min(run['ms'] for run in index_runs):>9.3f} "
+                                  f"{best_database['ms']:>9.3f} {best_database['queries']:>11}")
@@ -0,0 +1,25 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student_management_app.attendanceRollups import build_rollups
+
+
+class Command(BaseCommand):
+    help = ("Materialize daily and monthly attendance/leave rollups per course, subject, student and staff, "
+            "incrementally from the last run. Meant to be run nightly from cron.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Rebuild every day instead of resuming.")
+        parser.add_argument("--since", help="Rebuild every day from this date (YYYY-MM-DD) on, e.g. after deletions.")
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = datetime.date.fromisoformat(options["since"])
+            except ValueError:
+                raise CommandError(f"Invalid --since date: {options['since']}")
+
+        days, daily, monthly = build_rollups(since=since, full=options["full"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {days} days: {daily} daily and {monthly} monthly rollups."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from student_management_app.attendanceCounters import recount, stored_counters
+
+
+class Command(BaseCommand):
+    help = "Compare the AttendanceCounter table against a full recount of the attendance statuses."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=20, help="Maximum number of mismatches to print.")
+
+    def handle(self, *args, **options):
+        expected = recount()
+        stored = stored_counters()
+        # A stored counter of (0, 0) is equivalent to a missing one.
+        keys = {key for key in expected.keys() | stored.keys()
+                if expected.get(key, (0, 0)) != stored.get(key, (0, 0))}
+
+        for student_id, subject_id, session_year_id in sorted(keys)[:options["limit"]]:
+            key = (student_id, subject_id, session_year_id)
+            self.stdout.write(f"student={student_id} subject={subject_id} session_year={session_year_id}: "
+                              f"stored={stored.get(key, (0, 0))} expected={expected.get(key, (0, 0))}")
+
+        if keys:
+            raise CommandError(f"{len(keys)} of {len(expected)} attendance counters are inconsistent; "
+                               f"run rebuild_attendance_counters to repair them.")
+        self.stdout.write(self.style.SUCCESS(f"All {len(expected)} attendance counters are consistent."))
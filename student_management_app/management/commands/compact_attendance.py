@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from student_management_app.attendanceStore import compact_attendances
+from student_management_app.models import Attendance
+
+
+class Command(BaseCommand):
+    help = "Convert AttendanceReport rows into packed bitmaps on their Attendance and delete the rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="Number of class meetings converted per transaction.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Only report how many meetings would be converted.")
+
+    def handle(self, *args, **options):
+        pending = Attendance.objects.filter(status_bitmap__isnull=True, attendancereport__isnull=False).distinct()
+        attendance_ids = list(pending.order_by("id").values_list("id", flat=True))
+        if options["dry_run"]:
+            self.stdout.write(f"{len(attendance_ids)} class meetings would be converted.")
+            return
+
+        meetings = rows = 0
+        batch_size = options["batch_size"]
+        for start in range(0, len(attendance_ids), batch_size):
+            with transaction.atomic():
+                converted, deleted = compact_attendances(attendance_ids[start:start + batch_size])
+            meetings += converted
+            rows += deleted
+            self.stdout.write(f"Converted {meetings}/{len(attendance_ids)} class meetings")
+
+        self.stdout.write(self.style.SUCCESS(f"Converted {meetings} class meetings, removed {rows} rows."))
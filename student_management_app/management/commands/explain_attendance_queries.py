@@ -0,0 +1,83 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q, Sum
+
+from student_management_app.attendanceResponses import meeting_dates
+from student_management_app.models import Attendance, AttendanceCounter, AttendanceReport, SessionYear, Student, \
+    Subject
+
+
+def first_id(model):
+    return model.objects.order_by("id").values_list("id", flat=True).first() or 1
+
+
+def attendance_queries():
+    """
+    The hot attendance queries, as issued by the views, with ids taken from the
+    database so the planner sees realistic values.
+    """
+    subject_id, session_year_id = first_id(Subject), first_id(SessionYear)
+    attendance_id, student_id = first_id(Attendance), first_id(Student)
+    course_id = Student.objects.filter(id=student_id).values_list("course_id", flat=True).first() or 1
+    end = datetime.date.today()
+    meetings = Attendance.objects.filter(attendance_date__range=(end - datetime.timedelta(days=30), end),
+                                         subject_id=subject_id)
+    return [
+        ("get_attendance_dates", meeting_dates(subject_id, session_year_id)),
+        ("student_view_attendance_post (meetings)", meetings),
+        ("student_view_attendance_post (reports)",
+         AttendanceReport.objects.filter(attendance__in=meetings, student_id=student_id)
+         .values("attendance__attendance_date", "status")),
+        ("get_student_attendance",
+         AttendanceReport.objects.filter(attendance_id=attendance_id).order_by("id")
+         .values_list("student__admin_id", "student__admin__first_name", "student__admin__last_name", "status")),
+        ("save_update_attendance_data",
+         AttendanceReport.objects.filter(attendance_id=attendance_id).values_list("student_id", "id", "status")),
+        ("save_update_attendance_data (single report)",
+         AttendanceReport.objects.filter(student_id=student_id, attendance_id=attendance_id)),
+        ("attendance counters update",
+         AttendanceCounter.objects.filter(subject_id=subject_id, session_year_id=session_year_id,
+                                          student_id__in=[student_id])),
+        ("student_home",
+         Subject.objects.filter(course_id=course_id).order_by("id").annotate(
+             present=Sum("attendancecounter__present_count", filter=Q(attendancecounter__student_id=student_id)))),
+    ]
+
+
+def full_scans(plan):
+    """
+    Return the plan lines that read a whole table instead of using an index.
+    Understands SQLite's and MySQL's EXPLAIN output; other backends report none.
+    """
+    lines = plan.splitlines()
+    if connection.vendor == "sqlite":
+        return [line for line in lines if " SCAN " in f" {line.split('--')[-1].strip()} "
+                and "USING" not in line and "CONSTANT ROW" not in line]
+    if connection.vendor == "mysql":
+        return [line for line in lines if "type=ALL" in line.replace(" ", "") or " ALL " in f" {line} "]
+    return []
+
+
+class Command(BaseCommand):
+    help = "Print the EXPLAIN plan of each attendance view query and flag full table scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--strict", action="store_true",
+                            help="Exit with an error if any query scans a whole table.")
+
+    def handle(self, *args, **options):
+        flagged = []
+        for name, queryset in attendance_queries():
+            plan = queryset.explain()
+            scans = full_scans(plan)
+            status = self.style.WARNING("FULL SCAN") if scans else self.style.SUCCESS("indexed")
+            self.stdout.write(f"== {name}: {status}")
+            self.stdout.write(plan)
+            self.stdout.write("")
+            if scans:
+                flagged.append(name)
+
+        if flagged and options["strict"]:
+            raise CommandError(f"Full table scans in: {', '.join(flagged)}")
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student_management_app.studentImport import IMPORT_CHUNK_SIZE, IMPORT_COLUMNS, StudentImport, read_rows
+
+
+class Command(BaseCommand):
+    help = (f"Enrol students from a .csv or .xlsx file with the columns {', '.join(IMPORT_COLUMNS)}. "
+            "Course and session_year may be ids or names; rows with an empty password get an unusable one. "
+            "Rows that cannot be imported are reported and skipped. Reading .xlsx files needs openpyxl.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE,
+                            help="Number of students inserted per transaction.")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Processes used to hash passwords (default: one per CPU).")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Only validate the file and report what would be imported.")
+        parser.add_argument("--strict", action="store_true",
+                            help="Exit with an error if any row could not be imported.")
+
+    def progress(self, result):
+        self.stdout.write(f"{result['rows']} rows read, {result['created']} students "
+                          f"{'valid' if self.dry_run else 'created'}, {len(result['errors'])} errors")
+
+    def handle(self, *args, **options):
+        self.dry_run = options["dry_run"]
+        started = time.perf_counter()
+        importer = StudentImport(chunk_size=options["chunk_size"], workers=options["workers"], dry_run=self.dry_run,
+                                 progress=self.progress)
+        try:
+            with open(options["path"], "rb") as file:
+                result = importer.run(read_rows(file, options["path"]))
+        except (OSError, ValueError) as e:
+            raise CommandError(e)
+
+        for line, message in result["errors"]:
+            self.stdout.write(self.style.WARNING(f"Line {line}: {message}"))
+        verb = "would be created" if self.dry_run else "created"
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {time.perf_counter() - started:.1f} s: {result['created']} of {result['rows']} students "
+            f"{verb}, {len(result['errors'])} errors."))
+        if result["errors"] and options["strict"]:
+            raise CommandError(f"{len(result['errors'])} rows could not be imported")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from student_management_app.attendanceCounters import recount
+from student_management_app.dashboardCache import invalidate_sections, invalidate_student_home
+from student_management_app.models import AttendanceCounter, Staff, Student
+from student_management_app.staffHomeCache import invalidate_staff_home
+
+
+class Command(BaseCommand):
+    help = "Rebuild the AttendanceCounter table from the stored attendance statuses."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            totals = recount()
+            AttendanceCounter.objects.all().delete()
+            AttendanceCounter.objects.bulk_create([
+                AttendanceCounter(student_id=student_id, subject_id=subject_id, session_year_id=session_year_id,
+                                  present_count=present, absent_count=absent)
+                for (student_id, subject_id, session_year_id), (present, absent) in totals.items()
+            ], batch_size=1000)
+            invalidate_student_home(Student.objects.values_list("id", flat=True))
+            invalidate_sections(["admin_home.student_attendance"])
+            invalidate_staff_home(Staff.objects.values_list("admin_id", flat=True))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(totals)} attendance counters."))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+from student_management_app.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = ("List accounts sharing an email address, ignoring case. They must be resolved before the unique "
+            "email constraint (user_email_ci_unique) can be applied with migrate. Empty emails may be shared.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--strict", action="store_true",
+                            help="Exit with an error if any email is shared.")
+
+    def handle(self, *args, **options):
+        with_email = CustomUser.objects.exclude(email="").annotate(email_lower=Lower("email"))
+        duplicates = list(with_email.values("email_lower")
+                          .annotate(accounts=Count("id")).filter(accounts__gt=1)
+                          .order_by("email_lower").values_list("email_lower", flat=True))
+        users = with_email.filter(email_lower__in=duplicates) \
+            .order_by("email_lower", "id").values_list("email_lower", "id", "username", "email", "user_type",
+                                                       "last_login")
+        for email_lower, user_id, username, email, user_type, last_login in users.iterator(chunk_size=1000):
+            login = f"last login {last_login:%Y-%m-%d}" if last_login else "never logged in"
+            self.stdout.write(self.style.WARNING(
+                f"{email_lower}: user {user_id} {username!r} <{email}>, type {user_type}, {login}"))
+        if duplicates and options["strict"]:
+            raise CommandError(f"{len(duplicates)} emails are shared by more than one account")
+        self.stdout.write(self.style.SUCCESS(f"Done, {len(duplicates)} shared emails."))
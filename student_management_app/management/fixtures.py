@@ -0,0 +1,85 @@
+"""
+Synthetic data used by the benchmark management commands.
+
+Everything is created with bulk inserts so that building a large cohort does not
+dominate the benchmark itself. The commands run inside a transaction that is
+rolled back, so nothing created here is left behind in the database.
+"""
+import datetime
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+
+from student_management_app.models import Courses, CustomUser, SessionYear, Student, Subject
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark data once the measurements are done."""
+
+
+@contextmanager
+def rolled_back():
+    """
+    Run the block inside a transaction that is always rolled back.
+    """
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+@contextmanager
+def measure():
+    """
+    Capture the number of queries and wall time (ms) of the block.
+    Yields a dict that is filled in when the block exits.
+    """
+    result = {"queries": 0}
+
+    # Counted with a wrapper rather than the query log, which keeps only 9000 queries.
+    def count_query(execute, sql, params, many, context):
+        result["queries"] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count_query):
+        start = time.perf_counter()
+        yield result
+        result["ms"] = (time.perf_counter() - start) * 1000
+
+
+def build_cohort(size, prefix="bench", subjects=1):
+    """
+    Create a course with ``subjects`` subjects taught by one staff user and ``size``
+    students enrolled in a fresh session year.
+    Returns a dict with the created ``course``, ``session_year``, ``staff``,
+    ``subjects`` and ``students``.
+    """
+    password = make_password(None)
+    session_year = SessionYear.objects.create(session_start_year=datetime.date(2025, 1, 1),
+                                              session_end_year=datetime.date(2025, 12, 31))
+    course = Courses.objects.create(course_name=f"{prefix} course")
+    staff = CustomUser.objects.create(username=f"{prefix}_staff", email=f"{prefix}_staff@example.com",
+                                      password=password, user_type="2")
+    subject_list = [Subject.objects.create(subject_name=f"{prefix} subject {i}", course=course, staff=staff)
+                    for i in range(subjects)]
+
+    users = CustomUser.objects.bulk_create([
+        CustomUser(username=f"{prefix}_student_{i}", email=f"{prefix}_student_{i}@example.com",
+                   first_name="Student", last_name=str(i), password=password, user_type="3")
+        for i in range(size)
+    ])
+    if users and users[0].pk is None:
+        # Backends without RETURNING support do not set primary keys on bulk_create.
+        users = list(CustomUser.objects.filter(username__startswith=f"{prefix}_student_").order_by("id"))
+    Student.objects.bulk_create([
+        Student(admin=user, gender="", profile_picture="", address="", course=course, session_year=session_year)
+        for user in users
+    ])
+    students = list(Student.objects.filter(course=course).order_by("id"))
+
+    return {"course": course, "session_year": session_year, "staff": staff, "subjects": subject_list,
+            "students": students}
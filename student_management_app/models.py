@@ -1,6 +1,8 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.db.models.signals import post_init, post_save, pre_save
 from django.dispatch import receiver
 
 
@@ -15,10 +17,38 @@ class SessionYear(models.Model):
         """
         return f"{self.session_start_year.strftime('%Y')} to {self.session_end_year.strftime('%Y')}"
 
+
+class CustomUserManager(UserManager):
+
+    def filter_email(self, email):
+        """
+        Users with ``email``, ignoring case, looked up through the unique index on LOWER(email).
+        """
+        return self.alias(email_lower=Lower("email")).filter(email_lower=(email or "").lower())
+
+
 class CustomUser(AbstractUser):
     user_type_data = ((1, "HOD"), (2, "STAFF"), (3, "STUDENT"))
     user_type = models.CharField(default=1, choices=user_type_data, max_length=10)
 
+    objects = CustomUserManager()
+
+    class Meta(AbstractUser.Meta):
+        # Users log in with their email, so it must be unique regardless of case;
+        # `manage.py report_duplicate_emails` lists the accounts that stop this
+        # constraint from being applied. Email is optional (createsuperuser, staff
+        # accounts), so any number of users may leave it empty.
+        constraints = [
+            models.UniqueConstraint(Lower("email"), condition=~Q(email=""), name="user_email_ci_unique"),
+        ]
+        # Keyset pagination of the manage student/staff lists seeks on (column, id).
+        indexes = [
+            models.Index(fields=["first_name", "id"], name="user_first_name_idx"),
+            models.Index(fields=["last_name", "id"], name="user_last_name_idx"),
+            models.Index(fields=["email", "id"], name="user_email_idx"),
+            models.Index(fields=["date_joined", "id"], name="user_date_joined_idx"),
+        ]
+
 
 class AdminHOD(models.Model):
     admin = models.OneToOneField(CustomUser, on_delete=models.CASCADE)
@@ -76,12 +106,38 @@ class Student(models.Model):
         return self.admin.username
 
 
+class AttendanceRoster(models.Model):
+    """
+    An immutable, ordered list of student ids shared by every Attendance that
+    stores its statuses as a packed bitmap. Bit ``i`` of the bitmap belongs to
+    the ``i``-th student of the roster.
+    """
+    digest = models.CharField(max_length=64, unique=True)
+    student_ids = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
 class Attendance(models.Model):
     subject = models.ForeignKey(Subject, on_delete=models.DO_NOTHING)
     attendance_date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
     session_year = models.ForeignKey(SessionYear, on_delete=models.CASCADE)
     updated_at = models.DateTimeField(auto_now=True)
+    # Compact storage: set when the statuses live in a bitmap instead of AttendanceReport rows.
+    roster = models.ForeignKey(AttendanceRoster, on_delete=models.PROTECT, null=True, blank=True)
+    status_bitmap = models.BinaryField(null=True, blank=True)
+
+    class Meta:
+        # The unique constraint also serves the (subject, attendance_date) range scans of
+        # student_view_attendance_post; the index serves get_attendance_dates.
+        constraints = [
+            models.UniqueConstraint(fields=["subject", "attendance_date", "session_year"],
+                                    name="unique_attendance_meeting"),
+        ]
+        indexes = [
+            models.Index(fields=["subject", "session_year", "attendance_date"], name="attendance_subject_session_idx"),
+            models.Index(fields=["updated_at"], name="attendance_updated_idx"),
+        ]
 
 
 class AttendanceReport(models.Model):
@@ -91,40 +147,151 @@ class AttendanceReport(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Also the index for looking up one student's report in a meeting.
+        constraints = [
+            models.UniqueConstraint(fields=["student", "attendance"], name="unique_attendance_report"),
+        ]
+        indexes = [
+            # Lets build_rollups find the reports changed since its last run.
+            models.Index(fields=["updated_at"], name="attendance_report_updated_idx"),
+        ]
+
+
+class AttendanceCounter(models.Model):
+    """
+    Running present/absent totals per student, subject and session year. Kept up
+    to date by attendanceCounters whenever attendance is saved or corrected, so the
+    dashboards do not have to aggregate every attendance status.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    session_year = models.ForeignKey(SessionYear, on_delete=models.CASCADE)
+    present_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["student", "subject", "session_year"], name="unique_attendance_counter"),
+        ]
+
+
+class Rollup(models.Model):
+    """
+    Attendance and leave totals of one course, subject, student or staff member
+    over one period, materialized by ``manage.py build_rollups``. ``entity_id`` is
+    the id of the Courses, Subject, Student or Staff row named by ``dimension``.
+    """
+    dimension_data = (("course", "Course"), ("subject", "Subject"), ("student", "Student"), ("staff", "Staff"))
+    dimension = models.CharField(max_length=10, choices=dimension_data)
+    entity_id = models.PositiveIntegerField()
+    date = models.DateField()
+    meetings = models.PositiveIntegerField(default=0)
+    present_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    leave_count = models.PositiveIntegerField(default=0)
+    approved_leave_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class DailyRollup(Rollup):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["date", "dimension", "entity_id"], name="unique_daily_rollup"),
+        ]
+        indexes = [
+            models.Index(fields=["dimension", "entity_id", "date"], name="daily_rollup_entity_idx"),
+        ]
+
+
+class MonthlyRollup(Rollup):
+    """
+    ``date`` is the first day of the month.
+    """
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["date", "dimension", "entity_id"], name="unique_monthly_rollup"),
+        ]
+        indexes = [
+            models.Index(fields=["dimension", "entity_id", "date"], name="monthly_rollup_entity_idx"),
+        ]
+
+
+class RollupWatermark(models.Model):
+    """
+    The start time of the last successful build of a rollup; the next run only
+    looks at rows created or updated after it.
+    """
+    name = models.CharField(max_length=64, unique=True)
+    value = models.DateTimeField()
+
 
 class LeaveReportStudent(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    # The date(s) as submitted; leave_start_date/leave_end_date are parsed from it (see leaveService).
     leave_date = models.CharField(max_length=255)
+    leave_start_date = models.DateField(null=True, blank=True)
+    leave_end_date = models.DateField(null=True, blank=True)
     leave_message = models.TextField()
     leave_status = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # The HOD leave queue lists one status at a time, oldest first.
+            models.Index(fields=["leave_status", "id"], name="leave_student_status_idx"),
+            # Leaves overlapping a date range: most leaves ended long ago, so seek on the end date first.
+            models.Index(fields=["leave_end_date", "leave_start_date"], name="leave_student_range_idx"),
+        ]
+
 
 class LeaveReportStaff(models.Model):
     staff = models.ForeignKey(Staff, on_delete=models.CASCADE)
     leave_date = models.CharField(max_length=255)
+    leave_start_date = models.DateField(null=True, blank=True)
+    leave_end_date = models.DateField(null=True, blank=True)
     leave_message = models.TextField()
     leave_status = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["leave_status", "id"], name="leave_staff_status_idx"),
+            models.Index(fields=["leave_end_date", "leave_start_date"], name="leave_staff_range_idx"),
+        ]
+
 
 class FeedBackStudent(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     feedback = models.TextField()
     feedback_reply = models.TextField()
+    # Whether feedback_reply is non-empty, kept in sync by sync_feedback_replied. A text column
+    # cannot be indexed portably, so the unanswered queue filters and sorts on this instead.
+    replied = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["replied", "id"], name="feedback_student_replied_idx")]
+
 
 class FeedBackStaff(models.Model):
     staff = models.ForeignKey(Staff, on_delete=models.CASCADE)
     feedback = models.TextField()
     feedback_reply = models.TextField()
+    replied = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["replied", "id"], name="feedback_staff_replied_idx")]
+
 
 class NotificationStudent(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
@@ -140,28 +307,79 @@ class NotificationStaff(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
 
+# user_type -> (profile model, reverse accessor on CustomUser, field values of a new profile)
+USER_PROFILES = {
+    '1': (AdminHOD, "adminhod", {}),
+    '2': (Staff, "staff", {"address": ""}),
+    '3': (Student, "student", {"address": "", "profile_picture": "", "gender": ""}),
+}
+# Profile fields whose changes saving the user writes through (see create_user_profile).
+PROFILE_FIELDS = {
+    AdminHOD: (),
+    Staff: ("address",),
+    Student: ("gender", "profile_picture", "address", "course_id", "session_year_id"),
+}
+
+
+def new_profile(user, **fields):
+    """
+    An unsaved profile of the right type for ``user``. Course and session year of
+    a student are left empty unless given, so no IDs are hardcoded.
+    """
+    model, accessor, defaults = USER_PROFILES[user.user_type]
+    return model(admin=user, **{**defaults, **fields})
+
+
+def create_profiles(users, batch_size=None, **fields):
+    """
+    Create the profiles of many saved users with one bulk insert per profile type,
+    e.g. after ``CustomUser.objects.bulk_create``, and return them. ``fields`` are
+    set on every profile. Like ``bulk_create``, this sends no signals, so callers
+    refresh what the signal receivers would (rosters, dashboards, search index).
+    """
+    profiles = {}
+    for user in users:
+        profiles.setdefault(USER_PROFILES[user.user_type][0], []).append(new_profile(user, **fields))
+    return [profile for model, batch in profiles.items()
+            for profile in model.objects.bulk_create(batch, batch_size=batch_size)]
+
+
+def profile_values(profile):
+    # Read from __dict__ so deferred fields are not loaded.
+    return tuple(profile.__dict__.get(field) for field in PROFILE_FIELDS[type(profile)])
+
+
+@receiver(post_init, sender=AdminHOD)
+@receiver(post_init, sender=Staff)
+@receiver(post_init, sender=Student)
+@receiver(post_save, sender=AdminHOD)
+@receiver(post_save, sender=Staff)
+@receiver(post_save, sender=Student)
+def remember_profile_values(sender, instance, **kwargs):
+    instance._loaded_profile = profile_values(instance)
+
+
 @receiver(post_save, sender=CustomUser)
-def create_user_profile(sender, instance, created, **kwargs):
+def create_user_profile(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Create the profile of a new user. Saving an existing user also saves changes
+    made through its loaded profile (``user.student.address = ...; user.save()``);
+    a profile that was not loaded or not changed is not written, and neither is
+    one on a ``save(update_fields=...)`` such as the ``last_login`` update of a login.
+    """
+    if instance.user_type not in USER_PROFILES:
+        return
     if created:
-        if instance.user_type == '1':
-            AdminHOD.objects.create(admin=instance)
-        elif instance.user_type == '2':
-            Staff.objects.create(admin=instance, address="")
-        elif instance.user_type == '3':
-            # Avoid hardcoding IDs. It's better to let them be null and set later.
-            # This also prevents errors if Course or SessionYear with ID=1 doesn't exist.
-            Student.objects.create(admin=instance,
-                                   address="", profile_picture="", gender="")
-    else:
-        # If the user is updated, save the related profile
-        try:
-            if instance.user_type == '1':
-                instance.adminhod.save()
-            elif instance.user_type == '2':
-                instance.staff.save()
-            elif instance.user_type == '3':
-                instance.student.save()
-        except:
-            # This can happen if the profile was deleted manually.
-            # In this case, we can re-create it.
-            create_user_profile(sender, instance, created=True, **kwargs)
+        new_profile(instance).save()
+        return
+    if update_fields is not None:
+        return
+    profile = sender._meta.get_field(USER_PROFILES[instance.user_type][1]).get_cached_value(instance, None)
+    if profile is not None and profile_values(profile) != getattr(profile, "_loaded_profile", None):
+        profile.save()
+
+
+@receiver(pre_save, sender=FeedBackStudent)
+@receiver(pre_save, sender=FeedBackStaff)
+def sync_feedback_replied(sender, instance, **kwargs):
+    instance.replied = bool(instance.feedback_reply)
@@ -0,0 +1,104 @@
+"""
+Shared class rosters for the take-attendance page.
+
+A roster is the ``[{"id": <CustomUser id>, "name": ...}, ...]`` list of the students
+of one course and session year. It is built with one joined query and cached under
+a per-(course, session year) version number, so every staff member teaching the
+same cohort reads the same entry. Creating, renaming or moving a student bumps the
+version of the affected rosters, which makes the old entries unreachable.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from student_management_app.models import CustomUser, Student
+
+ROSTER_TIMEOUT = 60 * 60 * 24
+
+
+def roster_version_key(course_id, session_year_id):
+    return f"roster:version:{course_id}:{session_year_id}"
+
+
+def get_roster(course_id, session_year_id):
+    """
+    Return the roster of a course and session year, building it on a cache miss.
+    """
+    version = cache.get_or_set(roster_version_key(course_id, session_year_id), 1, None)
+    key = f"roster:{course_id}:{session_year_id}:{version}"
+    roster = cache.get(key)
+    if roster is None:
+        students = Student.objects.filter(course_id=course_id, session_year_id=session_year_id).order_by("id") \
+            .values_list("admin_id", "admin__first_name", "admin__last_name")
+        roster = [{"id": admin_id, "name": first_name + " " + last_name}
+                  for admin_id, first_name, last_name in students]
+        cache.set(key, roster, ROSTER_TIMEOUT)
+    return roster
+
+
+def bump_roster_version(course_id, session_year_id):
+    """
+    Invalidate the cached roster of a course and session year once the current transaction commits.
+    """
+    if course_id is None or session_year_id is None:
+        return
+    key = roster_version_key(course_id, session_year_id)
+
+    def bump():
+        cache.add(key, 1, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # The version was evicted between add() and incr(); any fresh value invalidates.
+            cache.set(key, 2, None)
+
+    transaction.on_commit(bump)
+
+
+@receiver(post_init, sender=Student)
+def remember_roster(sender, instance, **kwargs):
+    # Keep the roster a student was loaded with, so a transfer invalidates the old one too.
+    instance._loaded_roster = (instance.course_id, instance.session_year_id)
+
+
+@receiver(post_save, sender=Student)
+def invalidate_student_roster(sender, instance, created, **kwargs):
+    current = (instance.course_id, instance.session_year_id)
+    loaded = getattr(instance, "_loaded_roster", (None, None))
+    if created or loaded != current:
+        bump_roster_version(*current)
+        bump_roster_version(*loaded)
+    instance._loaded_roster = current
+
+
+@receiver(post_delete, sender=Student)
+def invalidate_deleted_student_roster(sender, instance, **kwargs):
+    bump_roster_version(instance.course_id, instance.session_year_id)
+
+
+def roster_name(user):
+    # Read from __dict__ so deferred fields are not loaded.
+    return user.__dict__.get("first_name"), user.__dict__.get("last_name")
+
+
+@receiver(post_init, sender=CustomUser)
+def remember_roster_name(sender, instance, **kwargs):
+    instance._loaded_roster_name = roster_name(instance)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_user_roster(sender, instance, created, update_fields=None, **kwargs):
+    # Rosters show the student's name, which lives on CustomUser. Most user saves
+    # (logins, profile and password changes) leave it alone and keep the rosters.
+    if update_fields is not None and not {"first_name", "last_name"} & set(update_fields):
+        return
+    loaded = getattr(instance, "_loaded_roster_name", None)
+    instance._loaded_roster_name = roster_name(instance)
+    if created or instance.user_type != "3" or instance._loaded_roster_name == loaded:
+        return
+    try:
+        student = instance.student
+    except Student.DoesNotExist:
+        return
+    bump_roster_version(student.course_id, student.session_year_id)
@@ -0,0 +1,232 @@
+"""
+In-memory people search for the HOD typeahead.
+
+Every student and staff user is indexed by first name, last name, username and
+email. A query first binary-searches a sorted list of name/username/email tokens
+for users with a word starting with it; queries of three or more characters then
+walk the users listed under their rarest trigram for ones containing it
+elsewhere. Either way a lookup touches a handful of users instead of scanning the
+table.
+
+Each process keeps its own index. It is built in a background thread when the
+process receives its first search (not in AppConfig.ready(), which also runs for
+migrate and the test runner before the database is usable), patched on commit by
+``post_save``/``post_delete`` on CustomUser, and rebuilt in the background once it
+is older than ``INDEX_MAX_AGE`` to pick up writes made by other processes, bulk
+inserts and queryset updates. While it is cold the search falls back to an
+``icontains`` query, and every result says which path served it.
+"""
+import bisect
+import threading
+import time
+from array import array
+from collections import defaultdict
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from student_management_app.models import CustomUser
+
+INDEX_MAX_AGE = 60 * 10
+SEARCH_LIMIT = 10
+SEARCH_USER_TYPES = ("2", "3")
+INDEXED_FIELDS = ("first_name", "last_name", "username", "email")
+
+SERVED_BY_INDEX = "index"
+SERVED_BY_DATABASE = "database"
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def user_entry(user_id, first_name, last_name, username, email, user_type):
+    return {"id": user_id, "name": f"{first_name} {last_name}".strip(), "username": username, "email": email,
+            "user_type": str(user_type)}
+
+
+def user_tokens(entry):
+    return {token for token in (entry["name"].lower().split() + [entry["username"].lower(), entry["email"].lower()])
+            if token}
+
+
+def searchable_text(entry):
+    return "\n".join((entry["name"], entry["username"], entry["email"])).lower()
+
+
+class UserSearchIndex:
+    """
+    Trigram postings and a sorted prefix list over the indexed users.
+
+    Postings are append-only arrays of user ids: updates add the new trigrams and
+    leave stale ids behind, which the substring check on the current text filters
+    out; the periodic rebuild compacts them.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.texts = {}
+        # Unsigned 64-bit, wide enough for BigAutoField ids.
+        self.postings = defaultdict(lambda: array("Q"))
+        self.tokens = []
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls):
+        index = cls()
+        users = CustomUser.objects.filter(user_type__in=SEARCH_USER_TYPES).values_list(
+            "id", "first_name", "last_name", "username", "email", "user_type")
+        for row in users.iterator(chunk_size=5000):
+            index.add(user_entry(*row), sort=False)
+        index.tokens.sort()
+        return index
+
+    def add(self, entry, sort=True):
+        user_id = entry["id"]
+        text = searchable_text(entry)
+        self.entries[user_id] = entry
+        self.texts[user_id] = text
+        for trigram in trigrams(text):
+            self.postings[trigram].append(user_id)
+        for token in user_tokens(entry):
+            if sort:
+                bisect.insort(self.tokens, (token, user_id))
+            else:
+                self.tokens.append((token, user_id))
+
+    def update(self, entry):
+        with self.lock:
+            self.remove(entry["id"])
+            if entry["user_type"] in SEARCH_USER_TYPES:
+                self.add(entry)
+
+    def discard(self, user_id):
+        with self.lock:
+            self.remove(user_id)
+
+    def remove(self, user_id):
+        entry = self.entries.pop(user_id, None)
+        self.texts.pop(user_id, None)
+        if entry is not None:
+            for token in user_tokens(entry):
+                position = bisect.bisect_left(self.tokens, (token, user_id))
+                if position < len(self.tokens) and self.tokens[position] == (token, user_id):
+                    del self.tokens[position]
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """
+        Up to ``limit`` users with a name, username or email starting with ``query``
+        (case-insensitive), in token order, followed for queries of three or more
+        characters by users that contain it elsewhere. Both scans stop as soon as
+        enough users are found, so common queries cost as little as rare ones.
+        """
+        query = query.lower()
+        found = []
+        seen = set()
+        with self.lock:
+            position = bisect.bisect_left(self.tokens, (query,))
+            while len(found) < limit and position < len(self.tokens) \
+                    and self.tokens[position][0].startswith(query):
+                user_id = self.tokens[position][1]
+                if user_id not in seen:
+                    seen.add(user_id)
+                    found.append(user_id)
+                position += 1
+
+            if len(found) < limit and len(query) >= 3:
+                postings = [self.postings.get(trigram) for trigram in trigrams(query)]
+                if all(postings):
+                    for user_id in min(postings, key=len):
+                        if user_id not in seen and query in self.texts.get(user_id, ""):
+                            seen.add(user_id)
+                            found.append(user_id)
+                            if len(found) == limit:
+                                break
+            return [self.entries[user_id] for user_id in found]
+
+
+_index = None
+_building = threading.Lock()
+
+
+def build_in_background():
+    """
+    Start building a fresh index unless a build is already running; the current
+    index, if any, keeps serving until the new one replaces it.
+    """
+    if not _building.acquire(blocking=False):
+        return
+
+    def run():
+        global _index
+        try:
+            _index = UserSearchIndex.build()
+        except DatabaseError:
+            # The tables may not exist yet (e.g. before migrate); stay cold.
+            pass
+        finally:
+            connection.close()
+            _building.release()
+
+    threading.Thread(target=run, name="user-search-index", daemon=True).start()
+
+
+def database_search(query, limit=SEARCH_LIMIT):
+    condition = Q()
+    for field in INDEXED_FIELDS:
+        condition |= Q(**{f"{field}__icontains": query})
+    users = CustomUser.objects.filter(condition, user_type__in=SEARCH_USER_TYPES).order_by("username") \
+        .values_list("id", "first_name", "last_name", "username", "email", "user_type")[:limit]
+    return [user_entry(*row) for row in users]
+
+
+def search_users(query, limit=SEARCH_LIMIT):
+    """
+    Return ``(results, served_by)``: from the index when it is warm, otherwise from
+    the database while the index is (re)built in the background.
+    """
+    index = _index
+    if index is None or time.monotonic() - index.built_at > INDEX_MAX_AGE:
+        build_in_background()
+    if index is None:
+        return database_search(query, limit), SERVED_BY_DATABASE
+    return index.search(query, limit), SERVED_BY_INDEX
+
+
+def index_created_users(users):
+    """
+    Add users created with ``bulk_create``, which sends no ``post_save``, to the
+    warm index once the current transaction commits.
+    """
+    index = _index
+    if index is None:
+        return
+    entries = [user_entry(user.id, user.first_name, user.last_name, user.username, user.email, user.user_type)
+               for user in users]
+
+    def add():
+        for entry in entries:
+            index.update(entry)
+
+    transaction.on_commit(add)
+
+
+@receiver(post_save, sender=CustomUser)
+def index_saved_user(sender, instance, update_fields=None, **kwargs):
+    index = _index
+    if index is None or (update_fields is not None and not set(update_fields) & set(INDEXED_FIELDS)):
+        return
+    entry = user_entry(instance.id, instance.first_name, instance.last_name, instance.username, instance.email,
+                       instance.user_type)
+    transaction.on_commit(lambda: index.update(entry))
+
+
+@receiver(post_delete, sender=CustomUser)
+def unindex_deleted_user(sender, instance, **kwargs):
+    index = _index
+    if index is not None:
+        user_id = instance.id
+        transaction.on_commit(lambda: index.discard(user_id))
@@ -0,0 +1,165 @@
+"""
+Cached per-staff dashboard snapshots for the staff home page.
+
+A snapshot is the context built by ``staffViews.staff_home_data`` plus the
+``subject_ids`` and ``student_ids`` its chart series are ordered by. Saving or
+correcting attendance patches the snapshots it affects in place on commit: the
+teacher of the subject gets the new meeting counted, and every staff member
+teaching in the subject's course gets the students' present/absent totals moved.
+A page view is then a single cache read. Changes that alter the shape of a
+snapshot (subjects, enrolments, student names, leaves, deleted meetings) drop
+the affected snapshots instead, and the next visit rebuilds them.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from student_management_app.dashboardCache import DASHBOARD_TIMEOUT, RECOMPUTE_LOCK_TIMEOUT
+from student_management_app.models import Attendance, CustomUser, LeaveReportStaff, Staff, Student, Subject
+
+
+def staff_home_key(staff_user_id):
+    return f"dashboard:staff_home:{staff_user_id}"
+
+
+def get_staff_home(staff_user, build, fresh=False):
+    """
+    Return the snapshot entry of ``staff_user``, ``{"data", "built_at", "build_ms"}``,
+    and whether it was rebuilt. ``build(staff_user)`` is called on a miss or, with
+    ``fresh``, unconditionally.
+    """
+    key = staff_home_key(staff_user.id)
+    entry = None if fresh else cache.get(key)
+    if entry is not None:
+        return entry, False
+
+    started = time.perf_counter()
+    data = build(staff_user)
+    entry = {"data": data, "built_at": timezone.now(), "build_ms": (time.perf_counter() - started) * 1000}
+    cache.set(key, entry, DASHBOARD_TIMEOUT)
+    return entry, True
+
+
+def invalidate_staff_home(staff_user_ids):
+    """
+    Drop the snapshots of the given staff users once the current transaction commits.
+    """
+    keys = [staff_home_key(staff_user_id) for staff_user_id in set(staff_user_ids) if staff_user_id is not None]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def course_staff_ids(course_ids):
+    return Subject.objects.filter(course_id__in=course_ids).values_list("staff_id", flat=True).distinct()
+
+
+def patch_snapshot(data, subject_id, deltas, new_meeting):
+    """
+    Apply attendance changes of one subject to a snapshot's data in place.
+    """
+    if new_meeting and subject_id in data["subject_ids"]:
+        data["attendance_count"] += 1
+        data["data1"][data["subject_ids"].index(subject_id)] += 1
+    positions = {student_id: i for i, student_id in enumerate(data["student_ids"])}
+    for student_id, (present, absent) in deltas.items():
+        position = positions.get(student_id)
+        if position is not None:
+            data["present_list"][position] += present
+            data["absent_list"][position] += absent
+
+
+def refresh_staff_home(attendance, deltas, new_meeting=False):
+    """
+    Patch the snapshots affected by a save (``new_meeting``) or correction of
+    ``attendance`` once the current transaction commits. ``deltas`` maps student
+    ids to the ``(present, absent)`` changes recorded in the counters.
+    """
+    subject_id = attendance.subject_id
+
+    def patch():
+        course_ids = Subject.objects.filter(id=subject_id).values("course_id")
+        for staff_user_id in course_staff_ids(course_ids):
+            key = staff_home_key(staff_user_id)
+            if not cache.add(f"{key}:lock", 1, RECOMPUTE_LOCK_TIMEOUT):
+                # Another save is patching this snapshot from an older read. Mark it dirty so
+                # the lock holder drops its write-back too, and the next visit rebuilds.
+                cache.set(f"{key}:dirty", 1, RECOMPUTE_LOCK_TIMEOUT)
+                cache.delete(key)
+                continue
+            try:
+                entry = cache.get(key)
+                if entry is not None:
+                    patch_snapshot(entry["data"], subject_id, deltas, new_meeting)
+                    cache.set(key, entry, DASHBOARD_TIMEOUT)
+                # Checked after the write, so a save that lost the lock at any point before
+                # the release cannot leave this snapshot in place without its deltas.
+                if cache.get(f"{key}:dirty") is not None:
+                    cache.delete_many([key, f"{key}:dirty"])
+            finally:
+                cache.delete(f"{key}:lock")
+
+    if deltas or new_meeting:
+        transaction.on_commit(patch)
+
+
+@receiver(post_init, sender=Subject)
+def remember_subject_owner(sender, instance, **kwargs):
+    instance._loaded_owner = (instance.staff_id, instance.course_id)
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_subject_staff(sender, instance, **kwargs):
+    staff_id, course_id = getattr(instance, "_loaded_owner", (None, None))
+    invalidate_staff_home([instance.staff_id, staff_id])
+    # Other teachers of the course see the subject's students; a moved subject changes them.
+    if course_id != instance.course_id:
+        invalidate_staff_home(course_staff_ids([course_id, instance.course_id]))
+    instance._loaded_owner = (instance.staff_id, instance.course_id)
+
+
+@receiver(post_init, sender=Student)
+def remember_student_course(sender, instance, **kwargs):
+    instance._loaded_course = instance.course_id
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def invalidate_student_staff(sender, instance, created=False, **kwargs):
+    loaded = getattr(instance, "_loaded_course", None)
+    if created or kwargs["signal"] is post_delete or loaded != instance.course_id:
+        invalidate_staff_home(course_staff_ids([loaded, instance.course_id]))
+    instance._loaded_course = instance.course_id
+
+
+@receiver(post_init, sender=CustomUser)
+def remember_username(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred username is not loaded.
+    instance._loaded_username = instance.__dict__.get("username")
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_student_name_staff(sender, instance, created, update_fields=None, **kwargs):
+    # The student chart is labelled with usernames; other user saves leave the snapshots alone.
+    if update_fields is not None and "username" not in update_fields:
+        return
+    loaded = getattr(instance, "_loaded_username", None)
+    instance._loaded_username = instance.__dict__.get("username")
+    if created or instance.user_type != "3" or instance._loaded_username == loaded:
+        return
+    invalidate_staff_home(course_staff_ids(Student.objects.filter(admin=instance).values("course_id")))
+
+
+@receiver(post_save, sender=LeaveReportStaff)
+@receiver(post_delete, sender=LeaveReportStaff)
+def invalidate_leave_staff(sender, instance, **kwargs):
+    invalidate_staff_home(Staff.objects.filter(id=instance.staff_id).values_list("admin_id", flat=True))
+
+
+@receiver(post_delete, sender=Attendance)
+def invalidate_attendance_staff(sender, instance, **kwargs):
+    invalidate_staff_home(course_staff_ids(Subject.objects.filter(id=instance.subject_id).values("course_id")))
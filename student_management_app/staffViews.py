@@ -1,30 +1,38 @@
+import datetime
 import json
 
 from django.contrib import messages
-from django.core import serializers
-from django.db.models import Count, Q
-from django.http import HttpResponse, JsonResponse, HttpResponseRedirect
+from django.http import JsonResponse, HttpResponseRedirect
 from django.shortcuts import render
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 
-from student_management_app.models import Subject, SessionYear, Student, Attendance, AttendanceReport, Staff, \
-    LeaveReportStaff, FeedBackStaff, CustomUser
+from student_management_app.aggregates import related_count
+from student_management_app.attendanceCounters import student_totals
+from student_management_app.attendanceResponses import meeting_dates_response, meeting_report_response
+from student_management_app.attendanceService import save_attendance, update_attendance
+from student_management_app.leaveService import drop_excused_absences, format_leave_range, parse_leave_day, \
+    read_leave_range, students_on_leave, without_excused_absences
+from student_management_app.models import Subject, SessionYear, Student, Attendance, LeaveReportStaff, \
+    FeedBackStaff
+from student_management_app.rosterCache import get_roster
+from student_management_app.staffHomeCache import get_staff_home
 
 
-def staff_home(request):
+def staff_home_data(staff_user):
     """
-    This view gathers all the necessary statistics for the staff dashboard.
+    This gathers all the necessary statistics for the staff dashboard. Besides the
+    template context it returns the ``subject_ids`` and ``student_ids`` the chart
+    series are ordered by, which staffHomeCache uses to patch the cached copy.
     """
     # --- Core Data Fetching ---
-    # Get the staff object and all subjects they teach
-    staff_user = Staff.objects.get(admin=request.user)
-    subjects = Subject.objects.filter(staff_id=request.user)
+    # Get all subjects they teach
+    subjects = Subject.objects.filter(staff_id=staff_user).order_by('id')
 
     # --- Dashboard Card Statistics ---
     subject_count = subjects.count()
     attendance_count = Attendance.objects.filter(subject_id__in=subjects).count()
-    leave_count = LeaveReportStaff.objects.filter(staff_id=staff_user, leave_status=1).count()
+    leave_count = LeaveReportStaff.objects.filter(staff__admin=staff_user, leave_status=1).count()
 
     # Get unique students taught by this staff
     course_ids = subjects.values_list('course_id', flat=True).distinct()
@@ -32,28 +40,28 @@ def staff_home(request):
 
     # --- "Attend Subject" Bar Chart Data ---
     # Get attendance count per subject in a single query
-    subject_attendance = subjects.annotate(attendance_count=Count('attendance')).values_list('subject_name',
-                                                                                             'attendance_count')
-    subject_names = [item[0] for item in subject_attendance]
-    subject_attendance_counts = [item[1] for item in subject_attendance]
+    subject_attendance = subjects.annotate(
+        attendance_count=related_count(Attendance.objects, 'subject')
+    ).values_list('id', 'subject_name', 'attendance_count')
+    subject_ids = [item[0] for item in subject_attendance]
+    subject_names = [item[1] for item in subject_attendance]
+    subject_attendance_counts = [item[2] for item in subject_attendance]
 
     # --- "Student attendance data" Bar Chart Data ---
     # Get all students in the courses taught by the staff
     students_in_courses = Student.objects.filter(course_id__in=course_ids).select_related('admin').order_by(
-        'admin__first_name')
+        'admin__first_name', 'id')
 
-    # Get present/absent counts for each student in a single query
-    student_attendance_data = students_in_courses.annotate(
-        present_count=Count('attendancereport', filter=Q(attendancereport__status=True)),
-        absent_count=Count('attendancereport', filter=Q(attendancereport__status=False))
-    ).values('admin__username', 'present_count', 'absent_count')
+    # Present/absent totals for each student, read from the precomputed counters
+    student_attendance_data = students_in_courses.values('id', 'admin__username')
+    attendance_totals = student_totals(students_in_courses)
 
+    student_ids = [item['id'] for item in student_attendance_data]
     student_names_list = [item['admin__username'] for item in student_attendance_data]
-    present_counts_list = [item['present_count'] for item in student_attendance_data]
-    absent_counts_list = [item['absent_count'] for item in student_attendance_data]
+    present_counts_list = [attendance_totals.get(item['id'], (0, 0))[0] for item in student_attendance_data]
+    absent_counts_list = [attendance_totals.get(item['id'], (0, 0))[1] for item in student_attendance_data]
 
-    # --- Prepare Context for Template ---
-    context = {
+    return {
         # Card stats
         "student_count": student_count,
         "attendance_count": attendance_count,
@@ -62,12 +70,28 @@ def staff_home(request):
         # "Attend Subject" chart
         "data1": subject_attendance_counts,
         "data_name": subject_names,
+        "subject_ids": subject_ids,
         # "Student attendance data" chart
         "student_list": student_names_list,
         "present_list": present_counts_list,
         "absent_list": absent_counts_list,
+        "student_ids": student_ids,
     }
-    return render(request, "staff_template/staff_home_template.html", context)
+
+
+def staff_home(request):
+    """
+    The staff dashboard, served from the per-staff snapshot. ``?fresh=1`` rebuilds it
+    from the database; the rebuild time is reported in the Server-Timing header.
+    """
+    entry, rebuilt = get_staff_home(request.user, staff_home_data, fresh=request.GET.get("fresh") == "1")
+    response = render(request, "staff_template/staff_home_template.html", entry["data"])
+    if rebuilt:
+        response["Server-Timing"] = f'recompute;dur={entry["build_ms"]:.1f}'
+    else:
+        response["Server-Timing"] = (f'cache;desc="built {entry["built_at"].isoformat()}, '
+                                     f'took {entry["build_ms"]:.1f}ms"')
+    return response
 
 
 def staff_take_attendance(request):
@@ -83,15 +107,13 @@ def get_students(request):
     session_year = request.POST.get('session_year')
 
     subject = Subject.objects.get(id=subject_id)
-    session_model = SessionYear.objects.get(id=session_year)
-    students = Student.objects.filter(course_id=subject.course_id, session_year_id=session_model)
-    student_data = serializers.serialize("python", students)
-    list_data = []
-
-    for student in students:
-        data_small = {"id": student.admin.id, "name": student.admin.first_name + " " + student.admin.last_name}
-        list_data.append(data_small)
-    return JsonResponse(json.dumps(list_data), content_type="application/json", safe=False)
+    # Shared by every staff member teaching this course and session year; see rosterCache.
+    roster = get_roster(subject.course_id, int(session_year))
+    # Students on approved leave on the attendance date (today until one is picked) are excused.
+    attendance_date = parse_leave_day(request.POST.get("attendance_date") or "") or datetime.date.today()
+    excused = students_on_leave(attendance_date, subject.course_id, int(session_year))
+    list_data = [{**student, "excused": student["id"] in excused} for student in roster]
+    return JsonResponse(list_data, safe=False)
 
 
 @csrf_exempt
@@ -101,23 +123,18 @@ def save_attendance_data(request):
     attendance_date = request.POST.get("attendance_date")
     session_year_id = request.POST.get("session_year_id")
 
-    subject_model = Subject.objects.get(id=subject_id)
-    session_model = SessionYear.objects.get(id=session_year_id)
-    json_student = json.loads(student_ids)
-
     try:
-        attendance = Attendance(subject_id=subject_model, attendance_date=attendance_date,
-                                session_year_id=session_model)
-        attendance.save()
+        subject_model = Subject.objects.get(id=subject_id)
+        session_model = SessionYear.objects.get(id=session_year_id)
+        json_student = without_excused_absences(json.loads(student_ids), parse_leave_day(attendance_date or ""),
+                                                subject_model.course_id, session_model.id)
 
-        for stud in json_student:
-            student = Student.objects.get(admin=stud['id'])
-            attendance_report = AttendanceReport(student_id=student, attendance_id=attendance, status=stud['status'])
-            attendance_report.save()
-        return HttpResponse("OK")
+        # All reports are written in one transaction with a batched insert; see attendanceService.
+        result = save_attendance(subject_model, session_model, attendance_date, json_student)
+        return JsonResponse({"status": "OK", **result})
 
-    except:
-        return HttpResponse("Error")
+    except Exception as e:
+        return JsonResponse({"status": "Error", "message": str(e)}, status=400)
 
 
 def staff_update_attendance(request):
@@ -129,18 +146,8 @@ def staff_update_attendance(request):
 
 @csrf_exempt
 def get_attendance_dates(request):
-    subject = request.POST.get("subject")
-    session_year_id = request.POST.get("session_year_id")
-    subject_obj = Subject.objects.get(id=subject)
-    session_year_obj = SessionYear.objects.get(id=session_year_id)
-    attendance = Attendance.objects.filter(subject_id=subject_obj, session_year_id=session_year_obj)
-    attendance_obj = []
-    for attendance_single in attendance:
-        data = {"id": attendance_single.id, "attendance_date": str(attendance_single.attendance_date),
-                "session_year_id": attendance_single.session_year_id.id}
-        attendance_obj.append(data)
-
-    return JsonResponse(json.dumps(attendance_obj), safe=False)
+    # Read from attendance_subject_session_idx alone; see attendanceResponses.
+    return meeting_dates_response(request)
 
 
 @csrf_exempt
@@ -148,40 +155,32 @@ def get_student_attendance(request):
     attendance_date = request.POST.get("attendance_date")
     attendance = Attendance.objects.get(id=attendance_date)
 
-    attendance_date = AttendanceReport.objects.filter(attendance_id=attendance)
-    list_data = []
-
-    for student in attendance_date:
-        data_small = {"id": student.student_id.admin.id,
-                      "name": student.student_id.admin.first_name + " " + student.student_id.admin.last_name,
-                      "status": student.status}
-        list_data.append(data_small)
-    return JsonResponse(json.dumps(list_data), content_type="application/json", safe=False)
+    # One joined query, streamed as a JSON array (or the compact format); see attendanceResponses.
+    return meeting_report_response(request, attendance)
 
 
 @csrf_exempt
 def save_update_attendance_data(request):
     student_ids = request.POST.get("student_ids")
     attendance_date = request.POST.get("attendance_date")
-    attendance = Attendance.objects.get(id=attendance_date)
-
-    json_student = json.loads(student_ids)
 
     try:
-        for stud in json_student:
-            student = Student.objects.get(admin=stud['id'])
-            attendance_report = AttendanceReport.objects.get(student_id=student, attendance_id=attendance)
-            attendance_report.status = stud['status']
-            attendance_report.save()
-        return HttpResponse("OK")
+        attendance = Attendance.objects.select_related("subject").get(id=attendance_date)
+        excused = students_on_leave(attendance.attendance_date, attendance.subject.course_id,
+                                    attendance.session_year_id)
+        json_student = drop_excused_absences(json.loads(student_ids), excused)
+
+        # Only changed rows are written, and absences stored before a leave was approved are
+        # removed; see attendanceService.update_attendance.
+        result = update_attendance(attendance, json_student, excused)
+        return JsonResponse({"status": "OK", **result})
 
-    except:
-        return HttpResponse("Error")
+    except Exception as e:
+        return JsonResponse({"status": "Error", "message": str(e)}, status=400)
 
 
 def staff_apply_leave(request):
-    staff_obj = Staff.objects.get(admin=request.user)
-    leave_data = LeaveReportStaff.objects.filter(staff_id=staff_obj)
+    leave_data = LeaveReportStaff.objects.filter(staff=request.profile)
     return render(request, "staff_template/staff_apply_leave_template.html", {"leave_data": leave_data})
 
 
@@ -189,13 +188,15 @@ def staff_apply_leave_save(request):
     if request.method != "POST":
         return HttpResponseRedirect(reverse("staff_apply_leave"))
     else:
-        leave_date = request.POST.get("leave_date")
         leave_message = request.POST.get("leave_message")
 
-        staff_obj = Staff.objects.get(admin=request.user)
+        staff_obj = request.profile
         try:
-            leave_report = LeaveReportStaff(staff_id=staff_obj, leave_date=leave_date, leave_message=leave_message,
-                                            leave_status=0)
+            leave_start_date, leave_end_date = read_leave_range(request.POST)
+            leave_report = LeaveReportStaff(staff=staff_obj,
+                                            leave_date=format_leave_range(leave_start_date, leave_end_date),
+                                            leave_start_date=leave_start_date, leave_end_date=leave_end_date,
+                                            leave_message=leave_message, leave_status=0)
             leave_report.save()
             messages.success(request, "Successfully Applied for Leave")
             return HttpResponseRedirect(reverse("staff_apply_leave"))
@@ -205,8 +206,7 @@ def staff_apply_leave_save(request):
 
 
 def staff_feedback(request):
-    staff_id = Staff.objects.get(admin=request.user)
-    feedback_data = FeedBackStaff.objects.filter(staff_id=staff_id)
+    feedback_data = FeedBackStaff.objects.filter(staff=request.profile)
     return render(request, "staff_template/staff_feedback_template.html", {"feedback_data": feedback_data})
 
 
@@ -216,9 +216,9 @@ def staff_feedback_save(request):
     else:
         feedback_message = request.POST.get("feedback_message")
 
-        staff_obj = Staff.objects.get(admin=request.user.id)
+        staff_obj = request.profile
         try:
-            feedback = FeedBackStaff(staff_id=staff_obj, feedback=feedback_message, feedback_reply="")
+            feedback = FeedBackStaff(staff=staff_obj, feedback=feedback_message, feedback_reply="")
             feedback.save()
             messages.success(request, "Successfully Sent Feedback")
             return HttpResponseRedirect(reverse("staff_feedback"))
@@ -232,9 +232,8 @@ def staff_add_result(request):
 
 
 def staff_profile(request):
-    user = CustomUser.objects.get(id=request.user.id)
-    staff = Staff.objects.get(admin=user)
-    return render(request, "staff_template/staff_profile_template.html", {"user": user, "staff": staff})
+    return render(request, "staff_template/staff_profile_template.html",
+                  {"user": request.user, "staff": request.profile})
 
 
 def staff_profile_save(request):
@@ -247,7 +246,8 @@ def staff_profile_save(request):
         password = request.POST.get("password")
 
         try:
-            customuser = CustomUser.objects.get(id=request.user.id)
+            staff = request.profile
+            customuser = request.user
             customuser.first_name = first_name
             customuser.last_name = last_name
 
@@ -255,7 +255,6 @@ def staff_profile_save(request):
                 customuser.set_password(password)
             customuser.save()
 
-            staff = Staff.objects.get(admin=request.user)
             staff.address = address
             staff.save()
             messages.success(request, "Successfully Edited Profile")
@@ -0,0 +1,287 @@
+"""
+Bulk enrolment of students from a CSV or XLSX file.
+
+Rows are read one at a time and validated with the AddStudentForm rules
+(``ImportStudentForm``); courses and session years may be given by id or name.
+Valid rows are imported in chunks: the emails and usernames already taken are
+looked up with one query each, the passwords are hashed across a process pool,
+and the users and their Student profiles are inserted with one bulk insert each
+in a transaction per chunk. A row that fails validation, clashes with an existing
+account or fails to insert is reported with its line number; the rest of the
+file is still imported.
+
+``bulk_create`` sends no signals, so the caches their receivers maintain are
+refreshed here: the rosters of the affected courses, the admin dashboard, the
+staff home snapshots of the courses' teachers and the user search index.
+
+Password hashing dominates the cost (PBKDF2 takes a few hundred milliseconds per
+password and core). A row with an empty password gets an unusable one, which
+costs nothing; the student sets a password through the password reset page.
+"""
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from student_management_app.dashboardCache import invalidate_for_model
+from student_management_app.forms import ImportStudentForm
+from student_management_app.models import Courses, CustomUser, SessionYear, Student, new_profile
+from student_management_app.rosterCache import bump_roster_version
+from student_management_app.searchIndex import index_created_users
+from student_management_app.staffHomeCache import course_staff_ids, invalidate_staff_home
+
+try:
+    import openpyxl
+except ImportError:  # Only needed for .xlsx files.
+    openpyxl = None
+
+IMPORT_COLUMNS = ("email", "password", "first_name", "last_name", "username", "address", "course", "sex",
+                  "session_year")
+REQUIRED_COLUMNS = frozenset(IMPORT_COLUMNS) - {"password"}
+IMPORT_CHUNK_SIZE = 1000
+# Uploads larger than this are rejected by the HOD upload page.
+MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+
+
+def check_header(header):
+    missing = REQUIRED_COLUMNS - set(header)
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
+
+
+def read_csv(file):
+    reader = csv.reader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    header = [column.strip().lower() for column in next(reader, [])]
+    check_header(header)
+    for values in reader:
+        yield {column: value.strip() for column, value in zip(header, values)}
+
+
+def cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def read_xlsx(file):
+    if openpyxl is None:
+        raise ValueError("Reading .xlsx files needs openpyxl (pip install openpyxl); upload a .csv file instead")
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [cell_text(value).lower() for value in next(rows, ())]
+        check_header(header)
+        for values in rows:
+            yield {column: cell_text(value) for column, value in zip(header, values)}
+    finally:
+        workbook.close()
+
+
+def read_rows(file, name):
+    """
+    Rows of the binary ``file`` as dicts keyed by lower-cased column name, read
+    lazily. ``name`` selects the format by extension. Raises ValueError for an
+    unsupported file or missing columns.
+    """
+    extension = os.path.splitext(name)[1].lower()
+    if extension == ".csv":
+        return read_csv(file)
+    if extension == ".xlsx":
+        return read_xlsx(file)
+    raise ValueError(f"Unsupported file type {extension or name!r}, expected .csv or .xlsx")
+
+
+def choice_lookup(objects):
+    """
+    Form choices for ``objects`` and a map from their id or lower-cased name to the choice value.
+    """
+    choices, lookup = [], {}
+    for obj in objects:
+        value = str(obj.id)
+        choices.append((value, str(obj)))
+        lookup[value] = value
+        lookup.setdefault(str(obj).lower(), value)
+    return choices, lookup
+
+
+def form_errors(form):
+    return "; ".join(f"{form.fields[field].label if field in form.fields else field}: {' '.join(messages)}"
+                     for field, messages in form.errors.items())
+
+
+def setup_worker():
+    # Spawned workers (macOS, Windows) start without configured settings.
+    django.setup()
+
+
+def hash_passwords(passwords, executor=None):
+    """
+    Hash ``passwords`` in order, across ``executor``'s processes if given. Empty
+    passwords become unusable ones.
+    """
+    to_hash = [password for password in passwords if password]
+    if executor is not None and len(to_hash) > 1:
+        hashed = iter(executor.map(make_password, to_hash, chunksize=max(1, len(to_hash) // 64)))
+    else:
+        hashed = iter(map(make_password, to_hash))
+    return [next(hashed) if password else make_password(None) for password in passwords]
+
+
+def refresh_caches(users, students):
+    """
+    Do what the signal receivers would have done for the bulk-created rows.
+    """
+    for course_id, session_year_id in {(student.course_id, student.session_year_id) for student in students}:
+        bump_roster_version(course_id, session_year_id)
+    invalidate_for_model(Student)
+    invalidate_for_model(CustomUser)
+    invalidate_staff_home(course_staff_ids({student.course_id for student in students}))
+    index_created_users(users)
+
+
+def insert_students(rows, hashes):
+    """
+    Insert the users and Student profiles of validated ``rows`` with one bulk insert each.
+    """
+    users = CustomUser.objects.bulk_create([
+        CustomUser(username=row["username"], email=row["email"], first_name=row["first_name"],
+                   last_name=row["last_name"], password=password, user_type="3")
+        for row, password in zip(rows, hashes)])
+    if any(user.pk is None for user in users):
+        # Backends such as MySQL do not return the ids of bulk inserted rows.
+        ids = dict(CustomUser.objects.filter(username__in=[user.username for user in users])
+                   .values_list("username", "id"))
+        for user in users:
+            user.pk = ids[user.username]
+            user._state.adding = False
+    students = Student.objects.bulk_create([
+        new_profile(user, address=row["address"], gender=row["sex"], course_id=row["course"],
+                    session_year_id=row["session_year_id"])
+        for user, row in zip(users, rows)])
+    refresh_caches(users, students)
+    return users
+
+
+class StudentImport:
+    """
+    One import run. ``run(rows)`` returns ``{"rows", "created", "errors"}`` with
+    ``errors`` a list of ``(line, message)``; ``progress(result)``, if given, is
+    called after every chunk.
+    """
+
+    def __init__(self, chunk_size=IMPORT_CHUNK_SIZE, workers=None, dry_run=False, progress=None):
+        self.chunk_size = chunk_size
+        self.workers = os.cpu_count() if workers is None else workers
+        self.dry_run = dry_run
+        self.progress = progress
+        self.result = {"rows": 0, "created": 0, "errors": []}
+        self.course_choices, self.courses = choice_lookup(Courses.objects.order_by("id"))
+        self.session_year_choices, self.session_years = choice_lookup(SessionYear.objects.order_by("id"))
+        self.seen_emails = set()
+        self.seen_usernames = set()
+        self.executor = None
+
+    def run(self, rows):
+        if self.workers > 1 and not self.dry_run:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=setup_worker)
+        try:
+            chunk = []
+            # Line 1 is the header.
+            for line, row in enumerate(rows, start=2):
+                self.result["rows"] += 1
+                cleaned = self.validate(line, row)
+                if cleaned is not None:
+                    chunk.append((line, cleaned))
+                if len(chunk) == self.chunk_size:
+                    self.import_chunk(chunk)
+                    chunk = []
+            if chunk:
+                self.import_chunk(chunk)
+            # Clashes found per chunk come after later validation errors.
+            self.result["errors"].sort()
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+        return self.result
+
+    def error(self, line, message):
+        self.result["errors"].append((line, message))
+
+    def validate(self, line, row):
+        if not any(row.values()):
+            self.result["rows"] -= 1
+            return None
+        data = {column: row.get(column, "") for column in IMPORT_COLUMNS}
+        data["course"] = self.courses.get(data["course"].lower(), data["course"])
+        session_year = data.pop("session_year")
+        data["session_year_id"] = self.session_years.get(session_year.lower(), session_year)
+        form = ImportStudentForm(data, course_choices=self.course_choices,
+                                 session_year_choices=self.session_year_choices)
+        if not form.is_valid():
+            self.error(line, form_errors(form))
+            return None
+        cleaned = form.cleaned_data
+        if cleaned["email"].lower() in self.seen_emails:
+            self.error(line, f"Email: {cleaned['email']} appears earlier in the file")
+            return None
+        if cleaned["username"] in self.seen_usernames:
+            self.error(line, f"Username: {cleaned['username']} appears earlier in the file")
+            return None
+        self.seen_emails.add(cleaned["email"].lower())
+        self.seen_usernames.add(cleaned["username"])
+        return cleaned
+
+    def available_rows(self, chunk):
+        """
+        The rows of ``chunk`` whose email and username are not taken yet; the others are reported.
+        """
+        # Emails are unique regardless of case.
+        taken_emails = set(CustomUser.objects.annotate(email_lower=Lower("email"))
+                           .filter(email_lower__in=[row["email"].lower() for line, row in chunk])
+                           .values_list("email_lower", flat=True))
+        taken_usernames = set(CustomUser.objects.filter(username__in=[row["username"] for line, row in chunk])
+                              .values_list("username", flat=True))
+        rows = []
+        for line, row in chunk:
+            if row["email"].lower() in taken_emails:
+                self.error(line, f"Email: {row['email']} is already in use")
+            elif row["username"] in taken_usernames:
+                self.error(line, f"Username: {row['username']} is already in use")
+            else:
+                rows.append((line, row))
+        return rows
+
+    def insert_rows(self, rows):
+        hashes = hash_passwords([row["password"] for line, row in rows], self.executor)
+        try:
+            with transaction.atomic():
+                insert_students([row for line, row in rows], hashes)
+            self.result["created"] += len(rows)
+        except IntegrityError:
+            # Someone took an email or username since the check; retry row by row to find it.
+            self.insert_rows_one_by_one(rows, hashes)
+
+    def insert_rows_one_by_one(self, rows, hashes):
+        for (line, row), password in zip(rows, hashes):
+            try:
+                with transaction.atomic():
+                    insert_students([row], [password])
+                self.result["created"] += 1
+            except IntegrityError as e:
+                self.error(line, str(e))
+
+    def import_chunk(self, chunk):
+        rows = self.available_rows(chunk)
+        if self.dry_run:
+            self.result["created"] += len(rows)
+        elif rows:
+            self.insert_rows(rows)
+        if self.progress is not None:
+            self.progress(self.result)
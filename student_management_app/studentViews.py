@@ -1,56 +1,53 @@
 import datetime
 
 from django.contrib import messages
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
 from django.http import HttpResponseRedirect
 from django.shortcuts import render
 from django.urls import reverse
 
-from student_management_app.models import Subject, Student, CustomUser, Attendance, AttendanceReport, \
-    LeaveReportStudent, FeedBackStudent, Courses
+from student_management_app.attendanceStore import student_statuses
+from student_management_app.dashboardCache import get_student_home
+from student_management_app.leaveService import format_leave_range, read_leave_range
+from student_management_app.models import Subject, Attendance, LeaveReportStudent, FeedBackStudent
+from student_management_app.userProfile import request_profile
+
+
+def student_home_data(student):
+    """
+    Attendance numbers for the student dashboard. The subjects of the student's
+    course and this student's counters for each of them come from one grouped query.
+    """
+    subject_data = Subject.objects.filter(course_id=student.course_id).order_by("id").annotate(
+        present=Coalesce(Sum("attendancecounter__present_count", filter=Q(attendancecounter__student=student)), 0),
+        absent=Coalesce(Sum("attendancecounter__absent_count", filter=Q(attendancecounter__student=student)), 0),
+    ).values_list("subject_name", "present", "absent")
+
+    subject_name = [name for name, present, absent in subject_data]
+    data_present = [present for name, present, absent in subject_data]
+    data_absent = [absent for name, present, absent in subject_data]
+    return {"total_attendance": sum(data_present) + sum(data_absent), "absent_attendance": sum(data_absent),
+            "present_attendance": sum(data_present), "subjects": len(subject_name), "data1": data_present,
+            "data2": data_absent, "data_name": subject_name}
 
 
 def student_home(request):
-    user = CustomUser.objects.get(id=request.user.id)
-    student = Student.objects.get(admin=user)
-
-    student_obj = Student.objects.get(admin=request.user.id)
-    attendance_total = AttendanceReport.objects.filter(student_id=student_obj).count()
-    attendance_present = AttendanceReport.objects.filter(student_id=student_obj, status=True).count()
-    attendance_absent = AttendanceReport.objects.filter(student_id=student_obj, status=False).count()
-    course = Courses.objects.get(id=student_obj.course_id.id)
-    subjects = Subject.objects.filter(course_id=course).count()
-
-    subject_name = []
-    data_present = []
-    data_absent = []
-    subject_data = Subject.objects.filter(course_id=student_obj.course_id)
-    for subject in subject_data:
-        attendance = Attendance.objects.filter(subject_id=subject.id)
-        attendance_present_count = AttendanceReport.objects.filter(attendance_id__in=attendance, status=True).count()
-        attendance_absent_count = AttendanceReport.objects.filter(attendance_id__in=attendance, status=False).count()
-        subject_name.append(subject.subject_name)
-        data_present.append(attendance_present_count)
-        data_absent.append(attendance_absent_count)
-
-    context = {"total_attendance": attendance_total, "absent_attendance": attendance_absent,
-               "present_attendance": attendance_present, "subjects": subjects, "data1": data_present,
-               "data2": data_absent, "data_name": subject_name, "student": student}
+    student = request.profile
+    # Cached per student; see dashboardCache for what invalidates it.
+    context = {**get_student_home(student, student_home_data), "student": student}
     return render(request, "student_template/student_home_template.html", context)
 
 
 def student_view_attendance(request):
-    user = CustomUser.objects.get(id=request.user.id)
-    student = Student.objects.get(admin=user)
-    student_obj = Student.objects.get(admin=request.user.id)
-    course = student_obj.course_id
-    subjects = Subject.objects.filter(course_id=course)
+    student = request.profile
+    subjects = Subject.objects.filter(course_id=student.course_id)
     context = {"subjects": subjects, "student": student}
     return render(request, "student_template/student_view_attendance_template.html", context)
 
 
 def student_view_attendance_post(request):
-    user = CustomUser.objects.get(id=request.user.id)
-    student = Student.objects.get(admin=user)
+    student = request.profile
     subject_id = request.POST.get('subject')
     start_date = request.POST.get('start_date')
     end_date = request.POST.get('end_date')
@@ -58,20 +55,16 @@ def student_view_attendance_post(request):
     start_date_parse = datetime.datetime.strptime(start_date, "%Y-%m-%d").date()
     end_date_parse = datetime.datetime.strptime(end_date, "%Y-%m-%d").date()
     subject_obj = Subject.objects.get(id=subject_id)
-    user_obj = CustomUser.objects.get(id=request.user.id)
-    student_obj = Student.objects.get(admin=user_obj)
     attendance = Attendance.objects.filter(attendance_date__range=(start_date_parse, end_date_parse),
                                            subject_id=subject_obj)
-    attendance_reports = AttendanceReport.objects.filter(attendance_id__in=attendance, student_id=student_obj)
+    attendance_reports = student_statuses(student, attendance)
     context = {"attendance_reports": attendance_reports, "student": student}
     return render(request, "student_template/student_attendance_data_template.html", context)
 
 
 def student_apply_leave(request):
-    user = CustomUser.objects.get(id=request.user.id)
-    student = Student.objects.get(admin=user)
-    student_obj = Student.objects.get(admin=request.user.id)
-    leave_data = LeaveReportStudent.objects.filter(student_id=student_obj)
+    student = request.profile
+    leave_data = LeaveReportStudent.objects.filter(student=student)
     context = {"leave_data": leave_data, "student": student}
     return render(request, "student_template/student_apply_leave_template.html", context)
 
@@ -80,12 +73,14 @@ def student_apply_leave_save(request):
     if request.method != "POST":
         return HttpResponseRedirect(reverse("student_apply_leave"))
     else:
-        leave_date = request.POST.get("leave_date")
         leave_message = request.POST.get("leave_message")
 
-        student_obj = Student.objects.get(admin=request.user.id)
+        student_obj = request.profile
         try:
-            leave_report = LeaveReportStudent(student_id=student_obj, leave_date=leave_date,
+            leave_start_date, leave_end_date = read_leave_range(request.POST)
+            leave_report = LeaveReportStudent(student=student_obj,
+                                              leave_date=format_leave_range(leave_start_date, leave_end_date),
+                                              leave_start_date=leave_start_date, leave_end_date=leave_end_date,
                                               leave_message=leave_message,
                                               leave_status=0)
             leave_report.save()
@@ -97,10 +92,8 @@ def student_apply_leave_save(request):
 
 
 def student_feedback(request):
-    user = CustomUser.objects.get(id=request.user.id)
-    student = Student.objects.get(admin=user)
-    student_id = Student.objects.get(admin=request.user.id)
-    feedback_data = FeedBackStudent.objects.filter(student_id=student_id)
+    student = request.profile
+    feedback_data = FeedBackStudent.objects.filter(student=student)
     context = {"feedback_data": feedback_data, "student": student}
     return render(request, "student_template/student_feedback_template.html", context)
 
@@ -111,9 +104,9 @@ def student_feedback_save(request):
     else:
         feedback_message = request.POST.get("feedback_message")
 
-        student_obj = Student.objects.get(admin=request.user.id)
+        student_obj = request.profile
         try:
-            feedback = FeedBackStudent(student_id=student_obj, feedback=feedback_message, feedback_reply="")
+            feedback = FeedBackStudent(student=student_obj, feedback=feedback_message, feedback_reply="")
             feedback.save()
             messages.success(request, "Successfully Sent Feedback")
             return HttpResponseRedirect(reverse("student_feedback"))
@@ -123,9 +116,7 @@ def student_feedback_save(request):
 
 
 def student_profile(request):
-    user = CustomUser.objects.get(id=request.user.id)
-    student = Student.objects.get(admin=user)
-    context = {"user": user, "student": student}
+    context = {"user": request.user, "student": request.profile}
     return render(request, "student_template/student_profile_template.html", context)
 
 
@@ -139,7 +130,9 @@ def student_profile_save(request):
         password = request.POST.get("password")
 
         try:
-            customuser = CustomUser.objects.get(id=request.user.id)
+            # Loaded before saving the user, so the roster invalidation reuses it.
+            student = request_profile(request)
+            customuser = request.user
             customuser.first_name = first_name
             customuser.last_name = last_name
 
@@ -147,7 +140,6 @@ def student_profile_save(request):
                 customuser.set_password(password)
             customuser.save()
 
-            student = Student.objects.get(admin=customuser)
             student.address = address
             student.save()
             messages.success(request, "Successfully Edited Profile")
@@ -1,3 +1,1117 @@
+import datetime
+import io
+import json
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth import authenticate
+from django.db import IntegrityError, connection
+from django.db.models import Count
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from student_management_app import searchIndex
+from student_management_app.aggregates import related_count
+from student_management_app.attendanceAnalytics import analyze
+from student_management_app.attendanceRollups import build_rollups, rollup_totals
+from student_management_app.attendanceCounters import recount, stored_counters, student_totals
+from student_management_app.attendanceResponses import meeting_dates
+from student_management_app.attendanceService import save_attendance, update_attendance
+from student_management_app.attendanceStore import STORAGE_BITMAP, STORAGE_ROWS, meeting_report, meeting_statuses, \
+    pack_statuses, pack_student_ids, student_statuses, unpack_statuses, unpack_student_ids
+from student_management_app.dashboardCache import SECTION_SOURCES, get_section, invalidate_sections, \
+    section_lock_key, section_stats, section_version_key
+from student_management_app.feedbackService import FEEDBACK_PAGE_SIZE, feedback_page, reply_to_feedback
+from student_management_app.hodViews import admin_home_courses, admin_home_staff_attendance, \
+    admin_home_student_attendance
+from student_management_app.leaveService import LEAVE_ACTIONS, LEAVE_PAGE_SIZE, leave_page, set_leave_status
+from student_management_app.loginCheckMiddleWare import ANONYMOUS, access_decisions, permission_table, url_views
+from student_management_app.management.fixtures import build_cohort
+from student_management_app.models import AdminHOD, Attendance, AttendanceCounter, AttendanceReport, Courses, \
+    CustomUser, FeedBackStudent, LeaveReportStaff, LeaveReportStudent, SessionYear, Staff, Student, Subject, \
+    create_profiles
+from student_management_app.rosterCache import get_roster, roster_version_key
+from student_management_app.staffHomeCache import patch_snapshot, refresh_staff_home, staff_home_key
+from student_management_app.userCache import user_cache_key
+from student_management_app.userProfile import get_profile
+
+
+class StudentHomeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.session_year = SessionYear.objects.create(session_start_year=datetime.date(2025, 1, 1),
+                                                       session_end_year=datetime.date(2025, 12, 31))
+        self.course = Courses.objects.create(course_name="Computer Science")
+        self.staff = CustomUser.objects.create_user(username="staff", email="staff@example.com", password="password",
+                                                    user_type="2")
+        self.user = CustomUser.objects.create_user(username="student", email="student@example.com",
+                                                   password="password", user_type="3")
+        self.user.student.course = self.course
+        self.user.student.session_year = self.session_year
+        self.user.student.save()
+        self.client.force_login(self.user)
+
+    def add_subjects(self, count):
+        start = Subject.objects.count()
+        for i in range(start, start + count):
+            subject = Subject.objects.create(subject_name=f"Subject {i}", course=self.course, staff=self.staff)
+            with self.captureOnCommitCallbacks(execute=True):
+                save_attendance(subject, self.session_year, datetime.date(2025, 3, 1),
+                                [{"id": self.user.id, "status": i % 2}])
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("student_home"))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_subject_count(self):
+        self.add_subjects(2)
+        cache.clear()
+        few_subjects = self.count_queries()
+        cache.clear()
+        self.add_subjects(10)
+        self.assertEqual(self.count_queries(), few_subjects)
+
+    def test_cached_page_skips_attendance_queries(self):
+        self.add_subjects(3)
+        uncached = self.count_queries()
+        self.assertLess(self.count_queries(), uncached)
+
+    def test_saving_attendance_invalidates_cache(self):
+        self.add_subjects(1)
+        self.client.get(reverse("student_home"))
+        self.add_subjects(2)
+        response = self.client.get(reverse("student_home"))
+        self.assertEqual(response.context["total_attendance"], 3)
+        self.assertEqual(response.context["present_attendance"], 1)
+        self.assertEqual(response.context["data1"], [0, 1, 0])
+        self.assertEqual(response.context["data_name"], ["Subject 0", "Subject 1", "Subject 2"])
+
+    def test_adding_or_renaming_a_subject_invalidates_cache(self):
+        self.add_subjects(1)
+        self.client.get(reverse("student_home"))
+        with self.captureOnCommitCallbacks(execute=True):
+            subject = Subject.objects.create(subject_name="Added", course=self.course, staff=self.staff)
+        self.assertEqual(self.client.get(reverse("student_home")).context["data_name"], ["Subject 0", "Added"])
+        with self.captureOnCommitCallbacks(execute=True):
+            subject.subject_name = "Renamed"
+            subject.save()
+        self.assertEqual(self.client.get(reverse("student_home")).context["data_name"], ["Subject 0", "Renamed"])
+        with self.captureOnCommitCallbacks(execute=True):
+            subject.delete()
+        self.assertEqual(self.client.get(reverse("student_home")).context["subjects"], 1)
+
+    def test_course_transfer_invalidates_cache(self):
+        self.add_subjects(2)
+        self.client.get(reverse("student_home"))
+        other = Courses.objects.create(course_name="Mathematics")
+        Subject.objects.create(subject_name="Algebra", course=other, staff=self.staff)
+        student = Student.objects.get(admin=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            student.course = other
+            student.save()
+        response = self.client.get(reverse("student_home"))
+        self.assertEqual(response.context["data_name"], ["Algebra"])
+        self.assertEqual(response.context["total_attendance"], 0)
+
+
+def sqlite_steps(queryset):
+    """
+    Evaluate ``queryset`` and return its rows with the number of SQLite virtual
+    machine steps it took, a measure of the rows the database walked.
+    """
+    steps = 0
+
+    def count_step():
+        nonlocal steps
+        steps += 1
+        return 0
+
+    connection.ensure_connection()
+    connection.connection.set_progress_handler(count_step, 1)
+    try:
+        rows = list(queryset)
+    finally:
+        connection.connection.set_progress_handler(None, 1)
+    return rows, steps
+
+
+class RelatedCountTests(TestCase):
+    # Generous upper bound on SQLite VM steps per row read; subquery counts take about 8.
+    STEPS_PER_ROW = 20
+
+    def setUp(self):
+        cache.clear()
+        self.cohorts = [build_cohort(size, prefix=f"course{i}", subjects=10) for i, size in enumerate((100, 200, 300))]
+        cohort = self.cohorts[0]
+        Attendance.objects.bulk_create([
+            Attendance(subject=subject, session_year=cohort["session_year"],
+                       attendance_date=datetime.date(2025, 3, 1 + day))
+            for subject in cohort["subjects"] for day in range(4)
+        ])
+        staff = cohort["staff"].staff
+        LeaveReportStaff.objects.bulk_create([
+            LeaveReportStaff(staff=staff, leave_date="2025-03-01", leave_message="", leave_status=status)
+            for status in (1, 1, 1, 0, 2)
+        ])
+
+    def test_dashboard_counts_are_not_multiplied(self):
+        courses = admin_home_courses()
+        self.assertEqual(courses["subject_cont_list"], [10, 10, 10])
+        self.assertEqual(courses["student_count_list_in_course"], [100, 200, 300])
+
+        staff = admin_home_staff_attendance()
+        self.assertEqual(staff["staff_name_list"], ["course0_staff", "course1_staff", "course2_staff"])
+        self.assertEqual(staff["attendance_present_list_staff"], [40, 0, 0])
+        self.assertEqual(staff["attendance_absent_list_staff"], [3, 0, 0])
+
+    def test_staff_home_counts_attendance_per_subject(self):
+        self.client.force_login(self.cohorts[0]["staff"])
+        response = self.client.get(reverse("staff_home"))
+        self.assertEqual(response.context["data1"], [4] * 10)
+        self.assertEqual(response.context["attendance_count"], 40)
+        self.assertEqual(response.context["leave_count"], 3)
+
+    @unittest.skipUnless(connection.vendor == "sqlite", "Counts SQLite virtual machine steps.")
+    def test_scanned_rows_are_bounded(self):
+        rows_read = Courses.objects.count() + Subject.objects.count() + Student.objects.count()
+        counts, steps = sqlite_steps(Courses.objects.order_by("id").annotate(
+            subject_count=related_count(Subject.objects, "course"),
+            student_count=related_count(Student.objects, "course")).values_list("subject_count", "student_count"))
+        self.assertEqual(counts, [(10, 100), (10, 200), (10, 300)])
+        self.assertLessEqual(steps, self.STEPS_PER_ROW * rows_read)
+
+        # The joined Count() annotations walk subjects x students per course and inflate both counts.
+        counts, steps = sqlite_steps(Courses.objects.order_by("id").annotate(
+            subject_count=Count("subject"), student_count=Count("student")).values_list("subject_count",
+                                                                                        "student_count"))
+        self.assertEqual(counts, [(1000, 1000), (2000, 2000), (3000, 3000)])
+        self.assertGreater(steps, self.STEPS_PER_ROW * rows_read)
+
+
+class LoginCheckMiddleWareTests(TestCase):
+
+    def test_every_url_has_a_permission_entry(self):
+        table = permission_table()
+        missing = [f"{view_func.__module__}.{view_func.__name__}"
+                   for view_func in url_views(get_resolver().url_patterns) if view_func not in table]
+        self.assertEqual(missing, [])
+
+    def test_portal_views_are_limited_to_their_user_type(self):
+        table = permission_table()
+        for url_name, allowed in (("admin_home", {"1"}), ("staff_home", {"2"}), ("student_home", {"3"}),
+                                  ("logout", {"1", "2", "3"}), ("show_login", {"1", "2", "3", ANONYMOUS}),
+                                  ("login", {"1", "2", "3", ANONYMOUS}), ("password_reset", {ANONYMOUS})):
+            view_func = get_resolver().resolve(reverse(url_name)).func
+            self.assertEqual(table[view_func], allowed, url_name)
+
+    def test_redirects(self):
+        staff = CustomUser.objects.create_user(username="staff", email="staff@example.com", password="password",
+                                               user_type="2")
+        before = access_decisions()
+        self.assertRedirects(self.client.get(reverse("admin_home")), reverse("show_login"),
+                             fetch_redirect_response=False)
+        self.client.force_login(staff)
+        self.assertRedirects(self.client.get(reverse("admin_home")), reverse("staff_home"),
+                             fetch_redirect_response=False)
+        after = access_decisions()
+        self.assertEqual(after["redirected_login"] - before["redirected_login"], 1)
+        self.assertEqual(after["redirected_home"] - before["redirected_home"], 1)
+        self.assertEqual(after["unlisted"], before["unlisted"])
+
+
+class UserProfileTests(TestCase):
+    # Queries per page with a cold cache, counting the session and user lookups.
+    PROFILE_DATA = {"first_name": "Ada", "last_name": "Lovelace", "address": "Street 1", "password": ""}
+    LEAVE_DATA = {"leave_start_date": "2025-03-01", "leave_message": "Trip"}
+    STUDENT_PAGES = [("get", "student_home", {}, 4), ("get", "student_view_attendance", {}, 4),
+                     ("get", "student_apply_leave", {}, 4), ("get", "student_feedback", {}, 4),
+                     ("get", "student_profile", {}, 3), ("post", "student_apply_leave_save", LEAVE_DATA, 4),
+                     ("post", "student_feedback_save", {"feedback_message": "Hi"}, 4),
+                     ("post", "student_profile_save", PROFILE_DATA, 5)]
+    STAFF_PAGES = [("get", "staff_home", {}, 9), ("get", "staff_take_attendance", {}, 4),
+                   ("get", "staff_update_attendance", {}, 4), ("get", "staff_apply_leave", {}, 4),
+                   ("get", "staff_feedback", {}, 4), ("get", "staff_profile", {}, 3),
+                   ("post", "staff_apply_leave_save", LEAVE_DATA, 5),
+                   ("post", "staff_feedback_save", {"feedback_message": "Hi"}, 4),
+                   ("post", "staff_profile_save", PROFILE_DATA, 5)]
+
+    def setUp(self):
+        cache.clear()
+        self.cohort = build_cohort(5, prefix="profile", subjects=2)
+        self.student = self.cohort["students"][0]
+        with self.captureOnCommitCallbacks(execute=True):
+            save_attendance(self.cohort["subjects"][0], self.cohort["session_year"], datetime.date(2025, 3, 1),
+                            [{"id": student.admin_id, "status": 1} for student in self.cohort["students"]])
+
+    def assert_page_queries(self, user, pages):
+        self.client.force_login(user)
+        for method, url_name, data, expected in pages:
+            cache.clear()
+            with self.subTest(url_name), self.assertNumQueries(expected):
+                response = getattr(self.client, method)(reverse(url_name), data)
+            self.assertIn(response.status_code, (200, 302), url_name)
+
+    def test_student_pages(self):
+        self.assert_page_queries(self.student.admin, self.STUDENT_PAGES)
+        self.assertEqual(self.student.leavereportstudent_set.count(), 1)
+        self.assertEqual(self.student.feedbackstudent_set.count(), 1)
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.address, "Street 1")
+
+    def test_student_attendance_report(self):
+        self.client.force_login(self.student.admin)
+        cache.clear()
+        with self.assertNumQueries(6):
+            response = self.client.post(reverse("student_view_attendance_post"),
+                                        {"subject": self.cohort["subjects"][0].id, "start_date": "2025-01-01",
+                                         "end_date": "2025-12-31"})
+        self.assertEqual(len(response.context["attendance_reports"]), 1)
+
+    def test_staff_pages(self):
+        self.assert_page_queries(self.cohort["staff"], self.STAFF_PAGES)
+        self.assertEqual(LeaveReportStaff.objects.filter(staff__admin=self.cohort["staff"]).count(), 1)
+
+    def test_profile_is_linked_to_its_user(self):
+        user = CustomUser.objects.get(id=self.student.admin_id)
+        with self.assertNumQueries(1):
+            profile = get_profile(user)
+            self.assertIs(profile.admin, user)
+            self.assertIs(user.student, profile)
+            self.assertEqual(profile.course, self.cohort["course"])
+            self.assertEqual(profile.session_year, self.cohort["session_year"])
+
+
+class UserCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username="staff", email="staff@example.com", password="password",
+                                                   user_type="2")
+        self.client.force_login(self.user)
+
+    def test_warm_request_skips_session_and_user_queries(self):
+        self.client.get(reverse("staff_profile"))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("staff_profile"))
+        self.assertEqual(response.context["user"], self.user)
+        tables = " ".join(query["sql"] for query in queries)
+        self.assertNotIn("django_session", tables)
+        self.assertNotIn('FROM "student_management_app_customuser"', tables)
+
+    def test_profile_save_is_seen_on_next_request(self):
+        self.client.get(reverse("staff_profile"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("staff_profile_save"), {"first_name": "Grace", "last_name": "Hopper",
+                                                             "address": "", "password": ""})
+        response = self.client.get(reverse("staff_profile"))
+        self.assertEqual(response.context["user"].first_name, "Grace")
+
+    def test_password_change_ends_other_sessions(self):
+        self.client.get(reverse("staff_profile"))
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.id)))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password("changed-password")
+            self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.id)))
+        self.assertRedirects(self.client.get(reverse("staff_profile")), reverse("show_login"),
+                             fetch_redirect_response=False)
+
+    def test_session_with_other_hash_is_verified_again(self):
+        self.client.get(reverse("staff_profile"))
+        cache.set(user_cache_key(self.user.id), ("stale-hash", self.user))
+        CustomUser.objects.filter(id=self.user.id).update(is_active=False)
+        self.assertRedirects(self.client.get(reverse("staff_profile")), reverse("show_login"),
+                             fetch_redirect_response=False)
+
+
+class CreateUserProfileTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="student", email="student@example.com",
+                                                   password="password", user_type="3")
+
+    def test_login_does_not_write_the_profile(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("login"), {"email": "student@example.com", "password": "password"})
+        self.assertRedirects(response, reverse("student_home"), fetch_redirect_response=False)
+        self.assertEqual([query["sql"] for query in queries if "_student" in query["sql"]], [])
+
+    def profile_updates(self, user):
+        with CaptureQueriesContext(connection) as queries:
+            user.save()
+        return sum(query["sql"].startswith('UPDATE "student_management_app_student"') for query in queries)
+
+    def test_user_save_writes_changed_profile_only(self):
+        user = CustomUser.objects.get(id=self.user.id)
+        self.assertEqual(self.profile_updates(user), 0)
+        user.student.address = "Street 1"
+        user.student.course = Courses.objects.create(course_name="Physics")
+        self.assertEqual(self.profile_updates(user), 1)
+        self.assertEqual(Student.objects.get(admin=user).address, "Street 1")
+        self.assertEqual(self.profile_updates(user), 0)
+
+    def test_create_profiles_inserts_once_per_type(self):
+        users = CustomUser.objects.bulk_create([CustomUser(username=f"user{i}", email=f"user{i}@example.com",
+                                                           user_type=str(i % 3 + 1)) for i in range(9)])
+        course = Courses.objects.create(course_name="Physics")
+        with self.assertNumQueries(3):
+            create_profiles([user for user in users if user.user_type != "3"])
+            create_profiles([user for user in users if user.user_type == "3"], course=course)
+        self.assertEqual(AdminHOD.objects.filter(admin__in=users).count(), 3)
+        self.assertEqual(Staff.objects.filter(admin__in=users).count(), 3)
+        self.assertEqual(Student.objects.filter(admin__in=users, course=course).count(), 3)
+
+
+class ImportStudentsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.course = Courses.objects.create(course_name="Physics")
+        self.session_year = SessionYear.objects.create(session_start_year=datetime.date(2025, 1, 1),
+                                                       session_end_year=datetime.date(2025, 12, 31))
+        CustomUser.objects.create_user(username="taken", email="taken@example.com", password="password",
+                                       user_type="3")
+        hod = CustomUser.objects.create_user(username="hod", email="hod@example.com", password="password",
+                                             user_type="1")
+        self.client.force_login(hod)
+
+    def upload(self, lines, **data):
+        header = "email,password,first_name,last_name,username,address,course,sex,session_year"
+        content = "\n".join([header, *lines]).encode()
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse("import_students"),
+                                    {"import_file": SimpleUploadedFile("intake.csv", content), **data})
+
+    def test_imports_valid_rows_and_reports_the_others(self):
+        response = self.upload([
+            f"ada@example.com,,Ada,Lovelace,ada,Street 1,physics,Female,{self.session_year.id}",
+            f"alan@example.com,,Alan,Turing,alan,Street 2,{self.course.id},Male,2025 to 2025",
+            "taken@example.com,,Grace,Hopper,grace,Street 3,Physics,Female,2025 to 2025",
+            "bad-email,,,Smith,smith,Street 4,Chemistry,Male,2025 to 2025",
+            "alan@example.com,,Alan,Again,alan2,Street 5,Physics,Male,2025 to 2025",
+        ])
+        self.assertEqual(response.context["result"]["created"], 2)
+        self.assertEqual([line for line, message in response.context["errors"]], [4, 5, 6])
+        self.assertIn("already in use", response.context["errors"][0][1])
+        students = Student.objects.filter(course=self.course, session_year=self.session_year).order_by("id")
+        self.assertEqual([student.admin.username for student in students], ["ada", "alan"])
+        self.assertEqual(students[0].gender, "Female")
+        self.assertFalse(students[0].admin.has_usable_password())
+
+    def test_dry_run_creates_nothing(self):
+        response = self.upload(["ada@example.com,,Ada,Lovelace,ada,Street 1,Physics,Female,2025 to 2025"],
+                               dry_run="on")
+        self.assertEqual(response.context["result"]["created"], 1)
+        self.assertFalse(CustomUser.objects.filter(username="ada").exists())
+
+    def test_missing_columns_are_rejected(self):
+        response = self.client.post(reverse("import_students"), {
+            "import_file": SimpleUploadedFile("intake.csv", b"email,first_name\nada@example.com,Ada")})
+        self.assertNotIn("result", response.context)
+        self.assertIn("Missing columns", str(list(response.context["messages"])[0]))
+
+
+class EmailBackEndTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="staff", email="Staff@Example.com", password="password",
+                                                   user_type="2")
+
+    def test_email_matches_regardless_of_case(self):
+        self.assertEqual(authenticate(None, username="staff@example.COM", password="password"), self.user)
+        self.assertIsNone(authenticate(None, username="staff@example.com", password="wrong"))
+
+    def test_inactive_user_cannot_log_in(self):
+        CustomUser.objects.filter(id=self.user.id).update(is_active=False)
+        self.assertIsNone(authenticate(None, username="staff@example.com", password="password"))
+
+    def test_unknown_email_still_hashes_the_password(self):
+        with mock.patch.object(CustomUser, "set_password") as set_password:
+            self.assertIsNone(authenticate(None, username="nobody@example.com", password="password"))
+        set_password.assert_called_once_with("password")
+
+    def test_email_is_unique_regardless_of_case(self):
+        with self.assertRaises(IntegrityError):
+            CustomUser.objects.create_user(username="other", email="STAFF@example.com", password="password",
+                                           user_type="3")
+
+    def test_any_number_of_users_may_leave_email_empty(self):
+        for username in ("admin", "other_admin"):
+            CustomUser.objects.create_user(username=username, email="", password="password", user_type="1")
+        self.assertEqual(CustomUser.objects.filter(email="").count(), 2)
+        self.assertIsNone(authenticate(None, username="", password="password"))
+
+    def test_report_duplicate_emails_skips_empty_emails(self):
+        CustomUser.objects.bulk_create([CustomUser(username="admin", email=""),
+                                        CustomUser(username="other_admin", email="")])
+        out = io.StringIO()
+        call_command("report_duplicate_emails", "--strict", stdout=out)
+        self.assertIn("Done, 0 shared emails.", out.getvalue())
+
+
+class SaveAttendanceTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cohorts = [build_cohort(size, prefix=f"save{size}", subjects=1) for size in (3, 30)]
+
+    def save(self, cohort, day=1):
+        entries = [{"id": student.admin_id, "status": i % 2} for i, student in enumerate(cohort["students"])]
+        return save_attendance(cohort["subjects"][0], cohort["session_year"], datetime.date(2025, 3, day), entries)
+
+    def test_query_count_does_not_depend_on_roster_size(self):
+        counts = []
+        for cohort in self.cohorts:
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.save(cohort)["inserted"], len(cohort["students"]))
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_only_a_taken_meeting_is_reported_as_taken(self):
+        self.save(self.cohorts[0])
+        with self.assertRaisesMessage(ValueError, "already been taken"):
+            self.save(self.cohorts[0])
+        with mock.patch.object(AttendanceReport.objects, "bulk_create", side_effect=IntegrityError("FOREIGN KEY")):
+            with self.assertRaisesMessage(IntegrityError, "FOREIGN KEY"):
+                self.save(self.cohorts[0], day=2)
+        self.assertFalse(Attendance.objects.filter(attendance_date=datetime.date(2025, 3, 2)).exists())
+
+
+class UpdateAttendanceTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cohort = build_cohort(3, prefix="update", subjects=1)
+        self.subject, self.session_year = self.cohort["subjects"][0], self.cohort["session_year"]
+        self.students = self.cohort["students"]
+        for day in (2, 1):
+            with self.captureOnCommitCallbacks(execute=True):
+                save_attendance(self.subject, self.session_year, datetime.date(2025, 3, day),
+                                [{"id": student.admin_id, "status": 1} for student in self.students])
+        self.client.force_login(self.cohort["staff"])
+
+    def test_attendance_dates_lead_to_the_update(self):
+        response = self.client.post(reverse("get_attendance_dates"),
+                                    {"subject": self.subject.id, "session_year_id": self.session_year.id})
+        dates = response.json()
+        self.assertEqual([(date["attendance_date"], date["session_year_id"]) for date in dates],
+                         [("2025-03-01", self.session_year.id), ("2025-03-02", self.session_year.id)])
+
+        entries = [{"id": self.students[0].admin_id, "status": 0}, {"id": self.students[1].admin_id, "status": 1}]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("save_update_attendance_data"),
+                                        {"attendance_date": dates[0]["id"], "student_ids": json.dumps(entries)})
+        self.assertEqual(response.json(), {"status": "OK", "attendance_id": dates[0]["id"], "changed": 1,
+                                           "unchanged": 1, "created": 0, "removed": 0, "unknown_ids": []})
+
+    def test_hod_attendance_dates_lead_to_the_reports(self):
+        self.client.force_login(CustomUser.objects.create_user(username="hod", email="hod@example.com",
+                                                               password="password", user_type="1"))
+        response = self.client.post(reverse("admin_get_attendance_dates"),
+                                    {"subject": self.subject.id, "session_year_id": self.session_year.id})
+        dates = response.json()
+        self.assertEqual([date["attendance_date"] for date in dates], ["2025-03-01", "2025-03-02"])
+        response = self.client.post(reverse("admin_get_student_attendance"), {"attendance_date": dates[0]["id"]})
+        reports = json.loads(b"".join(response.streaming_content))
+        self.assertEqual([report["status"] for report in reports], [True, True, True])
+
+    def test_compact_report_matches_the_streamed_rows(self):
+        for day, storage in ((5, STORAGE_ROWS), (6, STORAGE_BITMAP)):
+            with self.subTest(storage), self.settings(ATTENDANCE_STORAGE=storage):
+                result = save_attendance(self.subject, self.session_year, datetime.date(2025, 3, day),
+                                         [{"id": student.admin_id, "status": i % 2}
+                                          for i, student in enumerate(self.students)])
+                data = {"attendance_date": result["attendance_id"]}
+                response = self.client.post(reverse("get_student_attendance"), data)
+                streamed = json.loads(b"".join(response.streaming_content))
+                compact = self.client.post(reverse("get_student_attendance"), {**data, "format": "compact"}).json()
+                self.assertEqual(compact["status"], "010")
+                self.assertEqual([{"id": user_id, "name": name, "status": bit == "1"}
+                                  for user_id, name, bit in zip(compact["ids"], compact["names"], compact["status"])],
+                                 streamed)
+
+    @unittest.skipUnless(connection.vendor == "sqlite", "Reads SQLite's EXPLAIN QUERY PLAN output.")
+    def test_attendance_dates_are_read_from_the_index(self):
+        plan = meeting_dates(self.subject.id, self.session_year.id).explain()
+        self.assertIn("USING COVERING INDEX attendance_subject_session_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_update_counts_changed_unchanged_and_created(self):
+        attendance = Attendance.objects.get(attendance_date=datetime.date(2025, 3, 1))
+        late = CustomUser.objects.create_user(username="late", email="late@example.com", password="password",
+                                              user_type="3")
+        Student.objects.filter(admin=late).update(course=self.cohort["course"], session_year=self.session_year)
+        entries = [{"id": self.students[0].admin_id, "status": 0}, {"id": self.students[1].admin_id, "status": 1},
+                   {"id": late.id, "status": 0}, {"id": self.cohort["staff"].id, "status": 1}]
+        for expected in ({"changed": 1, "unchanged": 1, "created": 1, "removed": 0},
+                         {"changed": 0, "unchanged": 3, "created": 0, "removed": 0}):
+            with self.captureOnCommitCallbacks(execute=True):
+                result = update_attendance(attendance, entries)
+            self.assertEqual(result, {"attendance_id": attendance.id, "unknown_ids": [self.cohort["staff"].id],
+                                      **expected})
+
+        # Repeating the correction is not counted twice.
+        self.assertEqual(student_totals(Student.objects.filter(admin_id__in=[self.students[0].admin_id, late.id])),
+                         {self.students[0].id: (1, 1), late.student.id: (0, 1)})
+        self.assertEqual(stored_counters(), recount())
+
+
+class ExcusedAttendanceTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cohort = build_cohort(3, prefix="excused", subjects=1)
+        self.students = self.cohort["students"]
+        LeaveReportStudent.objects.create(student=self.students[0], leave_date="2025-03-03",
+                                          leave_start_date=datetime.date(2025, 3, 3),
+                                          leave_end_date=datetime.date(2025, 3, 3), leave_message="", leave_status=1)
+        self.client.force_login(self.cohort["staff"])
+
+    def test_excused_absence_is_not_counted_twice(self):
+        data = {"subject": self.cohort["subjects"][0].id, "session_year": self.cohort["session_year"].id,
+                "attendance_date": "2025-03-03"}
+        roster = self.client.post(reverse("get_students"), data).json()
+        self.assertEqual([student["excused"] for student in roster], [True, False, False])
+
+        entries = [{"id": student["id"], "status": 0 if student["excused"] else i % 2}
+                   for i, student in enumerate(roster)]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("save_attendance_data"), {
+                "student_ids": json.dumps(entries), "subject_id": data["subject"],
+                "attendance_date": data["attendance_date"], "session_year_id": data["session_year"]})
+        self.assertEqual(response.json()["inserted"], 2)
+
+        # The leave is the excused student's one absence.
+        chart = admin_home_student_attendance()
+        chart = dict(zip(chart["student_name_list"], zip(chart["attendance_present_list_student"],
+                                                         chart["attendance_absent_list_student"])))
+        self.assertEqual(chart, {"excused_student_0": (0, 1), "excused_student_1": (1, 0),
+                                 "excused_student_2": (0, 1)})
+
+    def test_correction_removes_absence_stored_before_leave_was_approved(self):
+        leave = LeaveReportStudent.objects.get()
+        leave.leave_status = 0
+        leave.save()
+        excused_id = self.students[0].admin_id
+        entries = [{"id": student.admin_id, "status": 0} for student in self.students]
+        for storage in (STORAGE_ROWS, STORAGE_BITMAP):
+            with self.subTest(storage), self.settings(ATTENDANCE_STORAGE=storage):
+                subject = Subject.objects.create(subject_name=storage, course=self.cohort["course"],
+                                                 staff_id=self.cohort["staff"].id)
+                result = save_attendance(subject, self.cohort["session_year"], datetime.date(2025, 3, 3), entries)
+                attendance = Attendance.objects.get(id=result["attendance_id"])
+                LeaveReportStudent.objects.filter(id=leave.id).update(leave_status=1)
+
+                response = self.client.post(reverse("save_update_attendance_data"), {
+                    "student_ids": json.dumps(entries), "attendance_date": attendance.id})
+                self.assertEqual(response.json()["removed"], 1)
+                self.assertNotIn(self.students[0].id, meeting_statuses(Attendance.objects.get(id=attendance.id)))
+                call_command("check_attendance_counters", stdout=io.StringIO())
+
+                # A present excused student is kept, and a second correction changes nothing.
+                present = [{"id": excused_id, "status": 1}]
+                self.assertEqual(update_attendance(attendance, present, [excused_id])["created"], 1)
+                self.assertEqual(update_attendance(attendance, [], [excused_id])["removed"], 0)
+                self.assertTrue(meeting_statuses(Attendance.objects.get(id=attendance.id))[self.students[0].id])
+                LeaveReportStudent.objects.filter(id=leave.id).update(leave_status=0)
+
+
+class RosterCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cohort = build_cohort(2, prefix="roster")
+        self.course_id, self.session_year_id = self.cohort["course"].id, self.cohort["session_year"].id
+
+    def roster_names(self):
+        return [student["name"] for student in get_roster(self.course_id, self.session_year_id)]
+
+    def test_only_name_changes_rebuild_the_roster(self):
+        self.assertEqual(self.roster_names(), ["Student 0", "Student 1"])
+        version = cache.get(roster_version_key(self.course_id, self.session_year_id))
+        user = CustomUser.objects.get(id=self.cohort["students"][0].admin_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.email = "changed@example.com"
+            user.set_password("password")
+            user.save()
+        self.assertEqual(cache.get(roster_version_key(self.course_id, self.session_year_id)), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.first_name = "Ada"
+            user.save()
+        self.assertEqual(self.roster_names(), ["Ada 0", "Student 1"])
+
+
+class StaffHomeCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cohort = build_cohort(2, prefix="staffhome")
+        self.client.force_login(self.cohort["staff"])
+        self.client.get(reverse("staff_home"))
+        self.key = staff_home_key(self.cohort["staff"].id)
+
+    def test_only_username_changes_drop_the_snapshot(self):
+        user = CustomUser.objects.get(id=self.cohort["students"][0].admin_id)
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(1):
+            user.email = "changed@example.com"
+            user.save()
+        self.assertIsNotNone(cache.get(self.key))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.username = "renamed"
+            user.save()
+        self.assertIsNone(cache.get(self.key))
+        response = self.client.get(reverse("staff_home"))
+        self.assertEqual(response.context["student_list"], ["renamed", "staffhome_student_1"])
+
+    def test_patch_that_loses_the_lock_drops_the_holders_write_back(self):
+        attendance = Attendance.objects.create(subject=self.cohort["subjects"][0],
+                                               attendance_date=datetime.date(2025, 3, 3),
+                                               session_year=self.cohort["session_year"])
+        student_id = self.cohort["students"][0].id
+        with self.captureOnCommitCallbacks() as first:
+            refresh_staff_home(attendance, {student_id: (1, 0)})
+        with self.captureOnCommitCallbacks() as second:
+            refresh_staff_home(attendance, {student_id: (0, 1)})
+
+        def patch_then_race(*args):
+            # The second save commits while the first still holds the lock.
+            patch_snapshot(*args)
+            second[0]()
+
+        with mock.patch("student_management_app.staffHomeCache.patch_snapshot", side_effect=patch_then_race):
+            first[0]()
+        self.assertIsNone(cache.get(self.key))
+        self.assertIsNone(cache.get(f"{self.key}:dirty"))
+
+        self.client.get(reverse("staff_home"))
+        with self.captureOnCommitCallbacks() as third:
+            refresh_staff_home(attendance, {student_id: (1, 0)})
+        third[0]()
+        self.assertEqual(cache.get(self.key)["data"]["present_list"][0], 1)
+
+
+class DataTablesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        # Every student has the first name "Student", so the sort relies on the tie-break.
+        self.cohort = build_cohort(25, prefix="tables")
+        # Give the first user the newest Student row, so user and student ids sort differently.
+        first = self.cohort["students"][0]
+        first.delete()
+        Student.objects.create(admin_id=first.admin_id, course=self.cohort["course"],
+                               session_year=self.cohort["session_year"])
+        self.client.force_login(CustomUser.objects.create_user(username="hod", email="hod@example.com",
+                                                               password="password", user_type="1"))
+
+    def page(self, start, direction, cursor=""):
+        response = self.client.get(reverse("manage_student_data"), {
+            "draw": 1, "start": start, "length": 10, "order[0][column]": "1", "order[0][dir]": direction,
+            "columns[1][data]": "first_name", "cursor": cursor}).json()
+        return [row["id"] for row in response["data"]], response.get("cursor", "")
+
+    def test_cursor_pages_through_equal_sort_values(self):
+        user_ids = sorted(student.admin_id for student in self.cohort["students"])
+        for direction, expected in (("asc", user_ids), ("desc", user_ids[::-1])):
+            with self.subTest(direction):
+                pages, cursor = [], ""
+                for start in (0, 10, 20):
+                    ids, cursor = self.page(start, direction, cursor)
+                    pages.append(ids)
+                self.assertEqual(sum(pages, []), expected)
+                self.assertEqual(self.page(20, direction)[0], pages[2])
+
+                for start in (10, 0):
+                    ids, cursor = self.page(start, direction, cursor)
+                    self.assertEqual(ids, pages[start // 10])
+
+
+class UserSearchIndexTests(TestCase):
+
+    def setUp(self):
+        self.cohort = build_cohort(5, prefix="search")
+        self.ada = self.cohort["students"][0].admin
+        CustomUser.objects.filter(id=self.ada.id).update(first_name="Ada", last_name="Lovelace")
+        adam_id = self.cohort["students"][1].admin_id
+        CustomUser.objects.filter(id=adam_id).update(first_name="Adam", last_name="Palada")
+        self.client.force_login(CustomUser.objects.create_user(username="hod", email="hod@example.com",
+                                                               password="password", user_type="1"))
+        searchIndex._index = None
+        self.addCleanup(setattr, searchIndex, "_index", None)
+
+    def search(self, query):
+        response = self.client.get(reverse("search_users"), {"q": query}).json()
+        return [result["name"] for result in response["results"]], response["served_by"]
+
+    def test_cold_index_falls_back_to_the_database(self):
+        with mock.patch.object(searchIndex, "build_in_background") as build:
+            self.assertEqual(self.search("lovelace"), (["Ada Lovelace"], searchIndex.SERVED_BY_DATABASE))
+        build.assert_called_once_with()
+
+    def test_prefix_matches_come_before_substring_matches(self):
+        searchIndex._index = searchIndex.UserSearchIndex.build()
+        # "Ada" and "Adam" start with "ada"; "Palada" only contains it.
+        self.assertEqual(self.search("ada"), (["Ada Lovelace", "Adam Palada"], searchIndex.SERVED_BY_INDEX))
+        self.assertEqual(self.search("lada")[0], ["Adam Palada"])
+        self.assertEqual(self.search("search_student_2@")[0], ["Student 2"])
+        self.assertEqual(self.search("nobody")[0], [])
+
+    def test_saves_and_deletes_patch_the_index(self):
+        searchIndex._index = searchIndex.UserSearchIndex.build()
+        user = CustomUser.objects.get(id=self.ada.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.first_name = "Grace"
+            user.last_name = "Hopper"
+            user.save()
+        self.assertEqual(self.search("lovelace")[0], [])
+        self.assertEqual(self.search("hopper")[0], ["Grace Hopper"])
+        with self.captureOnCommitCallbacks(execute=True):
+            user.delete()
+        self.assertEqual(self.search("hopper")[0], [])
+
+    def test_ids_beyond_32_bits(self):
+        index = searchIndex.UserSearchIndex()
+        index.update(searchIndex.user_entry(2 ** 40, "Big", "Number", "bignumber", "big@example.com", "3"))
+        self.assertEqual([entry["id"] for entry in index.search("umbe")], [2 ** 40])
+
+
+class AttendanceStoreTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cohort = build_cohort(13, prefix="store", subjects=1)
+        self.students = self.cohort["students"]
+        # Every third student is absent.
+        self.entries = [{"id": student.admin_id, "status": int(i % 3 != 0)} for i, student in enumerate(self.students)]
+
+    def save(self, day):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = save_attendance(self.cohort["subjects"][0], self.cohort["session_year"],
+                                     datetime.date(2025, 3, day), self.entries)
+        return Attendance.objects.get(id=result["attendance_id"])
+
+    def test_statuses_round_trip_through_the_bitmap(self):
+        statuses = [i % 3 != 0 for i in range(13)]
+        self.assertEqual(len(pack_statuses(statuses)), 2)
+        self.assertEqual(unpack_statuses(pack_statuses(statuses), 13), statuses)
+        self.assertEqual(unpack_student_ids(pack_student_ids([3, 2 ** 40])), [3, 2 ** 40])
+
+    def test_bitmap_meetings_share_a_roster_and_read_like_rows(self):
+        rows_report = meeting_report(self.save(1))
+        with self.settings(ATTENDANCE_STORAGE=STORAGE_BITMAP):
+            first, second = self.save(2), self.save(3)
+        self.assertFalse(AttendanceReport.objects.filter(attendance__in=[first, second]).exists())
+        self.assertEqual(first.roster_id, second.roster_id)
+        self.assertEqual(meeting_report(first), rows_report)
+        self.assertEqual([row["status"] for row in student_statuses(self.students[1], Attendance.objects.all())],
+                         [True, True, True])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            update_attendance(second, [{"id": self.students[0].admin_id, "status": 1}])
+        second.refresh_from_db()
+        self.assertEqual(meeting_statuses(second)[self.students[0].id], True)
+        self.assertEqual(stored_counters(), recount())
+
+    def test_compaction_keeps_the_statuses(self):
+        attendances = [self.save(day) for day in (1, 2)]
+        before = [meeting_statuses(Attendance.objects.get(id=attendance.id)) for attendance in attendances]
+        call_command("compact_attendance", stdout=io.StringIO())
+        self.assertFalse(AttendanceReport.objects.exists())
+        for attendance, statuses in zip(attendances, before):
+            attendance.refresh_from_db()
+            self.assertIsNotNone(attendance.status_bitmap)
+            self.assertEqual(meeting_statuses(Attendance.objects.get(id=attendance.id)), statuses)
+        self.assertEqual(stored_counters(), recount())
+
+
+class AttendanceCounterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cohort = build_cohort(4, prefix="counter", subjects=2)
+        self.students = self.cohort["students"]
+
+    def save(self, subject, day, statuses):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = save_attendance(subject, self.cohort["session_year"], datetime.date(2025, 3, day),
+                                     [{"id": student.admin_id, "status": status}
+                                      for student, status in zip(self.students, statuses)])
+        return Attendance.objects.get(id=result["attendance_id"])
+
+    def test_saves_and_corrections_move_the_counters(self):
+        first, second = self.cohort["subjects"]
+        meeting = self.save(first, 1, [1, 1, 0, 0])
+        self.save(first, 2, [1, 0, 1, 0])
+        self.save(second, 1, [0, 0, 0, 1])
+        with self.captureOnCommitCallbacks(execute=True):
+            update_attendance(meeting, [{"id": self.students[0].admin_id, "status": 0},
+                                        {"id": self.students[2].admin_id, "status": 1}])
+
+        self.assertEqual(student_totals(), {self.students[0].id: (1, 2), self.students[1].id: (1, 2),
+                                            self.students[2].id: (2, 1), self.students[3].id: (1, 2)})
+        self.assertEqual(stored_counters(), recount())
+        call_command("check_attendance_counters", stdout=io.StringIO())
+
+    def test_rebuild_repairs_drifted_counters(self):
+        self.save(self.cohort["subjects"][0], 1, [1, 0, 1, 0])
+        AttendanceCounter.objects.filter(student=self.students[0]).update(present_count=5)
+        with self.assertRaisesMessage(CommandError, "1 of 4 attendance counters are inconsistent"):
+            call_command("check_attendance_counters", stdout=io.StringIO())
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("rebuild_attendance_counters", stdout=io.StringIO())
+        self.assertEqual(stored_counters(), recount())
+        self.assertEqual(student_totals()[self.students[0].id], (1, 0))
+
+
+class AttendanceAnalyticsTests(TestCase):
+
+    def test_analyze_skips_meetings_without_a_status(self):
+        present = np.array([[1, 0, 0, 1, 1], [1, 1, 1, 0, 1]], dtype=bool)
+        recorded = np.array([[1, 1, 1, 1, 1], [0, 1, 1, 1, 1]], dtype=bool)
+        result = analyze(present, recorded, window=2, threshold=75.0)
+        np.testing.assert_allclose(result["percentage"], [60.0, 75.0])
+        np.testing.assert_allclose(result["recent_rate"], [100.0, 50.0])
+        self.assertEqual(result["longest_absence_streak"].tolist(), [2, 1])
+        self.assertEqual(result["at_risk"].tolist(), [True, False])
+        self.assertAlmostEqual(result["overall_percentage"], 600 / 9)
+        np.testing.assert_allclose(result["rolling_rate"], [200 / 3, 50.0, 50.0, 75.0])
+
+    def test_report_reads_row_and_bitmap_meetings(self):
+        cohort = build_cohort(3, prefix="analytics", subjects=1)
+        subject, session_year, students = cohort["subjects"][0], cohort["session_year"], cohort["students"]
+        for day, statuses in ((1, [1, 1, 0]), (2, [1, 0, 0]), (3, [1, 1, 1])):
+            with self.settings(ATTENDANCE_STORAGE=STORAGE_BITMAP if day == 3 else STORAGE_ROWS):
+                save_attendance(subject, session_year, datetime.date(2025, 3, day),
+                                [{"id": student.admin_id, "status": status}
+                                 for student, status in zip(students, statuses)])
+        self.client.force_login(CustomUser.objects.create_user(username="hod", email="hod@example.com",
+                                                               password="password", user_type="1"))
+
+        report = self.client.post(reverse("admin_attendance_analytics"), {
+            "subject": subject.id, "session_year_id": session_year.id, "window": 2}).json()
+        self.assertEqual(report["dates"], ["2025-03-01", "2025-03-02", "2025-03-03"])
+        self.assertEqual([(student["percentage"], student["longest_absence_streak"])
+                          for student in report["students"]], [(100.0, 0), (66.67, 1), (33.33, 2)])
+        self.assertEqual(report["at_risk"], [students[1].id, students[2].id])
+        self.assertEqual(report["rolling_rate"], [50.0, 66.67])
+
+        summary = self.client.post(reverse("admin_attendance_analytics"), {
+            "course": cohort["course"].id, "session_year_id": session_year.id}).json()
+        self.assertEqual(summary["subjects"][0]["at_risk_count"], 2)
+        self.assertEqual(summary["overall_percentage"], 66.67)
+
+
+class DashboardCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return {"build": self.builds}
+
+    def get(self):
+        return get_section("admin_home.courses", self.build)
+
+    def test_section_is_built_once_until_invalidated(self):
+        self.assertEqual([self.get(), self.get()], [{"build": 1}, {"build": 1}])
+        with self.captureOnCommitCallbacks(execute=True):
+            Courses.objects.create(course_name="Physics")
+        self.assertEqual(self.get(), {"build": 2})
+        self.assertEqual({stat["name"]: (stat["hit"], stat["miss"]) for stat in section_stats()}
+                         ["admin_home.courses"], (1, 2))
+
+    def test_outdated_section_is_rebuilt_by_one_request(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_sections(["admin_home.courses"])
+        # Another request holds the recompute lock: the stale copy is served meanwhile.
+        cache.add(section_lock_key("admin_home.courses"), 1)
+        self.assertEqual(self.get(), {"build": 1})
+        cache.delete(section_lock_key("admin_home.courses"))
+        self.assertEqual(self.get(), {"build": 2})
+        self.assertIsNone(cache.get(section_lock_key("admin_home.courses")))
+
+    def test_saves_invalidate_only_the_sections_they_feed(self):
+        staff = CustomUser.objects.create_user(username="staff", email="staff@example.com", password="password",
+                                               user_type="2")
+        versions = {name: cache.get_or_set(section_version_key(name), 1, None) for name in SECTION_SOURCES}
+        with self.captureOnCommitCallbacks(execute=True):
+            LeaveReportStaff.objects.create(staff=staff.staff, leave_date="2025-03-01", leave_message="")
+            staff.last_login = datetime.datetime(2025, 3, 1, tzinfo=datetime.timezone.utc)
+            staff.save(update_fields=["last_login"])
+        changed = [name for name in SECTION_SOURCES if cache.get(section_version_key(name)) != versions[name]]
+        self.assertEqual(changed, ["admin_home.staff_attendance"])
+
+
+class AdminHomeChartTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(CustomUser.objects.create_user(username="hod", email="hod@example.com",
+                                                               password="password", user_type="1"))
+        self.url = reverse("admin_home_chart", args=["courses"])
+
+    def test_unchanged_chart_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["course_name_list"], [])
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Courses.objects.create(course_name="Physics")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["course_name_list"], ["Physics"])
+
+    def test_unknown_chart(self):
+        self.assertEqual(self.client.get(reverse("admin_home_chart", args=["grades"])).status_code, 404)
+
+
+class AttendanceRollupTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cohort = build_cohort(2, prefix="rollup", subjects=1)
+        self.students = self.cohort["students"]
+        self.meetings = {}
+        for day, statuses in ((datetime.date(2025, 1, 31), [1, 0]), (datetime.date(2025, 2, 3), [1, 1]),
+                              (datetime.date(2025, 2, 27), [0, 1])):
+            result = save_attendance(self.cohort["subjects"][0], self.cohort["session_year"], day,
+                                     [{"id": student.admin_id, "status": status}
+                                      for student, status in zip(self.students, statuses)])
+            self.meetings[day] = Attendance.objects.get(id=result["attendance_id"])
+        LeaveReportStudent.objects.create(student=self.students[0], leave_date="2025-01-30 to 2025-02-02",
+                                          leave_start_date=datetime.date(2025, 1, 30),
+                                          leave_end_date=datetime.date(2025, 2, 2), leave_message="", leave_status=1)
+
+    def totals(self, start, end):
+        return {student_id: (totals["meetings"], totals["present_count"], totals["absent_count"],
+                             totals["approved_leave_count"])
+                for student_id, totals in rollup_totals("student", start, end).items()}
+
+    def test_totals_combine_monthly_and_daily_rollups(self):
+        with self.assertRaises(ValueError):
+            rollup_totals("student", datetime.date(2025, 1, 1), datetime.date(2025, 2, 28))
+        call_command("build_rollups", stdout=io.StringIO())
+        # January 31 comes from the daily rollups, all of February from the monthly ones.
+        self.assertEqual(self.totals(datetime.date(2025, 1, 31), datetime.date(2025, 2, 28)),
+                         {self.students[0].id: (3, 2, 1, 3), self.students[1].id: (3, 2, 1, 0)})
+        self.assertEqual(self.totals(datetime.date(2025, 2, 1), datetime.date(2025, 2, 10)),
+                         {self.students[0].id: (1, 1, 0, 2), self.students[1].id: (1, 1, 0, 0)})
+        course = rollup_totals("course", datetime.date(2025, 1, 1), datetime.date(2025, 2, 28))
+        self.assertEqual(course[self.cohort["course"].id]["meetings"], 3)
+
+    def test_runs_resume_from_the_watermark(self):
+        self.assertEqual(build_rollups()[0], 6)
+        # Everything so far was rolled up by the previous run.
+        earlier = timezone.now() - datetime.timedelta(days=1)
+        for model in (Attendance, AttendanceReport, LeaveReportStudent):
+            model.objects.update(updated_at=earlier)
+        self.assertEqual(build_rollups()[0], 0)
+
+        update_attendance(self.meetings[datetime.date(2025, 2, 27)],
+                          [{"id": self.students[0].admin_id, "status": 1}])
+        self.assertEqual(build_rollups()[0], 1)
+        self.assertEqual(self.totals(datetime.date(2025, 2, 1), datetime.date(2025, 2, 28))[self.students[0].id],
+                         (2, 2, 0, 2))
+
+
+class LeaveQueueTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cohort = build_cohort(1, prefix="leaves")
+        self.staff = Staff.objects.get(admin=self.cohort["staff"])
+        day = datetime.date(2025, 3, 3)
+        self.leaves = LeaveReportStaff.objects.bulk_create([
+            LeaveReportStaff(staff=self.staff, leave_date=day.isoformat(), leave_start_date=day, leave_end_date=day,
+                             leave_message="", leave_status=1 if n % 10 == 0 else 0)
+            for n in range(LEAVE_PAGE_SIZE + 10)])
+        self.client.force_login(CustomUser.objects.create_user(username="hod", email="hod@example.com",
+                                                               password="password", user_type="1"))
+
+    def test_queue_pages_through_pending_requests(self):
+        pending = [leave.id for leave in self.leaves if leave.leave_status == 0]
+        first = self.client.get(reverse("staff_leave_view")).context["leaves"]
+        self.assertEqual([leave.id for leave in first], pending[:LEAVE_PAGE_SIZE])
+        last = self.client.get(reverse("staff_leave_view"), {"page": 2}).context["leaves"]
+        self.assertEqual([leave.id for leave in last], pending[LEAVE_PAGE_SIZE:])
+        approved = leave_page(LeaveReportStaff, "staff", "approved", 1)
+        self.assertEqual(approved.paginator.count, 6)
+        self.assertEqual(leave_page(LeaveReportStaff, "staff", "all", 1).paginator.count, LEAVE_PAGE_SIZE + 10)
+
+    def test_bulk_action_only_decides_pending_requests(self):
+        cache.set(staff_home_key(self.cohort["staff"].id), {"cached": True})
+        ids = [leave.id for leave in self.leaves[:3]]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("staff_leave_bulk"), {
+                "action": "disapprove", "leave_ids": ids, "status": "pending", "page": 2})
+        self.assertRedirects(response, reverse("staff_leave_view") + "?status=pending&page=2",
+                             fetch_redirect_response=False)
+        statuses = dict(LeaveReportStaff.objects.filter(id__in=ids).values_list("id", "leave_status"))
+        # The first request was already approved and stays so.
+        self.assertEqual(statuses, {ids[0]: 1, ids[1]: 2, ids[2]: 2})
+        self.assertIsNone(cache.get(staff_home_key(self.cohort["staff"].id)))
+        self.assertTrue(LeaveReportStaff.objects.get(id=ids[1]).updated_at > self.leaves[1].updated_at)
+
+        self.assertEqual(set_leave_status(LeaveReportStaff, ids, LEAVE_ACTIONS["approve"]), 0)
+        self.client.post(reverse("staff_leave_bulk"), {"action": "delete", "leave_ids": ids})
+        self.assertEqual(LeaveReportStaff.objects.filter(id__in=ids, leave_status=2).count(), 2)
+
+
+class FeedbackInboxTests(TestCase):
+
+    def setUp(self):
+        self.cohort = build_cohort(1, prefix="feedback")
+        self.student = self.cohort["students"][0]
+        self.feedbacks = FeedBackStudent.objects.bulk_create([
+            FeedBackStudent(student=self.student, feedback=f"feedback {n}",
+                            feedback_reply="Answered" if n % 5 == 0 else "", replied=n % 5 == 0 and n > 0)
+            for n in range(FEEDBACK_PAGE_SIZE + 10)])
+        self.client.force_login(CustomUser.objects.create_user(username="hod", email="hod@example.com",
+                                                               password="password", user_type="1"))
+
+    def inbox(self, **params):
+        return [feedback.id for feedback in
+                self.client.get(reverse("student_feedback_message"), params).context["feedbacks"]]
+
+    def test_inbox_pages_through_unanswered_feedback(self):
+        # The first item was answered before the replied flag existed and is still left out.
+        unanswered = [feedback.id for feedback in self.feedbacks if not feedback.feedback_reply]
+        self.assertEqual(self.inbox(), unanswered[:FEEDBACK_PAGE_SIZE])
+        self.assertEqual(self.inbox(page=2), unanswered[FEEDBACK_PAGE_SIZE:])
+        answered = [feedback.id for feedback in self.feedbacks if feedback.feedback_reply]
+        self.assertEqual(self.inbox(status="answered"), answered[::-1])
+        self.assertEqual(feedback_page(FeedBackStudent, "student", "all", 1).paginator.count,
+                         FEEDBACK_PAGE_SIZE + 10)
+
+    def test_replies_are_saved_in_one_batch(self):
+        ids = [feedback.id for feedback in self.feedbacks[1:4]]
+        replies = [{"id": ids[0], "message": " Thanks "}, {"id": ids[1], "message": "Noted"},
+                   {"id": ids[2], "message": "  "}]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("student_feedback_reply_batch"), {"replies": json.dumps(replies)})
+        self.assertEqual(len([query for query in queries if query["sql"].startswith("UPDATE")]), 1)
+        self.assertEqual(response.json(), {"status": "OK", "replied": 2})
+        saved = FeedBackStudent.objects.filter(id__in=ids).order_by("id").values_list("feedback_reply", "replied")
+        self.assertEqual(list(saved), [("Thanks", True), ("Noted", True), ("", False)])
+        self.assertEqual(reply_to_feedback(FeedBackStudent, {ids[2]: ""}), 0)
 
-# Create your tests here.
+        response = self.client.post(reverse("student_feedback_reply_batch"), {"replies": "not json"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,87 @@
+"""
+Cached lookup of the logged-in user.
+
+Django's AuthenticationMiddleware reads the user row on every request to verify
+the session against the user's password. CachedAuthenticationMiddleware keeps a
+user that passed that check in the cache for ``USER_CACHE_TIMEOUT`` seconds,
+together with the session auth hash it was verified against. A request whose
+session carries the same hash is served from the cache; any other hash (a
+password change, a session from another secret) falls through to the regular
+check, which refreshes the entry. Saving or deleting a user drops its entry once
+the transaction commits, so profile edits and password changes are seen on the
+next request. ``USER_CACHE_TIMEOUT = 0`` turns the cache off.
+
+Combined with cache-backed sessions (``SESSION_ENGINE`` ``cached_db``, see
+settings.py) a logged-in page view needs no session or user query at all.
+"""
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+from student_management_app.models import CustomUser
+
+DEFAULT_USER_CACHE_TIMEOUT = 60
+
+
+def user_cache_timeout():
+    return getattr(settings, "USER_CACHE_TIMEOUT", DEFAULT_USER_CACHE_TIMEOUT)
+
+
+def user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def get_cached_user(request):
+    """
+    The user of ``request``'s session, from the cache when the session auth hash
+    matches the one the cached user was verified against.
+    """
+    timeout = user_cache_timeout()
+    session = request.session
+    user_id = session.get(auth.SESSION_KEY)
+    session_hash = session.get(auth.HASH_SESSION_KEY)
+    if not timeout or user_id is None or not session_hash:
+        return auth.get_user(request)
+
+    key = user_cache_key(user_id)
+    entry = cache.get(key)
+    if entry is not None and constant_time_compare(entry[0], session_hash):
+        return entry[1]
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(key, (user.get_session_auth_hash(), user), timeout)
+    return user
+
+
+def cached_request_user(request):
+    if not hasattr(request, "_cached_user"):
+        request._cached_user = get_cached_user(request)
+    return request._cached_user
+
+
+def invalidate_user(user_id):
+    """
+    Drop the cached user once the current transaction commits.
+    """
+    key = user_cache_key(user_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: cached_request_user(request))
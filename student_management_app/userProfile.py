@@ -0,0 +1,40 @@
+"""
+The logged-in user's role profile, resolved at most once per request.
+
+ProfileMiddleware sets ``request.profile`` to a lazy object that, on first use,
+loads the AdminHOD, Staff or Student row of ``request.user`` (a student together
+with its course and session year) and links it to the user AuthenticationMiddleware
+already loaded, so neither ``profile.admin`` nor ``user.student`` queries again.
+Views that never touch it cost nothing. For visitors who are not logged in it
+resolves to None.
+"""
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from student_management_app.models import USER_PROFILES
+
+# Relations loaded together with the profile, by user_type.
+PROFILE_RELATED = {"3": ("course", "session_year")}
+
+
+def get_profile(user):
+    if not user.is_authenticated or user.user_type not in USER_PROFILES:
+        return None
+    model, accessor, defaults = USER_PROFILES[user.user_type]
+    related = PROFILE_RELATED.get(user.user_type, ())
+    profile = model.objects.select_related(*related).get(admin_id=user.id)
+    profile.admin = user
+    setattr(user, accessor, profile)
+    return profile
+
+
+def request_profile(request):
+    if not hasattr(request, "_cached_profile"):
+        request._cached_profile = get_profile(request.user)
+    return request._cached_profile
+
+
+class ProfileMiddleware(MiddlewareMixin):
+
+    def process_request(self, request):
+        request.profile = SimpleLazyObject(lambda: request_profile(request))
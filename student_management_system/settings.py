@@ -54,7 +54,8 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'student_management_app.userCache.CachedAuthenticationMiddleware',
+    'student_management_app.userProfile.ProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'student_management_app.loginCheckMiddleWare.LoginCheckMiddleWare',
@@ -95,6 +96,26 @@ DATABASES = {
     }
 }
 
+# Cache and sessions
+# The local-memory cache is per process; with several worker processes point
+# CACHE_BACKEND/CACHE_LOCATION at a shared cache (file-based, Redis, Memcached).
+# Every logged-in user holds a session and a user entry, so MAX_ENTRIES must stay
+# well above the number of concurrent users (Django's default is 300).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000))},
+    }
+}
+
+# Sessions are read from the cache and written through to the database, so a
+# cache flush or restart does not log anyone out.
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+
+# Seconds a verified user is served from the cache (see userCache.py); 0 disables it.
+USER_CACHE_TIMEOUT = int(os.getenv('USER_CACHE_TIMEOUT', 60))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -134,6 +155,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = "student_management_app.CustomUser"
 AUTHENTICATION_BACKENDS = ['student_management_app.EmailBackEnd.EmailBackEnd']
 
+# --- Attendance Storage ---
+# 'rows' keeps one AttendanceReport per student per class meeting.
+# 'bitmap' stores new meetings as a packed bitmap on Attendance (see attendanceStore.py);
+# existing rows can be converted with `python manage.py compact_attendance`.
+ATTENDANCE_STORAGE = os.getenv('ATTENDANCE_STORAGE', 'rows')
+
 # --- Email Configuration ---
 
 # For Development:
@@ -30,16 +30,23 @@ urlpatterns = [
                   path('logout_user', views.logout_user, name="logout"),
                   path('doLogin', views.doLogin, name="login"),
                   path('admin_home', hodViews.admin_home, name="admin_home"),
+                  path('admin_home_chart/<str:chart>', hodViews.admin_home_chart, name="admin_home_chart"),
+                  path('admin_dashboard_diagnostics', hodViews.admin_dashboard_diagnostics,
+                       name="admin_dashboard_diagnostics"),
                   path('add_staff', hodViews.add_staff, name="add_staff"),
                   path('add_staff_save', hodViews.add_staff_save, name="add_staff_save"),
                   path('add_course', hodViews.add_course, name="add_course"),
                   path('add_course_save', hodViews.add_course_save, name="add_course_save"),
                   path('add_student', hodViews.add_student, name="add_student"),
                   path('add_student_save', hodViews.add_student_save, name="add_student_save"),
+                  path('import_students', hodViews.import_students, name="import_students"),
                   path('add_subject', hodViews.add_subject, name="add_subject"),
                   path('add_subject_save', hodViews.add_subject_save, name="add_subject_save"),
                   path('manage_staff', hodViews.manage_staff, name="manage_staff"),
+                  path('manage_staff_data', hodViews.manage_staff_data, name="manage_staff_data"),
                   path('manage_student', hodViews.manage_student, name="manage_student"),
+                  path('manage_student_data', hodViews.manage_student_data, name="manage_student_data"),
+                  path('search_users', hodViews.search_users_typeahead, name="search_users"),
                   path('manage_course', hodViews.manage_course, name="manage_course"),
                   path('manage_subject', hodViews.manage_subject, name="manage_subject"),
                   path('edit_staff/<str:staff_id>', hodViews.edit_staff, name="edit_staff"),
@@ -57,11 +64,18 @@ urlpatterns = [
                   path('student_feedback_message', hodViews.student_feedback_message, name="student_feedback_message"),
                   path('student_feedback_message_replied', hodViews.student_feedback_message_replied,
                        name="student_feedback_message_replied"),
+                  path('student_feedback_reply_batch', hodViews.student_feedback_reply_batch,
+                       name="student_feedback_reply_batch"),
                   path('staff_feedback_message', hodViews.staff_feedback_message, name="staff_feedback_message"),
                   path('staff_feedback_message_replied', hodViews.staff_feedback_message_replied,
                        name="staff_feedback_message_replied"),
+                  path('staff_feedback_reply_batch', hodViews.staff_feedback_reply_batch,
+                       name="staff_feedback_reply_batch"),
                   path('student_leave_view', hodViews.student_leave_view, name="student_leave_view"),
                   path('staff_leave_view', hodViews.staff_leave_view, name="staff_leave_view"),
+                  path('student_leave_bulk', hodViews.student_leave_bulk, name="student_leave_bulk"),
+                  path('staff_leave_bulk', hodViews.staff_leave_bulk, name="staff_leave_bulk"),
+                  path('on_leave', hodViews.on_leave, name="on_leave"),
                   path('student_approve_leave/<str:leave_id>', hodViews.student_approve_leave,
                        name="student_approve_leave"),
                   path('student_disapprove_leave/<str:leave_id>', hodViews.student_disapprove_leave,
@@ -75,6 +89,8 @@ urlpatterns = [
                        name="admin_get_attendance_dates"),
                   path('admin_get_student_attendance', hodViews.admin_get_student_attendance,
                        name="admin_get_student_attendance"),
+                  path('admin_attendance_analytics', hodViews.admin_attendance_analytics,
+                       name="admin_attendance_analytics"),
                   path('admin_profile', hodViews.admin_profile, name="admin_profile"),
                   path('admin_profile_save', hodViews.admin_profile_save, name="admin_profile_save"),
 